@@ -0,0 +1,58 @@
+@echo off
+cls
+echo ---------------------------------------------------
+echo    SCHOOL DAYS AUTOMATION (Yearbook + Package Mode)
+echo ---------------------------------------------------
+echo.
+
+:: Activate Venv
+if exist venv\Scripts\activate.bat call venv\Scripts\activate.bat
+if exist ..\venv\Scripts\activate.bat call ..\venv\Scripts\activate.bat
+if exist .venv\Scripts\activate.bat call .venv\Scripts\activate.bat
+if exist ..\.venv\Scripts\activate.bat call ..\.venv\Scripts\activate.bat
+
+:: Step 1: Validation of both exports (yearbook runs from its own folder)
+echo --- Step 1: Validating Yearbook ^& Package Data ---
+pushd ..\yearbook-choice
+python code-yearbook-choice\validate_data.py
+set YEARBOOK_STATUS=%errorlevel%
+popd
+if %YEARBOOK_STATUS% neq 0 (
+    echo.
+    echo [ERROR] Yearbook Validation Failed. Please fix the Excel file and try again.
+    pause
+    exit /b
+)
+
+python code-package-choice\validate_package.py
+if %errorlevel% neq 0 (
+    echo.
+    echo [ERROR] Package Validation Failed. Please fix the issue and try again.
+    pause
+    exit /b
+)
+
+:: Step 2: Config (Always Run)
+echo.
+echo --- Step 2: Configuring Screen Coordinates ---
+python ..\yearbook-choice\code-yearbook-choice\config_wizard.py
+python code-package-choice\config_wizard_package.py
+
+:: Step 3: Automation (one search per student for both)
+echo.
+echo --- Step 3: Running Automation ---
+python code-package-choice\combined_main.py
+
+if %errorlevel% equ 0 (
+    echo.
+    echo ***************************************************
+    echo       AUTOMATION COMPLETED SUCCESSFULLY!
+    echo ***************************************************
+    echo.
+    echo [SUCCESS] Press any key to close...
+    pause >nul
+) else (
+    echo.
+    echo [ABORTED] Automation stopped with errors or was cancelled.
+    pause
+)
@@ -0,0 +1,139 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from ui_driver import FakeSchoolDaysDriver
+from run_timing import RunTimer
+import session_store
+from benchmark_package import make_synthetic_export
+from data_handler_package import process_students
+import main
+
+# Screen layout for the simulated app (same keys as coordinates_package.json)
+FAKE_LAYOUT = {
+    "search_box": {"x": 100, "y": 100},
+    "last_name_box": {"x": 100, "y": 180},
+    "choice_a": {"x": 700, "y": 400},
+    "choice_b": {"x": 700, "y": 420},
+    "choice_c": {"x": 700, "y": 440},
+    "choice_d": {"x": 700, "y": 460},
+    "quick_package_entry_box": {"x": 400, "y": 300},
+    "class_pkg_box": {"x": 400, "y": 330},
+    "class_pix_no_pkg_box": {"x": 400, "y": 360},
+    "cd_box": {"x": 400, "y": 390},
+    "touchup_dropdown": {"x": 400, "y": 420},
+}
+
+# Extra yearbook fields for the combined runner (same keys as coordinates.json)
+FAKE_YEARBOOK_LAYOUT = {
+    "web_entry_input_box": {"x": 500, "y": 205},
+    "option_a": {"x": 900, "y": 400},
+    "option_b": {"x": 900, "y": 420},
+    "option_c": {"x": 900, "y": 440},
+    "option_d": {"x": 900, "y": 460},
+}
+
+def run_benchmark(count, action_latency, key_latency, load_latency):
+    students = process_students(make_synthetic_export(count * 4, seed=11))[:count]
+    app = FakeSchoolDaysDriver(FAKE_LAYOUT, {s['id']: s['last_name'] for s in students},
+                               action_latency=action_latency, key_latency=key_latency,
+                               load_latency=load_latency)
+
+    timer = RunTimer(app.now, total=len(students), progress_every=0)
+
+    # Keep the run's reports and session store out of the working tree
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        store_file, session_store.STORE_FILE = session_store.STORE_FILE, os.path.join(tmp, "sessions.sqlite3")
+        try:
+            with redirect_stdout(StringIO()):
+                ok = main.run_entry_loop(iter(students), FAKE_LAYOUT, [], app, timer=timer)
+        finally:
+            main.close_sessions()
+            session_store.STORE_FILE = store_file
+            os.chdir(cwd)
+
+    # Every standard string must have landed in its choice group's quick entry box.
+    # Students mixing a no-choice group with lettered groups are skipped: that group
+    # is typed into whichever choice is active, so there is no single right answer.
+    wrong = 0
+    for s in students:
+        if any(g['photo_choice'] is None for g in s['choices_groups']):
+            continue
+        boxes = app.records[s['id']]['boxes']
+        for grp in s['choices_groups']:
+            if grp['photo_choice'] and grp['standard_string']:
+                if boxes.get((grp['photo_choice'], 'quick_package_entry_box')) != grp['standard_string']:
+                    wrong += 1
+
+    minutes = app.clock / 60
+    print(f"--- PACKAGE ENTRY BENCHMARK (simulated app, {count} students) ---")
+    print(f"Latency: action={action_latency}s key={key_latency}s load={load_latency}s")
+    print(f"Simulated run time: {app.clock:.1f} s ({app.action_count} UI actions)")
+    print(f"Throughput: {count / minutes:.1f} students/min")
+    print(f"Wrong quick package entries: {wrong}")
+    timer.print_report()
+    return ok and not wrong
+
+def run_combined_benchmark(count, action_latency, key_latency, load_latency):
+    """
+    Enters the same students as two separate passes (yearbook tool, then package tool)
+    and as one combined pass, and compares simulated time and the resulting records.
+    """
+    import combined_main
+    yearbook_main = combined_main.yearbook_main
+
+    students = process_students(make_synthetic_export(count * 4, seed=11))[:count]
+    rng = random.Random(3)
+    yearbook_students = [{'id': s['id'], 'last_name': s['last_name'], 'selection': rng.choice("abcd")}
+                         for s in students]
+    layout = dict(FAKE_LAYOUT, **FAKE_YEARBOOK_LAYOUT)
+    names = {s['id']: s['last_name'] for s in students}
+
+    def make_app():
+        return FakeSchoolDaysDriver(layout, names, action_latency=action_latency,
+                                    key_latency=key_latency, load_latency=load_latency)
+
+    separate, combined = make_app(), make_app()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        store_file, session_store.STORE_FILE = session_store.STORE_FILE, os.path.join(tmp, "sessions.sqlite3")
+        reports_dir, yearbook_main.REPORTS_DIR = yearbook_main.REPORTS_DIR, os.path.join(tmp, "reports")
+        try:
+            with redirect_stdout(StringIO()):
+                ok = yearbook_main.run_entry_loop(iter(yearbook_students), layout, separate)
+                ok = main.run_entry_loop(iter(students), layout, [], separate) and ok
+                ok = combined_main.run_combined_loop(
+                    combined_main.iter_jobs(yearbook_students, iter(students)), layout, [], combined) and ok
+        finally:
+            main.close_sessions()
+            session_store.STORE_FILE = store_file
+            yearbook_main.REPORTS_DIR = reports_dir
+            os.chdir(cwd)
+
+    same = all(separate.records[sid] == combined.records[sid] for sid in names)
+    print(f"--- COMBINED ENTRY BENCHMARK (simulated app, {count} students) ---")
+    print(f"Latency: action={action_latency}s key={key_latency}s load={load_latency}s")
+    print(f"Two separate passes: {separate.clock:.1f} s ({separate.action_count} UI actions)")
+    print(f"One combined pass:   {combined.clock:.1f} s ({combined.action_count} UI actions)")
+    print(f"Speedup: {separate.clock / combined.clock:.2f}x")
+    print(f"Records identical: {same}")
+    return ok and same
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless package entry benchmark")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--action-latency", type=float, default=0.1)
+    parser.add_argument("--key-latency", type=float, default=0.01)
+    parser.add_argument("--load-latency", type=float, default=0.25)
+    parser.add_argument("--combined", action="store_true",
+                        help="Compare separate yearbook + package passes with one combined pass")
+    args = parser.parse_args()
+    bench = run_combined_benchmark if args.combined else run_benchmark
+    if not bench(args.students, args.action_latency, args.key_latency, args.load_latency):
+        sys.exit(1)
@@ -0,0 +1,111 @@
+import random
+import sys
+import time
+import pandas as pd
+from excel_utils import find_column_robust
+from data_handler_package import process_students, build_student_entry, map_product_to_code, _parse_qty
+
+PRODUCTS = [
+    "3x5â€™s Package",
+    "5x7â€™s Package",
+    "8x10 Package",
+    "Economy Package",
+    "Deluxe Package",
+    "Wallets Package",
+    "Mini Wallets Package",
+    "5â€ x 7â€ (127 x 178 mm) Group Print",
+    "8â€ x 10â€ (203 x 254 mm) Group Print",
+    "All 4 digital portraits in Hi-Resolution jpg format",
+    "Touch Up Photos",
+    "No Photo Package Wanted",
+]
+
+def make_synthetic_export(row_count=100000, rows_per_student=4, seed=42):
+    """
+    Builds an in-memory export shaped like the real one.
+    Student rows are shuffled so each student's orders are spread through the file.
+    """
+    rng = random.Random(seed)
+    student_count = max(1, row_count // rows_per_student)
+    rows = []
+    for i in range(row_count):
+        sid = 100000 + rng.randrange(student_count)
+        rows.append({
+            'Student ID': sid,
+            'Student Last Name': f"Last{sid}",
+            'Photo Choice': rng.choice(['A', 'B', 'C', 'D', '', 'a']),
+            'Product Name': rng.choice(PRODUCTS),
+            'Quantity': rng.choice([1, 1, 1, 2]),
+            'Choose Group Photo': rng.choice(['', 'Class 3B', 'Class 4A']),
+        })
+    return pd.DataFrame(rows)
+
+def legacy_process_students(df):
+    """
+    The original per-ID filter + double iterrows() loop, kept as the benchmark baseline.
+    """
+    id_col = find_column_robust(df, "student id")
+    choice_col = find_column_robust(df, ["photo choice", "yearbook choice"])
+    product_col = find_column_robust(df, ["product name", "package choice", "description"])
+    qty_col = find_column_robust(df, ["quantity", "qty"])
+    last_name_col = find_column_robust(df, ["last name", "student last name"])
+    group_photo_col = find_column_robust(df, ["choose group photo", "group photo", "choose group"])
+
+    df = df.copy()
+    df['normalized_id'] = df[id_col].astype(str).str.strip()
+    processed_data = []
+
+    for sid in df['normalized_id'].unique():
+        student_rows = df[df['normalized_id'] == sid]
+
+        last_name = ""
+        if last_name_col and not student_rows.empty:
+            val = student_rows.iloc[0][last_name_col]
+            if pd.notna(val):
+                last_name = str(val).strip()
+
+        raw_choices = [str(r[choice_col]).strip().lower() if choice_col and pd.notna(r[choice_col]) else "" for _, r in student_rows.iterrows()]
+
+        rows = []
+        for row_index, (_, row) in enumerate(student_rows.iterrows()):
+            qty = 1
+            if qty_col and pd.notna(row[qty_col]):
+                qty = _parse_qty(row[qty_col])
+            group_photo_data = ""
+            if group_photo_col and pd.notna(row[group_photo_col]):
+                group_photo_data = str(row[group_photo_col]).strip()
+            code, p_type, _ = map_product_to_code(row[product_col])
+            rows.append((raw_choices[row_index], row[product_col], qty, group_photo_data, code, p_type))
+
+        processed_data.append(build_student_entry(sid, last_name, rows))
+
+    return processed_data
+
+def time_call(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+def run_benchmark(row_count=100000):
+    print(f"--- PACKAGE GROUPING BENCHMARK ({row_count} rows) ---")
+    df = make_synthetic_export(row_count)
+    print(f"Students: {df['Student ID'].nunique()}")
+
+    grouped, grouped_secs = time_call(process_students, df)
+    print(f"Single-pass grouping:   {grouped_secs:8.2f} s")
+
+    legacy, legacy_secs = time_call(legacy_process_students, df)
+    print(f"Per-ID filter (legacy): {legacy_secs:8.2f} s")
+
+    if grouped != legacy:
+        print("✗ MISMATCH: grouped output differs from legacy output")
+        return False
+
+    print("✓ Outputs identical")
+    print(f"Speedup: {legacy_secs / grouped_secs:.1f}x")
+    return True
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    if not run_benchmark(rows):
+        sys.exit(1)
@@ -0,0 +1,274 @@
+import json
+import os
+import numpy as np
+
+TEMPLATE_SIZE = (64, 28)  # Width, height of the crop kept around each field (screen pixels)
+MATCH_THRESHOLD = 0.8     # Normalized cross-correlation a field needs to count as found
+SEARCH_MARGIN = 150       # Pixels around the last known spot searched before the whole screen
+CONFIRM_TOLERANCE = 3     # Pixels a second field may be off its profile offset and still confirm it
+UNIQUE_MARGIN = 0.05      # The best match must beat any other spot by this much (identical boxes tie)
+
+def display_key(screenshot, screen_size):
+    """Resolution and scaling a layout was taught on, e.g. '1920x1080@1x' or '1440x900@2x'."""
+    return f"{screen_size[0]}x{screen_size[1]}@{screen_scale(screenshot, screen_size):g}x"
+
+def templates_path(coord_file, key):
+    """Reference crops live next to the coordinates they belong to, one file per display
+    (e.g. coordinates_templates_1920x1080_1x.npz): crops taken at 200% don't match at 100%."""
+    return f"{os.path.splitext(coord_file)[0]}_templates_{key.replace('@', '_')}.npz"
+
+def profiles_path(coord_file):
+    """Window-relative layouts, one per display key (e.g. coordinates_profiles.json)."""
+    return os.path.splitext(coord_file)[0] + "_profiles.json"
+
+def to_gray(image):
+    """Screenshot (PIL image or array) as a 2-D float array."""
+    if hasattr(image, "convert"):
+        image = image.convert("L")
+    array = np.asarray(image, dtype=np.float64)
+    if array.ndim == 3:
+        array = array.mean(axis=2)
+    return array
+
+def screen_scale(image, screen_size):
+    """Screenshot pixels per mouse coordinate unit (2.0 on Retina / 200% scaling)."""
+    width = image.size[0] if hasattr(image, "size") and not isinstance(image, np.ndarray) else image.shape[1]
+    return width / screen_size[0]
+
+def crop_field(screen, x, y, scale=1.0, size=TEMPLATE_SIZE):
+    """
+    The TEMPLATE_SIZE crop centred on a field (x, y in mouse coordinates), clipped to the screen.
+    Returns: (crop, (dx, dy) from the crop's top-left corner to the field's pixel)
+    """
+    px, py = int(round(x * scale)), int(round(y * scale))
+    width, height = size
+    left = min(max(px - width // 2, 0), max(screen.shape[1] - width, 0))
+    top = min(max(py - height // 2, 0), max(screen.shape[0] - height, 0))
+    crop = screen[top:top + height, left:left + width]
+    return crop, (px - left, py - top)
+
+def _window_sums(image, th, tw):
+    # Sum of every th x tw window (top-left aligned), via a summed-area table
+    table = np.zeros((image.shape[0] + 1, image.shape[1] + 1))
+    table[1:, 1:] = image.cumsum(axis=0).cumsum(axis=1)
+    return table[th:, tw:] - table[:-th, tw:] - table[th:, :-tw] + table[:-th, :-tw]
+
+def match_template(image, template):
+    """
+    Best normalized cross-correlation match of template in image (FFT-based).
+    Returns: (left, top, score, runner-up) with scores in [-1, 1], or None if the template
+    doesn't fit. The runner-up is the best score at any spot not overlapping the best one
+    (-1 if there is none): close to the score, the template shows up twice.
+    """
+    ih, iw = image.shape
+    th, tw = template.shape
+    if th > ih or tw > iw or th == 0 or tw == 0:
+        return None
+    t = template - template.mean()
+    t_norm = np.sqrt((t * t).sum())
+    if t_norm == 0:
+        return None # A flat crop matches everywhere equally
+
+    shape = (ih + th - 1, iw + tw - 1)
+    spectrum = np.fft.rfft2(image, shape) * np.fft.rfft2(t[::-1, ::-1], shape)
+    corr = np.fft.irfft2(spectrum, shape)[th - 1:ih, tw - 1:iw]
+
+    n = th * tw
+    sums = _window_sums(image, th, tw)
+    energy = _window_sums(image * image, th, tw) - sums * sums / n
+    denom = np.sqrt(np.maximum(energy, 0)) * t_norm
+    scores = np.where(denom > 1e-6 * t_norm, corr / np.where(denom > 0, denom, 1), 0.0)
+    top, left = np.unravel_index(np.argmax(scores), scores.shape)
+    others = scores.copy()
+    others[max(top - th + 1, 0):top + th, max(left - tw + 1, 0):left + tw] = -1.0
+    return int(left), int(top), float(scores[top, left]), float(others.max())
+
+def save_templates(path, crops):
+    """
+    crops: {field: (crop array, (dx, dy))} as made by crop_field.
+    """
+    arrays = {f"crop_{field}": crop.astype(np.uint8) for field, (crop, _) in crops.items()}
+    offsets = {field: list(offset) for field, (_, offset) in crops.items()}
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, offsets=np.array(json.dumps(offsets)), **arrays)
+    os.replace(tmp_path, path)
+
+def load_templates(path):
+    """
+    Returns: {field: (crop array, (dx, dy))}, or {} without saved templates.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with np.load(path) as data:
+            offsets = json.loads(str(data['offsets']))
+            return {field: (data[f"crop_{field}"].astype(np.float64), tuple(offset))
+                    for field, offset in offsets.items()}
+    except (OSError, ValueError, KeyError):
+        return {} # Unreadable templates: the wizard saves new ones
+
+def is_unique(match):
+    """A match that clearly beats every other spot it could be at."""
+    return match is not None and match[2] - match[3] >= UNIQUE_MARGIN
+
+def _distance(a, b):
+    return ((a['x'] - b['x']) ** 2 + (a['y'] - b['y']) ** 2) ** 0.5
+
+def locate_fields(screen, templates, scale=1.0, last_coords=None):
+    """
+    Finds every template on the screen, first near its last known spot, then anywhere.
+    A field that looks the same at two spots (e.g. stacked empty boxes), or that a
+    nearby search places closer to another field's last spot than to its own, is not
+    guessed: it comes back with no point.
+    Returns: {field: ({'x', 'y'} in mouse coordinates or None, score)}
+    """
+    last_coords = last_coords or {}
+    found = {}
+    for field, (crop, (dx, dy)) in templates.items():
+        match = None
+        nearby = False
+        last = last_coords.get(field)
+        if last:
+            # Most launches the window hasn't moved: a small search is enough
+            margin = SEARCH_MARGIN + max(crop.shape)
+            px, py = int(last['x'] * scale), int(last['y'] * scale)
+            left, top = max(px - margin, 0), max(py - margin, 0)
+            window = screen[top:py + margin, left:px + margin]
+            match = match_template(window, crop)
+            if match:
+                match = (match[0] + left, match[1] + top, match[2], match[3])
+                nearby = match[2] >= MATCH_THRESHOLD
+        if not nearby:
+            match = match_template(screen, crop)
+        if match is None:
+            found[field] = (None, 0.0)
+            continue
+        left, top, score, _ = match
+        point = {'x': int(round((left + dx) / scale)), 'y': int(round((top + dy) / scale))}
+        if not is_unique(match):
+            point = None
+        elif nearby and any(_distance(point, pt) < _distance(point, last)
+                            for other, pt in last_coords.items() if other != field and pt):
+            point = None # Most likely the widget next to it
+        found[field] = (point, score)
+    return found
+
+def load_profiles(coord_file):
+    """
+    Returns: {display key: {'anchor': field, 'at': {'x', 'y'}, 'offsets': {field: {'dx', 'dy'}}}}
+    """
+    path = profiles_path(coord_file)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_profile(coord_file, key, coords, anchor):
+    """
+    Stores coords for this display as offsets from the anchor field, keeping the
+    profiles of other displays (laptop screen, docked monitor...).
+    """
+    profiles = load_profiles(coord_file)
+    at = coords[anchor]
+    profiles[key] = {
+        'anchor': anchor,
+        'at': at,
+        'offsets': {field: {'dx': pt['x'] - at['x'], 'dy': pt['y'] - at['y']} for field, pt in coords.items()},
+    }
+    path = profiles_path(coord_file)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profiles, f, indent=4)
+    os.replace(tmp_path, path)
+
+def _write_coords(coord_file, coords):
+    with open(coord_file, "w") as f:
+        json.dump(coords, f, indent=4)
+
+def save_calibration(coord_file, coords, crops, key):
+    """
+    After the manual wizard: coordinates, reference crops and the window-relative
+    profile for this display. The first field taught is the anchor.
+    """
+    _write_coords(coord_file, coords)
+    save_templates(templates_path(coord_file, key), crops)
+    save_profile(coord_file, key, coords, next(iter(coords)))
+
+def matches_at(screen, template, point, scale=1.0, tolerance=CONFIRM_TOLERANCE):
+    """True if a field's template is found within `tolerance` pixels of where point puts it."""
+    crop, (dx, dy) = template
+    left, top = int(round(point['x'] * scale)) - dx, int(round(point['y'] * scale)) - dy
+    if left < 0 or top < 0:
+        return False
+    window = screen[max(top - tolerance, 0):top + crop.shape[0] + tolerance,
+                    max(left - tolerance, 0):left + crop.shape[1] + tolerance]
+    match = match_template(window, crop)
+    return match is not None and match[2] >= MATCH_THRESHOLD
+
+def from_anchor(screen, templates, scale, profile, fields):
+    """
+    One template lookup: finds the profile's anchor and places every field at its offset,
+    once some other field is confirmed to be where that puts it (a wrong anchor would move them all).
+    Returns: the coordinates, or None (no usable profile, anchor not found or not unique,
+    or no other field at its offset).
+    """
+    anchor = profile.get('anchor')
+    offsets = profile.get('offsets', {})
+    if anchor not in templates or any(field not in offsets for field in fields):
+        return None
+    point, score = locate_fields(screen, {anchor: templates[anchor]}, scale, {anchor: profile.get('at')})[anchor]
+    if point is None or score < MATCH_THRESHOLD:
+        return None
+    coords = {field: {'x': point['x'] + offsets[field]['dx'], 'y': point['y'] + offsets[field]['dy']}
+              for field in fields}
+    others = [field for field in fields if field != anchor and field in templates]
+    if not any(matches_at(screen, templates[field], coords[field], scale) for field in others):
+        return None
+    return coords
+
+def auto_calibrate(coord_file, screenshot, screen_size, fields):
+    """
+    Rewrites coord_file for the current display from what an earlier wizard run saved:
+    first by finding the anchor field and applying the display's window-relative
+    profile, else by finding every field in `fields` with a score of at least MATCH_THRESHOLD.
+    Returns: the coordinates, or None (nothing saved for this display or a field not found: use the wizard).
+    """
+    key = display_key(screenshot, screen_size)
+    templates = load_templates(templates_path(coord_file, key))
+    if not templates:
+        return None
+    scale = screen_scale(screenshot, screen_size)
+    screen = to_gray(screenshot)
+
+    profile = load_profiles(coord_file).get(key)
+    if profile:
+        coords = from_anchor(screen, templates, scale, profile, fields)
+        if coords:
+            _write_coords(coord_file, coords)
+            at = coords[profile['anchor']]
+            print(f"Found the School Days window ({key}): {profile['anchor']} at ({at['x']}, {at['y']}).")
+            return coords
+
+    if any(field not in templates for field in fields):
+        return None
+    last_coords = None
+    if profile:
+        last_coords = {field: {'x': profile['at']['x'] + o['dx'], 'y': profile['at']['y'] + o['dy']}
+                       for field, o in profile.get('offsets', {}).items()}
+
+    found = locate_fields(screen, {f: templates[f] for f in fields}, scale, last_coords)
+    weak = [field for field, (point, score) in found.items() if point is None or score < MATCH_THRESHOLD]
+    if weak:
+        print(f"Auto-calibration could not find (or tell apart): {', '.join(weak)}")
+        return None
+
+    coords = {field: found[field][0] for field in fields}
+    _write_coords(coord_file, coords)
+    # The layout inside the window changed (or the anchor was hidden): remember it
+    save_profile(coord_file, key, coords, fields[0])
+    lowest = min(score for _, score in found.values())
+    print(f"Auto-calibrated {len(coords)} fields from saved screenshots (lowest match {lowest:.2f}).")
+    return coords
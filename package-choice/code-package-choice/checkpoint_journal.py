@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+FINISHED_STATUSES = ('entered', 'skipped') # Students journaled with an error are tried again on resume
+
+def content_hash(values):
+    """
+    Stable hash of what gets entered for a student (any JSON-serializable value).
+    """
+    payload = json.dumps(values, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+class CheckpointJournal:
+    """
+    Append-only journal of finished students, one JSON line each, fsync'd per write
+    so it survives FailSafe aborts, crashes and power loss.
+
+    resume=False starts a fresh journal (the previous one is kept as <path>.prev, in
+    case --resume was forgotten); resume=True loads the finished students so the run
+    can skip them. A student counts as finished only if their last entry is 'entered'
+    or 'skipped' and its hash matches what would be entered now.
+    """
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.finished = {}
+        if resume:
+            self.finished = self._load()
+        elif os.path.exists(path) and os.path.getsize(path):
+            os.replace(path, path + ".prev")
+        self.file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        finished = {}
+        if not os.path.exists(self.path):
+            return finished
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # Torn last line from a crash mid-write
+                if entry.get('status') in FINISHED_STATUSES:
+                    finished[entry['id']] = entry['hash']
+                else:
+                    finished.pop(entry['id'], None)
+        return finished
+
+    def is_finished(self, sid, entry_hash):
+        return self.finished.get(str(sid)) == entry_hash
+
+    def record(self, sid, entry_hash, status):
+        """
+        status: 'entered', 'error' (already in the error report; redone on resume) or 'skipped'.
+        """
+        line = json.dumps({
+            'id': str(sid),
+            'hash': entry_hash,
+            'status': status,
+            'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        self.file.write(line + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if status in FINISHED_STATUSES:
+            self.finished[str(sid)] = entry_hash
+        else:
+            self.finished.pop(str(sid), None)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
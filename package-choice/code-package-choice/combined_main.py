@@ -0,0 +1,370 @@
+import argparse
+import importlib.util
+import os
+import sys
+from data_handler_package import load_and_process_data, iter_students
+from student_stream import stream_in_background
+from ui_driver import get_driver, FailSafeException
+from pacing import PACING, read_after_load
+from roster import load_roster
+from checkpoint_journal import CheckpointJournal, content_hash
+from session_store import close_sessions
+from run_timing import RunTimer
+from name_match import last_name_matches
+from retry_queue import RetryQueue, RETRY_PASSES
+from verification import VerificationScheduler, VERIFY_EVERY, DETECT_WITHIN, RELOAD_TIMEOUT
+import main as package_main
+
+YEARBOOK_CODE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                 "yearbook-choice", "code-yearbook-choice")
+JOURNAL_FILE = os.path.join(os.path.dirname(__file__), "combined_journal.jsonl")
+
+def load_yearbook_main():
+    """
+    Imports the yearbook tool's main.py as 'yearbook_main' (both tools have a main.py).
+    Its folder goes on the path after ours, so its data_handler is found there while the
+    shared modules (identical copies in both folders) keep coming from this folder.
+    """
+    if 'yearbook_main' in sys.modules:
+        return sys.modules['yearbook_main']
+    if YEARBOOK_CODE_DIR not in sys.path:
+        sys.path.append(YEARBOOK_CODE_DIR)
+    spec = importlib.util.spec_from_file_location("yearbook_main", os.path.join(YEARBOOK_CODE_DIR, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['yearbook_main'] = module
+    spec.loader.exec_module(module)
+    return module
+
+yearbook_main = load_yearbook_main()
+
+def load_coordinates():
+    """
+    Yearbook fields (coordinates.json) plus package fields (coordinates_package.json).
+    Fields both wizards ask for (search box, last name) are taken from the package file.
+    """
+    yearbook_coords = yearbook_main.load_coordinates()
+    package_coords = package_main.load_coordinates()
+    if not yearbook_coords or not package_coords:
+        return None
+    coords = dict(yearbook_coords)
+    coords.update(package_coords)
+    return coords
+
+def iter_jobs(yearbook_students, package_students):
+    """
+    Joins the cleaned yearbook data with the package data on Student ID.
+    Package students are streamed in export order; yearbook-only students follow at the end.
+
+    Yields: dicts with 'id', 'yearbook' (yearbook student or None) and 'package' (package student or None).
+    """
+    yearbook_by_id = {s['id']: s for s in yearbook_students}
+    for pkg in package_students:
+        yield {'id': pkg['id'], 'yearbook': yearbook_by_id.pop(pkg['id'], None), 'package': pkg}
+    for yb in yearbook_by_id.values():
+        yield {'id': yb['id'], 'yearbook': yb, 'package': None}
+
+def check_yearbook_name(yb, found_name, log=True):
+    """
+    Same rules as the yearbook tool. Logs the runtime error (unless log=False) and returns False on failure.
+    """
+    if not found_name:
+        print(f"  -> VALIDATION FAILED: Student ID {yb['id']} not found (Last Name empty). Skipping yearbook choice.")
+        if log: yearbook_main.log_runtime_error(yb, "Student ID not found (Empty Last Name)")
+        return False
+    expected = yb.get('last_name', '')
+    if expected and not last_name_matches(found_name, expected):
+        print(f"  -> NAME MISMATCH: Found '{found_name}', Expected '{expected}'. Skipping yearbook choice.")
+        if log: yearbook_main.log_runtime_error(yb, f"Last Name Mismatch (Found: {found_name}, Expected: {expected})")
+        return False
+    return True
+
+def check_package_name(pkg, found_name, log=True):
+    """
+    Same rules as the package tool. Logs the error (unless log=False) and returns False on failure.
+    """
+    lname = pkg['last_name']
+    if lname and not last_name_matches(found_name, lname):
+        print(f"  -> NAME MISMATCH: Found '{found_name}', Expected '{lname}'. Skipping packages.")
+        if log: package_main.log_error(pkg['id'], lname, "ALL", f"Name Mismatch (Found: {found_name})")
+        return False
+    return True
+
+def run_automation(stream=True, driver=None, resume=False, all_students=False, adaptive_pacing=True,
+                   trust_roster=False, verify_every=VERIFY_EVERY, verify_confidence=None,
+                   retry_passes=RETRY_PASSES):
+    coords = load_coordinates()
+    if not coords:
+        return False
+
+    print("--- READY TO START COMBINED YEARBOOK + PACKAGE ENTRY ---")
+    print("1. Ensure School Days app is open and ready.")
+    print("2. IMPORTANT: Manually CHECK all package input boxes (like Touchup) so they are editable!")
+    print("3. EMERGENCY STOP: Slam mouse quickly to any corner of the screen.")
+    print("4. OR click on this Terminal window and press Ctrl+C.")
+    print("-------------------------------------------------------")
+
+    # Yearbook data is three small columns, so it is read up front to join against
+    # (only students new or changed since their last yearbook entry, unless all_students)
+    yearbook_students = yearbook_main.load_and_process_data(None, all_students)
+    yearbook_ids = set(s['id'] for s in yearbook_students)
+    total = None
+    if not stream:
+        package_students = load_and_process_data(None) # Auto-finds Excel
+        total = len(set(s['id'] for s in package_students) | yearbook_ids)
+
+    # Verification report rows are collected as students flow through the loop
+    verif_data = []
+
+    # Crash-safe record of finished students (fresh unless resuming)
+    journal = CheckpointJournal(JOURNAL_FILE, resume=resume)
+    if resume:
+        print(f"Resuming: {len(journal.finished)} student(s) already finished will be skipped.")
+    # Yearbook entries also go to the yearbook tool's snapshot for its next validation
+    snapshot = yearbook_main.EnteredSnapshot()
+    # Students the roster rules out are logged without searching them
+    roster = load_roster()
+    # Delays learned on this machine in earlier runs (pacing_profile.json, shared by both tools)
+    if adaptive_pacing:
+        PACING.load_profile()
+    driver = driver or get_driver(pause=PACING.delay('ui_pause'))
+    PACING.attach(driver)
+    timer = RunTimer(driver.now, total=total)
+    if stream:
+        # Package students are built in the background while the first ones are entered;
+        # the ETA shows once the producer has read them all
+        package_ids = set()
+        def remember_ids(students):
+            for student in students: # Producer thread
+                package_ids.add(student['id'])
+                yield student
+        package_students = stream_in_background(remember_ids(iter_students(None)), # Auto-finds Excel
+                                                on_done=lambda count: timer.set_total(len(package_ids | yearbook_ids)))
+    jobs = iter_jobs(yearbook_students, package_students)
+    verifier = VerificationScheduler(verify_every, verify_confidence)
+    retries = RetryQueue(retry_passes)
+    try:
+        return run_combined_loop(jobs, coords, verif_data, driver, journal, timer, snapshot, roster, trust_roster,
+                                 verifier, retries)
+    finally:
+        journal.close()
+        print(f"Verification: {verifier.summary()}")
+        snapshot.close()
+        PACING.save_profile()
+        print(f"Pacing: {PACING.summary()}")
+        # Drain anything the loop did not reach (abort/validation stop) so the report stays complete
+        for job in jobs:
+            if job['package']:
+                verif_data.extend(package_main.build_verification_rows(job['package']))
+        package_main.save_verification_report(verif_data)
+        close_sessions() # Save both tools' sessions and export their reports (also runs at exit)
+        timer.print_report()
+        timing_file = timer.save(os.path.join("reports", f"combined-timing-{package_main.SESSION_TIMESTAMP}.json"))
+        print(f"saved timing report to: {timing_file}")
+
+def run_combined_loop(jobs, coords, verif_data, driver, journal=None, timer=None, snapshot=None, roster=None,
+                      trust_roster=False, verifier=None, retries=None):
+    """
+    One search and one last-name check per student, then the yearbook option
+    (Web Entry "auto" + option click) and the package entries on the same record.
+    A side whose name check fails is logged to that tool's report and skipped.
+    With a `roster` (a RosterIndex), each side is checked offline first (a student
+    with both sides ruled out is never searched); trust_roster then skips the live check
+    when the search saw the record change.
+    Students the verifier (a VerificationScheduler) picks are searched again once and
+    both sides read back; the run stops when it says so.
+    Students whose last name doesn't show up right are entered again at the end with
+    longer waits (`retries`, a RetryQueue; default settings if not given); only the
+    final attempt's name errors are logged.
+    """
+    print("Starting in 3 seconds...")
+    driver.sleep(3)
+    if timer is None:
+        timer = RunTimer(driver.now)
+    if verifier is None:
+        verifier = VerificationScheduler()
+    if retries is None:
+        retries = RetryQueue()
+
+    # Same start-up checks as the yearbook tool
+    if 'web_entry_input_box' in coords:
+        if not yearbook_main.verify_field_is_editable(driver, coords['web_entry_input_box'], "Web Entry"):
+            return False
+    if 'last_name_box' in coords:
+        if not yearbook_main.verify_field_is_editable(driver, coords['last_name_box'], "Last Name"):
+            return False
+
+    # How the yearbook option list looks for each selection (yearbook_main.check_entry)
+    options = yearbook_main.option_region(coords)
+    option_looks = {}
+
+    processed_count = 0
+    resumed_count = 0
+    roster_skipped = 0
+    for job in retries.run(jobs, driver):
+        sid = job['id']
+        yb = job['yearbook']
+        pkg = job['package']
+        if not retries.attempt:
+            processed_count += 1
+            if pkg:
+                verif_data.extend(package_main.build_verification_rows(pkg))
+        choice_groups = pkg.get('choices_groups', []) if pkg else []
+        errors = pkg.get('errors', []) if pkg else []
+
+        # Everything entered/logged for this student; any change means it must be redone
+        entry_hash = content_hash([sid, yb['selection'] if yb else None, choice_groups, errors])
+        if journal and journal.is_finished(sid, entry_hash):
+            resumed_count += 1
+            timer.skip_student()
+            continue
+
+        timer.start_student()
+        lname = (pkg or yb).get('last_name', '')
+        print(f"Processing: {sid} - {lname}")
+
+        # 0. Log pre-existing package errors (from data_handler logic; the first time only)
+        for err in (errors if not retries.attempt else []):
+            package_main.log_error(sid, pkg['last_name'], err['raw_product'], err['reason'])
+        timer.lap("log_errors")
+
+        if not yb and not choice_groups:
+            if journal: journal.record(sid, entry_hash, 'skipped')
+            continue
+
+        # 1. Offline roster check of each side (no UI)
+        do_yearbook = yb is not None
+        do_package = bool(choice_groups)
+        if roster is not None:
+            if do_yearbook:
+                do_yearbook = yearbook_main.check_roster(yb, roster)
+            if do_package:
+                do_package = package_main.check_roster(sid, pkg['last_name'], roster)
+            if not do_yearbook and not do_package:
+                roster_skipped += 1
+                if journal: journal.record(sid, entry_hash, 'error')
+                continue
+
+        # 2. Search once (returns once the record has loaded)
+        loaded = package_main.search_student(driver, sid, coords)
+        timer.lap("search")
+
+        # 3. Read the last name once and check it against each tool's expectations
+        # (a trusted roster stands in for it only if a new record showed up)
+        if 'last_name_box' in coords and not (roster is not None and trust_roster and loaded):
+            found_name = read_after_load(driver, coords['last_name_box'],
+                                         lambda t: t and (not lname or last_name_matches(t, lname)),
+                                         timeout=retries.recheck_timeout())
+            timer.lap("last_name_check")
+            # Errors are logged only when there is no retry left
+            wanted = (do_yearbook, do_package)
+            log = not retries.can_retry(sid, found_name)
+            if do_yearbook:
+                do_yearbook = check_yearbook_name(yb, found_name, log)
+            if do_package:
+                do_package = check_package_name(pkg, found_name, log)
+            if wanted != (do_yearbook, do_package) and retries.retry(sid, job, found_name):
+                print("     Will try again at the end of the run.")
+                continue
+
+        # 4. Yearbook option (a sample of students is read back in step 6)
+        sampled = (do_yearbook or do_package) and verifier.should_verify()
+        clicked = False
+        before_click = None
+        if do_yearbook:
+            if yearbook_main.enter_web_entry(driver, coords):
+                timer.lap("web_entry")
+            if sampled and options:
+                before_click = yearbook_main.capture(driver, options)
+            clicked = yearbook_main.click_yearbook_option(driver, coords, yb['selection'])
+            timer.lap("option_click")
+
+        # 5. Packages for each photo choice group
+        readback = []
+        if do_package:
+            readback = package_main.enter_choice_groups(driver, coords, sid, pkg['last_name'],
+                                                        choice_groups, timer)
+
+        # 6. Read-back check of the sample: one more search for both sides
+        if sampled and (clicked or readback):
+            print(f"\n*** VERIFYING ENTRY: {sid} ***")
+            package_main.search_student(driver, sid, coords, RELOAD_TIMEOUT)
+            verified = True
+            if clicked and not yearbook_main.check_entry(driver, coords, yb, option_looks, before_click):
+                do_yearbook = verified = False
+            if readback and not package_main.check_entries(driver, coords, sid, pkg['last_name'], readback):
+                do_package = verified = False
+            timer.lap("verification")
+            if not verifier.record(verified):
+                print(f"[STOPPED] Read-back verification failed: {verifier.summary()}")
+                if journal: journal.record(sid, entry_hash, 'error')
+                return False
+            if verified:
+                print("✓ Verification passed")
+
+        if do_yearbook:
+            yearbook_main.log_success(yb)
+            if snapshot: snapshot.record(yb)
+
+        if choice_groups and do_package:
+            package_main.log_entered(sid, package_main.build_verification_rows(pkg))
+        failed = (yb is not None and not do_yearbook) or (bool(choice_groups) and not do_package)
+        if journal: journal.record(sid, entry_hash, 'error' if failed else 'entered')
+
+    timer.finish_student() # Close out the last student
+
+    if resumed_count:
+        print(f"Skipped {resumed_count} student(s) finished in a previous run.")
+    if roster_skipped:
+        print(f"Skipped {roster_skipped} student(s) the roster ruled out, without searching them (see the error reports).")
+    if retries.retried:
+        print(f"Retries: {retries.summary()}")
+
+    if not processed_count:
+        print("No student data found.")
+        return False
+
+    print("Automation Complete!")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="School Days combined yearbook choice + package entry")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Process the whole package workbook before starting")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip students finished before the last abort (see combined_journal.jsonl)")
+    parser.add_argument("--all", action="store_true",
+                        help="Enter every validated yearbook choice, not just new or changed ones")
+    parser.add_argument("--input", choices=package_main.METHODS, default=package_main.AUTO,
+                        help="How text is put into fields without their own setting (auto: paste long values)")
+    parser.add_argument("--verify-entry", action="store_true",
+                        help="Read every field back after entering it (slower)")
+    parser.add_argument("--verify-every", type=int, default=VERIFY_EVERY, metavar="N",
+                        help=f"Search every Nth student again and read both sides back (default {VERIFY_EVERY}; 1 = all)")
+    parser.add_argument("--verify-confidence", type=float, metavar="C",
+                        help=f"Read back a random sample instead, sized so a fault is caught within "
+                             f"{DETECT_WITHIN} students with probability C (e.g. 0.95)")
+    parser.add_argument("--retry-passes", type=int, default=RETRY_PASSES, metavar="N",
+                        help=f"Passes at the end over students whose record seemed slow to load (default {RETRY_PASSES}; 0 = none)")
+    parser.add_argument("--fixed-pacing", action="store_true",
+                        help="Keep the default delays instead of tuning them (see pacing_profile.json)")
+    parser.add_argument("--trust-roster", action="store_true",
+                        help="Skip the live last-name check for students roster.xlsx/roster.csv confirms (faster)")
+    args = parser.parse_args()
+    for tool in (package_main, yearbook_main):
+        tool.TEXT_ENTRY.default = args.input
+        tool.TEXT_ENTRY.verify = args.verify_entry or ()
+    try:
+        if not run_automation(stream=not args.no_stream, resume=args.resume, all_students=args.all,
+                              adaptive_pacing=not args.fixed_pacing, trust_roster=args.trust_roster,
+                              verify_every=args.verify_every, verify_confidence=args.verify_confidence,
+                              retry_passes=args.retry_passes):
+            sys.exit(1)
+    except FailSafeException:
+        print("\n[EMERGENCY STOP] Failsafe triggered by moving mouse to corner.")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n[ABORTED] Stopped by user (Ctrl+C).")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n[CRITICAL ERROR] {e}")
+        sys.exit(1)
@@ -1,63 +1,68 @@
+import argparse
 import pyautogui
-import json
 import os
 import time
+from calibration import auto_calibrate, crop_field, display_key, save_calibration, screen_scale, to_gray
 
 COORD_FILE = os.path.join(os.path.dirname(__file__), "coordinates_package.json")
 
+# (coordinate name, prompt, note printed before the prompt or None), in wizard order
+FIELDS = [
+    ("search_box", "SEARCH INPUT BOX (Where you type Student ID)", None),
+    ("last_name_box", "LAST NAME FIELD (To verify student exists)", None),
+    # Yearbook Choices (Letters). The user said "click on the photo choice".
+    ("choice_a", "PHOTO CHOICE 'A' / 'a'", "\nPlease locate the Yearbook Choice buttons/radios."),
+    ("choice_b", "PHOTO CHOICE 'B' / 'b'", None),
+    ("choice_c", "PHOTO CHOICE 'C' / 'c'", None),
+    ("choice_d", "PHOTO CHOICE 'D' / 'd'", None),
+    ("quick_package_entry_box", "QUICK PACKAGE ENTRY BOX (For standard packages)",
+     "\nNow locate the Data Entry fields."),
+    ("class_pkg_box", "CLASS PKG BOX (For Group Prints WITH personal pkg)", None),
+    ("class_pix_no_pkg_box", "CLASS PIX NO PKG BOX (For Group Prints WITHOUT personal pkg)", None),
+    ("cd_box", "CD INPUT BOX (For 'All 4 Digital Portraits')", None),
+    # User requested to treat this as a standard input box and type "Pending"
+    ("touchup_dropdown", "TOUCHUP BOX (Will type 'Pending')", None),
+]
+
 def get_coordinate(prompt_name):
+    """
+    Returns: ({'x', 'y'} under the mouse, screenshot taken at that moment)
+    """
     print(f"\n--- {prompt_name} ---")
     print("1. Move your mouse cursor.")
     print("2. Press 'Enter' when ready (do not click).")
     input("Waiting for Enter...")
     point = pyautogui.position()
     print(f"Captured: {point}")
-    return {"x": point.x, "y": point.y}
+    return {"x": point.x, "y": point.y}, pyautogui.screenshot()
+
+def run_wizard(manual=False):
+    # Later launches: find the window (or each field) from what the last manual run saved for this display
+    if not manual:
+        if auto_calibrate(COORD_FILE, pyautogui.screenshot(), pyautogui.size(), [f[0] for f in FIELDS]):
+            return
+        print("Falling back to the setup wizard.\n")
 
-def run_wizard():
     print("Welcome to the School Days Package Entry Setup.")
     print("We need to learn where the buttons are on YOUR screen.")
     print("-----------------------------------------------------")
-    
+
     coords = {}
-    
-    # 1. Search Box
-    coords["search_box"] = get_coordinate("SEARCH INPUT BOX (Where you type Student ID)")
-
-    # 1.5 Last Name Box (For Validation)
-    coords["last_name_box"] = get_coordinate("LAST NAME FIELD (To verify student exists)")
-    
-    # 2. Yearbook Choices (Letters)
-    print("\nPlease locate the Yearbook Choice buttons/radios.")
-    # Assuming standard letters A-F or similar mapping
-    # The user said "click on the photo choice".
-    coords["choice_a"] = get_coordinate("PHOTO CHOICE 'A' / 'a'")
-    coords["choice_b"] = get_coordinate("PHOTO CHOICE 'B' / 'b'")
-    coords["choice_c"] = get_coordinate("PHOTO CHOICE 'C' / 'c'")
-    coords["choice_d"] = get_coordinate("PHOTO CHOICE 'D' / 'd'")
-
-    # Some extra common ones?
-    # No harm in gathering, but the prompt only specified letters and "click on photo choice"
-
-    # 3. Package Entry Fields
-    print("\nNow locate the Data Entry fields.")
-    
-    coords["quick_package_entry_box"] = get_coordinate("QUICK PACKAGE ENTRY BOX (For standard packages)")
-    coords["class_pkg_box"] = get_coordinate("CLASS PKG BOX (For Group Prints WITH personal pkg)")
-    coords["class_pix_no_pkg_box"] = get_coordinate("CLASS PIX NO PKG BOX (For Group Prints WITHOUT personal pkg)")
-    
-    coords["cd_box"] = get_coordinate("CD INPUT BOX (For 'All 4 Digital Portraits')")
-    
-    # Touchup
-    # User requested to treat this as a standard input box and type "Pending"
-    coords["touchup_dropdown"] = get_coordinate("TOUCHUP BOX (Will type 'Pending')")
-    
-    # coords["touchup_pending_option"] = get_coordinate("TOUCHUP 'PENDING' OPTION") # Removed per request
+    crops = {}
+    for name, prompt, note in FIELDS:
+        if note:
+            print(note)
+        coords[name], screenshot = get_coordinate(prompt)
+        # Small picture of the field for auto-calibration next time
+        crops[name] = crop_field(to_gray(screenshot), coords[name]['x'], coords[name]['y'],
+                                 screen_scale(screenshot, pyautogui.size()))
+
+    save_calibration(COORD_FILE, coords, crops, display_key(screenshot, pyautogui.size()))
 
-    with open(COORD_FILE, "w") as f:
-        json.dump(coords, f, indent=4)
-    
     print(f"\nSuccess! Coordinates saved to {COORD_FILE}.")
 
 if __name__ == "__main__":
-    run_wizard()
+    parser = argparse.ArgumentParser(description="Teach the automation where the School Days fields are")
+    parser.add_argument("--manual", action="store_true",
+                        help="Point at every field again instead of finding them from saved screenshots")
+    run_wizard(manual=parser.parse_args().manual)
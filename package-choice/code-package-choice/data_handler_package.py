@@ -1,313 +1,396 @@
+import numpy as np
 import pandas as pd
 import os
-from excel_utils import find_column_robust, get_excel_path
-from collections import defaultdict
+from excel_utils import find_column_robust, get_excel_paths
+from ingest import read_export, read_exports, read_export_chunks, use_chunked, normalize_ids
+from product_catalog import normalize_text, classify_product, classify_products
 
-def normalize_text(text):
-    if pd.isna(text):
-        return ""
-    return str(text).strip().lower()
+# Column roles of the order export (keywords as for find_column_robust) and their dtypes
+PACKAGE_ROLES = {
+    'student_id': "student id",
+    'photo_choice': ["photo choice", "yearbook choice"],
+    'product': ["product name", "package choice", "description"],
+    'quantity': ["quantity", "qty"],
+    'last_name': ["last name", "student last name"],
+    'group_photo': ["choose group photo", "group photo", "choose group"],
+}
+PACKAGE_DTYPES = {role: str for role in ['student_id', 'photo_choice', 'product', 'last_name', 'group_photo']}
 
 def map_product_to_code(product_name):
     """
     Maps a product name to (code, type, raw_name).
     Type can be: 'standard', 'group', 'cd', 'touchup', 'unknown', 'ignore'
+    Rules live in product_catalog.json; results are cached per normalized name.
     """
     p = normalize_text(product_name)
-    
-    # Ignore list
-    if p in ["no photo package wanted", ""]:
-        return None, 'ignore', p
-
-    # Explicit Error/Unknown for known invalid inputs
-    if "lost order" in p or "invalid" in p:
-        return None, 'unknown', p
-
-    # Standard Packages (Quick Package Entry)
-    # We use 'in' to handle messy inputs like "3x5â€™s Package"
-    if "mini wallet" in p: return "m", 'standard', p # Check mini before wallet
-    if "wallets" in p or "wallet prints" in p: return "w", 'standard', p
-    
-    # Dimensional Products (8x10, 5x7, 3x5)
-    # Check 8x10
-    if ("8" in p and "10" in p) or "8x10" in p or "8 x 10" in p:
-        if "group print" in p: 
-            return "l", 'group', p
-        return "t", 'standard', p
-        
-    # Check 5x7
-    if ("5" in p and "7" in p) or "5x7" in p or "5 x 7" in p:
-        if "group print" in p:
-            return "m", 'group', p
-        return "s", 'standard', p
-
-    # Check 3x5
-    if ("3" in p and "5" in p) or "3x5" in p or "3 x 5" in p:
-        return "f", 'standard', p # 3x5 group print dropped (always standard 'f')
-    
-    if "basic" in p: return "b", 'standard', p
-    if "classic" in p: return "c", 'standard', p
-    if "deluxe" in p: return "d", 'standard', p
-    if "economy" in p: return "e", 'standard', p
-    if "ultimate" in p: return "u", 'standard', p
-
-    # CD
-    if "digital" in p and "portraits" in p: return "CD", 'cd', p # "All 4 digital portraits..."
-    if "cd" in p: return "CD", 'cd', p
+    code, p_type = classify_product(p)
+    return code, p_type, p
 
-    # Touchup
-    if "touch up" in p:
-        return "Pending", 'touchup', p
 
-    return None, 'unknown', p
+def load_and_process_data(excel_path=None, chunked=None):
+    """
+    Reads the Excel file and processes students and their packages.
+    """
+    return list(iter_students(excel_path, chunked))
 
 
-def load_and_process_data(excel_path=None):
+def iter_students(excel_path=None, chunked=None):
     """
-    Reads the Excel file and processes students and their packages.
+    Same as load_and_process_data, but yields one student at a time so the
+    automation can start on the first student while the rest are still being built.
+    Without excel_path every .xlsx in package-choice/ is read (several are merged).
+    chunked: read a single export in chunks (True), whole (False), or by file size (None).
     """
-    if not excel_path:
+    if excel_path:
+        excel_paths = [excel_path]
+    else:
         # Look in the PARENT directory package-choice/
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        excel_path = get_excel_path(base_dir)
+        excel_paths = get_excel_paths(base_dir)
     
-    if not excel_path or not os.path.exists(excel_path):
-        print("Error: No Input Excel file found (or multiple found).")
-        return []
+    if not excel_paths or not all(os.path.exists(path) for path in excel_paths):
+        print("Error: No Input Excel file found.")
+        return
 
+    if len(excel_paths) > 1:
+        # One export per school: parsed in parallel and grouped as one sheet
+        print(f"Loading data from {len(excel_paths)} files: {[os.path.basename(p) for p in excel_paths]}")
+        try:
+            df, columns = read_exports(excel_paths, PACKAGE_ROLES, PACKAGE_DTYPES)
+        except Exception as e:
+            print(f"Error reading Excel: {e}")
+            return
+        yield from iter_process_students(df, columns)
+        return
+
+    excel_path = excel_paths[0]
     print(f"Loading data from: {excel_path}")
+    if use_chunked(excel_path, chunked):
+        # Big export: streamed in chunks to keep memory flat
+        try:
+            columns, chunks = read_export_chunks(excel_path, PACKAGE_ROLES, PACKAGE_DTYPES)
+            yield from iter_process_chunks(chunks, columns)
+        except Exception as e:
+            print(f"Error reading Excel: {e}")
+        return
+
     try:
-        df = pd.read_excel(excel_path)
+        # Only the columns we use, typed up front (cached per export in parse_cache/)
+        df, columns = read_export(excel_path, PACKAGE_ROLES, PACKAGE_DTYPES)
     except Exception as e:
         print(f"Error reading Excel: {e}")
-        return []
+        return
 
-    processed_data = []
+    yield from iter_process_students(df, columns)
 
+
+def _column_values(df, col, convert):
+    """
+    Converts a whole column to a plain list once (None if the column is missing).
+    convert(value) is only called for non-empty cells; empty cells become None.
+    """
+    if not col:
+        return [None] * len(df)
+    values = df[col].tolist()
+    empty = df[col].isna().tolist()
+    return [None if is_empty else convert(v) for v, is_empty in zip(values, empty)]
+
+
+def _parse_qty(value):
+    try: return int(float(value))
+    except: return 1
+
+
+def process_students(df, columns=None):
+    """
+    Groups the order rows by Student ID in a single pass.
+
+    Returns: A list of dicts (one per student, in order of first appearance)
+    with 'id', 'last_name', 'choices_groups' and 'errors'.
+    """
+    return list(iter_process_students(df, columns))
+
+
+def iter_process_students(df, columns=None):
+    """
+    Generator version of process_students: each student is built only when requested.
+    columns: {role: column} from read_export; found with find_column_robust if not given.
+    """
     # Identify columns
-    id_col = find_column_robust(df, "student id")
-    choice_col = find_column_robust(df, ["photo choice", "yearbook choice"])
-    product_col = find_column_robust(df, ["product name", "package choice", "description"])
-    qty_col = find_column_robust(df, ["quantity", "qty"])
-    last_name_col = find_column_robust(df, ["last name", "student last name"])
-    group_photo_col = find_column_robust(df, ["choose group photo", "group photo", "choose group"])
-
-    if not id_col or not product_col:
-        print(f"Error: Missing required columns. Found ID: {id_col}, Product: {product_col}")
-        return []
-        
-    if not choice_col:
+    if columns is None:
+        columns = {role: find_column_robust(df, keywords) for role, keywords in PACKAGE_ROLES.items()}
+    if not _check_columns(columns):
+        return
+
+    normalized_ids, last_names, rows, skipped = _row_data(df, columns)
+    if skipped:
+        print(f"Warning: Skipping {skipped} row(s) without a Student ID.")
+
+    # Group by Student ID: codes follow first appearance, stable sort keeps file order inside a student
+    codes, unique_ids = pd.factorize(normalized_ids, use_na_sentinel=False)
+    order = np.argsort(codes, kind='stable')
+    group_starts = np.flatnonzero(np.diff(codes[order])) + 1
+
+    for sid, row_positions in zip(unique_ids, np.split(order, group_starts)):
+        if not len(row_positions):
+            continue
+        last_name = last_names[row_positions[0]] or ""
+        yield build_student_entry(sid, last_name, [rows[i] for i in row_positions])
+
+
+def iter_process_chunks(chunks, columns):
+    """
+    iter_process_students for an export read in chunks (ingest.read_export_chunks).
+    Between chunks only each student's compact row tuples are kept, so a student whose
+    rows are spread over the file still gets all of them. Students are yielded once
+    the last chunk is read, in order of first appearance.
+    """
+    if not _check_columns(columns):
+        return
+
+    students = {} # Student ID -> (last name, row tuples)
+    skipped = 0
+    for chunk in chunks:
+        normalized_ids, last_names, rows, chunk_skipped = _row_data(chunk, columns)
+        skipped += chunk_skipped
+        for sid, last_name, row in zip(normalized_ids, last_names, rows):
+            student = students.get(sid)
+            if student is None:
+                students[sid] = (last_name or "", [row])
+            else:
+                student[1].append(row)
+
+    if skipped:
+        print(f"Warning: Skipping {skipped} row(s) without a Student ID.")
+    for sid, (last_name, rows) in students.items():
+        yield build_student_entry(sid, last_name, rows)
+
+
+def _check_columns(columns):
+    if not columns['student_id'] or not columns['product']:
+        print(f"Error: Missing required columns. Found ID: {columns['student_id']}, Product: {columns['product']}")
+        return False
+
+    if not columns['photo_choice']:
         print("Warning: 'Photo Choice' column not found. Defaulting to 'a' if needed?")
-        
-    # Group by Student ID
-    df['normalized_id'] = df[id_col].astype(str).str.strip()
-    unique_ids = df['normalized_id'].unique()
+    return True
+
+
+def _row_data(df, columns):
+    """
+    Per-row values needed for grouping, as plain lists (no per-row pandas access).
+    Rows without a Student ID are left out.
+
+    Returns: (normalized ID Series, last names, row tuples for build_student_entry, rows skipped)
+    """
+    id_col = columns['student_id']
+    choice_col = columns['photo_choice']
+    product_col = columns['product']
+    qty_col = columns['quantity']
+    last_name_col = columns['last_name']
+    group_photo_col = columns['group_photo']
+
+    # Normalized IDs ("12345.0" -> "12345"); rows without one can't be searched
+    normalized_ids = normalize_ids(df[id_col])
+    missing_ids = normalized_ids.isna()
+    skipped = int(missing_ids.sum())
+    if skipped:
+        df = df[~missing_ids.to_numpy()]
+        normalized_ids = normalized_ids[~missing_ids.to_numpy()]
+
+    # Precompute every column we need as plain lists
+    products = df[product_col].tolist()
+    choices = _column_values(df, choice_col, lambda v: str(v).strip().lower())
+    qtys = _column_values(df, qty_col, _parse_qty)
+    last_names = _column_values(df, last_name_col, lambda v: str(v).strip())
+    group_photos = _column_values(df, group_photo_col, lambda v: str(v).strip())
+
+    # Classify each distinct product name once, then map back onto the rows
+    classified = classify_products(df[product_col])
+    product_codes = classified['product_code'].astype(object).where(classified['product_code'].notna(), None).tolist()
+    product_types = classified['product_type'].astype(object).tolist()
+
+    rows = [
+        (choice or "", product, qty if qty is not None else 1, group_photo or "", code, p_type)
+        for choice, product, qty, group_photo, code, p_type
+        in zip(choices, products, qtys, group_photos, product_codes, product_types)
+    ]
+    return normalized_ids, last_names, rows, skipped
+
+
+def build_student_entry(sid, last_name, rows):
+    """
+    Builds one student's choice groups from their order rows.
+    rows: list of (raw_choice, raw_product, qty, group_photo_data, code, p_type) in file order,
+    where code/p_type come from the product catalog.
+    """
+    # We need to process grouping by CHOICES
+    # Structure: choice -> { 'standard_string': "", 'others': [], 'has_personal': False }
+    choices_map = {} 
+    
+    # List of errors for this student
+    student_errors = []
+    student_has_standard_package = False
+
+    # Prepare list of choices for student to handle missing labels
+    resolved_choices = []
+    raw_choices = [r[0] for r in rows]
+    valid_choices = [c for c in raw_choices if c in ['a', 'b', 'c', 'd']]
     
-    for sid in unique_ids:
-        student_rows = df[df['normalized_id'] == sid]
+    # If student has exactly one unique valid choice, apply it only to empty rows
+    if len(set(valid_choices)) == 1:
+        representative = valid_choices[0]
+        resolved_choices = [c if c != "" else representative for c in raw_choices]
+    else:
+        resolved_choices = raw_choices
+
+    for row_index, (_, raw_product, qty, group_photo_data, code, p_type) in enumerate(rows):
+        # 1. Get Photo Choice (using resolved logic)
+        photo_choice = resolved_choices[row_index] if resolved_choices[row_index] else None
         
-        last_name = ""
-        if last_name_col and not student_rows.empty:
-             val = student_rows.iloc[0][last_name_col]
-             if pd.notna(val):
-                 last_name = str(val).strip()
-
-        # Track duplicates: (choice, raw_product) -> count
-        seen_entries = defaultdict(int)
+        # Validate Photo Choice - Strict check for A-D
+        if photo_choice:
+            if photo_choice not in ['a', 'b', 'c', 'd']:
+                 student_errors.append({
+                    'raw_product': raw_product,
+                    'reason': f"Invalid Photo Choice: '{photo_choice}' (Must be A, B, C, or D)"
+                })
+                 continue
         
-        # We need to process grouping by CHOICES
-        # Structure: choice -> { 'standard_string': "", 'others': [], 'has_personal': False }
-        choices_map = {} 
+        # Use a placeholder for grouping if None
+        # logic: if photo_choice is None, we still process it (likely a Group Print only order)
+        group_key = photo_choice if photo_choice else "NO_SELECTION" 
+
+        # Process Product (already classified)
+        if p_type == 'ignore':
+            continue
         
-        # List of errors for this student
-        student_errors = []
-        student_has_standard_package = False
-
-        # Prepare list of choices for student to handle missing labels
-        resolved_choices = []
-        raw_choices = [str(r[choice_col]).strip().lower() if choice_col and pd.notna(r[choice_col]) else "" for _, r in student_rows.iterrows()]
-        valid_choices = [c for c in raw_choices if c in ['a', 'b', 'c', 'd']]
+        # Initialize choice group if new
+        if group_key not in choices_map:
+            choices_map[group_key] = {
+                'real_choice': photo_choice, # processing key
+                'standard_string': "", 
+                'others': [], 
+                'group_print_types': set(),
+                'group_items': []  # List of {code, photo_data} dicts
+            }
         
-        # If student has exactly one unique valid choice, apply it only to empty rows
-        if len(set(valid_choices)) == 1:
-            representative = valid_choices[0]
-            resolved_choices = [c if c != "" else representative for c in raw_choices]
-        else:
-            resolved_choices = raw_choices
-
-        row_index = 0
-        for idx, row in student_rows.iterrows():
-            raw_product = row[product_col]
-            
-            # 1. Get Quantity
-            qty = 1
-            if qty_col and pd.notna(row[qty_col]):
-                try: qty = int(float(row[qty_col]))
-                except: qty = 1
-            
-            # 2. Get Photo Choice (using resolved logic)
-            photo_choice = resolved_choices[row_index] if resolved_choices[row_index] else None
-            row_index += 1
-            
-            # Validate Photo Choice - Strict check for A-D
-            if photo_choice:
-                if photo_choice not in ['a', 'b', 'c', 'd']:
-                     student_errors.append({
-                        'raw_product': raw_product,
-                        'reason': f"Invalid Photo Choice: '{photo_choice}' (Must be A, B, C, or D)"
-                    })
-                     continue
-            
-            # Use a placeholder for grouping if None
-            # logic: if photo_choice is None, we still process it (likely a Group Print only order)
-            group_key = photo_choice if photo_choice else "NO_SELECTION" 
-
-            # Duplicate Check Key
-            dup_key = (group_key, str(raw_product).strip().lower())
-            seen_entries[dup_key] += 1
+        grp = choices_map[group_key]
 
-            # Process Product
-            code, p_type, raw_name = map_product_to_code(raw_product)
-            
-            if p_type == 'ignore':
-                continue
-            
-            # Initialize choice group if new
-            if group_key not in choices_map:
-                choices_map[group_key] = {
-                    'real_choice': photo_choice, # processing key
-                    'standard_string': "", 
-                    'others': [], 
-                    'group_print_types': set(),
-                    'group_items': []  # List of {code, photo_data} dicts
-                }
+        if p_type == 'standard':
+            # Handle Quantity for standard -> Repeat string
+            # e.g. code='f', qty=2 -> 'ff'
+            if qty < 1: qty = 1 # Safety
+            grp['standard_string'] += (code * qty)
+            student_has_standard_package = True
+        
+        elif p_type in ['group', 'cd', 'touchup']:
+            # Quantity Check: Must be 1 for CD/Touchup usually? 
+            # User specifically asked for Group Print quantity support (e.g. 2x 5x7 -> mm).
             
-            grp = choices_map[group_key]
-
-            if p_type == 'standard':
-                # Handle Quantity for standard -> Repeat string
-                # e.g. code='f', qty=2 -> 'ff'
-                if qty < 1: qty = 1 # Safety
-                grp['standard_string'] += (code * qty)
-                student_has_standard_package = True
+            if p_type != 'group' and qty > 1:
+                 student_errors.append({
+                    'raw_product': raw_product,
+                    'reason': f"Quantity {qty} not allowed for {p_type}"
+                })
+                 continue
             
-            elif p_type in ['group', 'cd', 'touchup']:
-                # Quantity Check: Must be 1 for CD/Touchup usually? 
-                # User specifically asked for Group Print quantity support (e.g. 2x 5x7 -> mm).
-                
-                if p_type != 'group' and qty > 1:
-                     student_errors.append({
-                        'raw_product': raw_product,
-                        'reason': f"Quantity {qty} not allowed for {p_type}"
+            # Check Group Print Limit (>2 different types)
+            if p_type == 'group':
+                grp['group_print_types'].add(code)
+                if len(grp['group_print_types']) > 2:
+                    student_errors.append({
+                       'raw_product': raw_product,
+                       'reason': "More than 2 different Group Print types selected"
                     })
-                     continue
+                    continue
                 
-                # Check Group Print Limit (>2 different types)
-                if p_type == 'group':
-                    grp['group_print_types'].add(code)
-                    if len(grp['group_print_types']) > 2:
-                        student_errors.append({
-                           'raw_product': raw_product,
-                           'reason': "More than 2 different Group Print types selected"
-                        })
-                        continue
-                    
-                    # Capture group photo data
-                    group_photo_data = ""
-                    if group_photo_col and pd.notna(row[group_photo_col]):
-                        group_photo_data = str(row[group_photo_col]).strip()
-                    
-                    # Accumulate group codes with photo data
-                    # Store each instance separately to preserve photo data
-                    if 'group_items' not in grp:
-                        grp['group_items'] = []
-                    
-                    # Add qty instances of this group print with its photo data
-                    for _ in range(qty):
-                        grp['group_items'].append({
-                            'code': code,
-                            'photo_data': group_photo_data
-                        })
-                    
-                    continue # Do NOT add to 'others' yet, we will add combined at end
-
-                # Add to 'others' list (CD, Touchup)
-                # Check for duplicates (ONLY 1 CD or Touchup allowed per choice group)
-                existing_type = next((x for x in grp['others'] if x['type'] == p_type), None)
-                if existing_type:
-                     student_errors.append({
-                        'raw_product': raw_product,
-                        'reason': f"Multiple {p_type.upper()} items selected (Only 1 allowed)"
+                # Accumulate group codes with photo data
+                # Store each instance separately to preserve photo data
+                # Add qty instances of this group print with its photo data
+                for _ in range(qty):
+                    grp['group_items'].append({
+                        'code': code,
+                        'photo_data': group_photo_data
                     })
-                     continue
-
-                grp['others'].append({
-                    'code': code,
-                    'type': p_type,
-                    'raw_product': raw_product
-                })
                 
-            elif p_type == 'unknown':
-                student_errors.append({
+                continue # Do NOT add to 'others' yet, we will add combined at end
+
+            # Add to 'others' list (CD, Touchup)
+            # Check for duplicates (ONLY 1 CD or Touchup allowed per choice group)
+            existing_type = next((x for x in grp['others'] if x['type'] == p_type), None)
+            if existing_type:
+                 student_errors.append({
                     'raw_product': raw_product,
-                    'reason': "Unknown Product Code (Not 5x7 or 8x10 Group, or recognized pkg)"
+                    'reason': f"Multiple {p_type.upper()} items selected (Only 1 allowed)"
                 })
+                 continue
 
-        # Post-process: Assign target boxes for 'others' (Group logic)
-        final_choices = []
-        for key, data in choices_map.items():
+            grp['others'].append({
+                'code': code,
+                'type': p_type,
+                'raw_product': raw_product
+            })
             
-            # If we have accumulated group items, add them individually with photo data
-            if data.get('group_items'):
-                for item in data['group_items']:
-                    code = item['code']
-                    photo_data = item['photo_data']
-                    
-                    # Format: code(photo_data) if photo_data exists, otherwise just code
-                    if photo_data:
-                        formatted_code = f"{code}({photo_data})"
-                    else:
-                        formatted_code = code
-                    
-                    data['others'].append({
-                        'code': formatted_code,
-                        'type': 'group',
-                        'raw_product': f'Group Print {code.upper()}'
-                    })
+        elif p_type == 'unknown':
+            student_errors.append({
+                'raw_product': raw_product,
+                'reason': "Unknown Product Code (Not 5x7 or 8x10 Group, or recognized pkg)"
+            })
 
-            # Process 'others' to resolve Group Print box location
-            processed_others = []
-            for item in data['others']:
-                p_type = item['type']
-                target_box = None
+    # Post-process: Assign target boxes for 'others' (Group logic)
+    final_choices = []
+    for key, data in choices_map.items():
+        
+        # If we have accumulated group items, add them individually with photo data
+        if data.get('group_items'):
+            for item in data['group_items']:
+                code = item['code']
+                photo_data = item['photo_data']
                 
-                if p_type == 'cd':
-                    target_box = 'cd_box'
-                elif p_type == 'touchup':
-                    target_box = 'touchup'
-                elif p_type == 'group':
-                    if student_has_standard_package:
-                        target_box = 'class_pkg_box'
-                    else:
-                        target_box = 'class_pix_no_pkg_box'
+                # Format: code(photo_data) if photo_data exists, otherwise just code
+                if photo_data:
+                    formatted_code = f"{code}({photo_data})"
+                else:
+                    formatted_code = code
                 
-                item['target_box'] = target_box
-                processed_others.append(item)
-            
-            
-            # Only add this choice group if it has actual content (standard packages or valid other items)
-            if data['standard_string'] or processed_others:
-                final_choices.append({
-                    'photo_choice': data['real_choice'], # Can be None
-                    'standard_string': data['standard_string'],
-                    'others': processed_others
+                data['others'].append({
+                    'code': formatted_code,
+                    'type': 'group',
+                    'raw_product': f'Group Print {code.upper()}'
                 })
 
-        processed_data.append({
-            'id': sid,
-            'last_name': last_name,
-            'choices_groups': final_choices,
-            'errors': student_errors
-        })
+        # Process 'others' to resolve Group Print box location
+        processed_others = []
+        for item in data['others']:
+            p_type = item['type']
+            target_box = None
+            
+            if p_type == 'cd':
+                target_box = 'cd_box'
+            elif p_type == 'touchup':
+                target_box = 'touchup'
+            elif p_type == 'group':
+                if student_has_standard_package:
+                    target_box = 'class_pkg_box'
+                else:
+                    target_box = 'class_pix_no_pkg_box'
+            
+            item['target_box'] = target_box
+            processed_others.append(item)
         
-    return processed_data
+        
+        # Only add this choice group if it has actual content (standard packages or valid other items)
+        if data['standard_string'] or processed_others:
+            final_choices.append({
+                'photo_choice': data['real_choice'], # Can be None
+                'standard_string': data['standard_string'],
+                'others': processed_others
+            })
+
+    return {
+        'id': sid,
+        'last_name': last_name,
+        'choices_groups': final_choices,
+        'errors': student_errors
+    }
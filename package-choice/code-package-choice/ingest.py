@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+from excel_utils import find_column_robust
+from parse_cache import read_excel_cached
+
+PROFILE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "header_profiles.json")
+CHUNK_ROWS = 5000                     # Rows parsed at a time by read_export_chunks
+CHUNKED_MIN_BYTES = 64 * 1024 * 1024  # Exports this big are streamed in chunks by default
+
+# Added by read_exports so merged rows can be traced back to their export
+SOURCE_FILE_COLUMN = "Source File"
+SOURCE_ROW_COLUMN = "Source Row"     # Row number in that file (header is row 1)
+
+_FLOAT_ID = re.compile(r"^(\d+)\.0+$")
+
+def normalize_id(value):
+    """
+    Student ID as the text typed into the search box, or None if missing.
+    IDs that went through a float ("12345.0", 12345.0) lose the ".0".
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    if not text or text.lower() == "nan":
+        return None
+    match = _FLOAT_ID.match(text)
+    return match.group(1) if match else text
+
+def normalize_ids(values):
+    """
+    normalize_id over a column; distinct values are normalized once.
+    Returns: object Series aligned with values (None for missing IDs).
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    normalized = [normalize_id(u) for u in uniques]
+    return pd.Series([normalized[c] for c in codes], index=values.index, dtype=object)
+
+def read_header(excel_path):
+    """
+    Column names of the sheet exactly as pd.read_excel names them (header row only).
+    Kept in the parse cache, so a cached export isn't opened at all.
+    """
+    return list(read_excel_cached(excel_path, nrows=0).columns)
+
+def header_signature(columns, roles):
+    payload = json.dumps([[str(c) for c in columns], roles], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def _load_profiles(profile_path):
+    if not os.path.exists(profile_path):
+        return {}
+    try:
+        with open(profile_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {} # Unreadable profiles are rebuilt
+
+def resolve_roles(columns, roles, profile_path=None):
+    """
+    Maps each role (e.g. 'student_id') to a column of this export layout.
+    roles: {role: keyword or list of keywords}, matched like find_column_robust.
+
+    The mapping is worked out once per header layout and saved in header_profiles.json
+    (as column positions), so later reads of the same layout skip the keyword scan.
+    A saved profile can be edited by hand if a column was picked wrongly.
+    profile_path: defaults to PROFILE_FILE.
+
+    Returns: {role: column name or None}
+    """
+    profile_path = profile_path or PROFILE_FILE
+    signature = header_signature(columns, roles)
+    profiles = _load_profiles(profile_path)
+    profile = profiles.get(signature)
+    if profile is not None:
+        return {role: columns[pos] if pos is not None and pos < len(columns) else None
+                for role, pos in profile['roles'].items()}
+
+    header_df = pd.DataFrame(columns=columns)
+    mapping = {role: find_column_robust(header_df, keywords) for role, keywords in roles.items()}
+    profiles[signature] = {
+        'header': [str(c) for c in columns],
+        'roles': {role: columns.index(col) if col is not None else None for role, col in mapping.items()},
+    }
+    try:
+        # Written whole and swapped in, so a tool reading it never sees half a file
+        tmp_path = f"{profile_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(profiles, f, indent=2)
+        os.replace(tmp_path, profile_path)
+    except OSError as e:
+        print(f"Note: header profile not saved ({e})")
+    return mapping
+
+def read_export(excel_path, roles, dtypes=None, all_columns=False):
+    """
+    Reads an export with only the role columns (unless all_columns) and explicit dtypes.
+    dtypes: {role: dtype}; roles without one keep pandas' per-cell types
+    (e.g. dates, which are parsed later with their own format rules).
+
+    Returns: (df, {role: column name or None})
+    """
+    columns = read_header(excel_path)
+    return _read_columns(excel_path, columns, resolve_roles(columns, roles), dtypes, all_columns)
+
+def _read_columns(excel_path, columns, mapping, dtypes=None, all_columns=False):
+    # read_export once the header (`columns`) is mapped to roles
+    found = [col for col in mapping.values() if col is not None]
+    read_kwargs = {}
+    if not all_columns:
+        # By position: header names can be numbers, which usecols would take as positions
+        read_kwargs['usecols'] = sorted({columns.index(col) for col in found})
+    col_dtypes = {mapping[role]: dtype for role, dtype in (dtypes or {}).items() if mapping.get(role) is not None}
+    if col_dtypes:
+        read_kwargs['dtype'] = col_dtypes
+    if not found and not all_columns:
+        return pd.DataFrame(), mapping
+    return read_excel_cached(excel_path, **read_kwargs), mapping
+
+def _read_export_job(job):
+    # Runs in a worker process (module level so it can be pickled)
+    return _read_columns(*job)
+
+def read_exports(excel_paths, roles, dtypes=None, all_columns=False, workers=None):
+    """
+    read_export for several exports (e.g. one per school), parsed in parallel with
+    one process per file up to the number of CPU cores, then stacked in file order.
+    Role columns are renamed to the first name found for the role, so exports whose
+    headers differ a little still line up. Every row is tagged with SOURCE_FILE_COLUMN
+    and SOURCE_ROW_COLUMN.
+
+    Returns: (df with a fresh index, {role: column name or None})
+    """
+    # Roles are resolved here, one file after the other: workers saving header_profiles.json
+    # at the same time would each drop the profiles the others just added
+    jobs = []
+    for path in excel_paths:
+        columns = read_header(path)
+        jobs.append((path, columns, resolve_roles(columns, roles), dtypes, all_columns))
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_read_export_job, jobs))
+    else:
+        results = [_read_export_job(job) for job in jobs]
+
+    mapping = {role: None for role in roles}
+    for _, file_mapping in results:
+        for role, col in file_mapping.items():
+            if mapping[role] is None:
+                mapping[role] = col
+
+    frames = []
+    for path, (df, file_mapping) in zip(excel_paths, results):
+        name = os.path.basename(path)
+        missing = [role for role, col in file_mapping.items() if col is None and mapping[role] is not None]
+        if missing:
+            print(f"Warning: {name} has no column for: {', '.join(missing)}")
+        renames = {col: mapping[role] for role, col in file_mapping.items() if col is not None and col != mapping[role]}
+        df = df.rename(columns=renames)
+        df[SOURCE_FILE_COLUMN] = name
+        df[SOURCE_ROW_COLUMN] = df.index + 2
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True), mapping
+
+def use_chunked(excel_path, chunked=None):
+    """
+    Whether to stream this export in chunks: as asked (True/False), else only for big files.
+    """
+    if chunked is not None:
+        return chunked
+    return os.path.getsize(excel_path) >= CHUNKED_MIN_BYTES
+
+def _convert_cell(cell):
+    # Same rules as pandas' openpyxl reader, so chunks parse exactly like read_excel
+    if cell.value is None:
+        return ""
+    if cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n":
+        as_int = int(cell.value)
+        return as_int if as_int == cell.value else float(cell.value)
+    return cell.value
+
+def _parse_chunk(header, rows, positions, usecols, col_dtypes):
+    # Cells past the header get "Unnamed: n" columns, as in a full read
+    width = max(len(header), max(len(row) for row in rows))
+    data = [row + [""] * (width - len(row)) for row in [header] + rows]
+    df = TextParser(data, header=0, dtype=col_dtypes or None, usecols=usecols, skip_blank_lines=False).read()
+    df.index = pd.Index(positions)
+    return df
+
+def read_export_chunks(excel_path, roles, dtypes=None, all_columns=False, chunk_rows=CHUNK_ROWS):
+    """
+    Like read_export, but the sheet is read row by row (openpyxl read-only mode) and
+    handed out as DataFrames of up to chunk_rows rows, so memory stays flat however
+    big the export is. Each chunk is indexed by row position in the sheet, the same
+    index a full read_excel gives; blank rows are skipped. A chunk only has the
+    "Unnamed: n" columns of cells past the header that it contains itself.
+    Chunks are not kept in the parse cache.
+
+    Returns: ({role: column name or None}, iterator of DataFrames)
+    """
+    from openpyxl import load_workbook
+
+    columns = read_header(excel_path)
+    mapping = resolve_roles(columns, roles)
+    found = [col for col in mapping.values() if col is not None]
+    usecols = None if all_columns else sorted({columns.index(col) for col in found})
+    col_dtypes = {mapping[role]: dtype for role, dtype in (dtypes or {}).items() if mapping.get(role) is not None}
+
+    def read_rows(sheet):
+        for row in sheet.iter_rows():
+            values = [_convert_cell(cell) for cell in row]
+            while values and values[-1] == "":
+                values.pop() # Trailing empty cells, as pandas trims them
+            yield values
+
+    def chunks():
+        if not found and not all_columns:
+            return
+        book = load_workbook(excel_path, read_only=True, data_only=True, keep_links=False)
+        try:
+            sheet = book.worksheets[0]
+            sheet.reset_dimensions() # Some exporters write wrong sheet dimensions
+            rows = read_rows(sheet)
+            header = next(rows, [])
+            batch, positions = [], []
+            for pos, values in enumerate(rows):
+                if not values:
+                    continue
+                batch.append(values)
+                positions.append(pos)
+                if len(batch) >= chunk_rows:
+                    yield _parse_chunk(header, batch, positions, usecols, col_dtypes)
+                    batch, positions = [], []
+            if batch:
+                yield _parse_chunk(header, batch, positions, usecols, col_dtypes)
+        finally:
+            book.close()
+
+    return mapping, chunks()
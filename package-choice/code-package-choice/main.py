@@ -1,15 +1,34 @@
-import pyautogui
+import argparse
 import json
-import time
 import os
-import pyperclip
-import pandas as pd
 from datetime import datetime
-from data_handler_package import load_and_process_data
+import pandas as pd
+from data_handler_package import load_and_process_data, iter_students
+from student_stream import stream_in_background
+from ui_driver import get_driver, FailSafeException
+from ui_waits import read_field_text, LOAD_TIMEOUT
+from checkpoint_journal import CheckpointJournal
+from session_store import get_session, close_sessions
+from run_timing import RunTimer, format_duration
+from text_entry import TextEntry, METHODS, AUTO, TYPE
+from pacing import PACING
+from retry_queue import RetryQueue, RETRY_PASSES
+from verification import VerificationScheduler, VERIFY_EVERY, DETECT_WITHIN, RELOAD_TIMEOUT
+from roster import load_roster, ROSTER_OK, ROSTER_MISSING, ROSTER_MISMATCH
+from action_plan import (PLAN_FILE, compile_student, compile_choice_groups, run_ops, search,
+                         save_plan, load_plan, diff_plans, estimate_seconds)
 
 COORD_FILE = os.path.join(os.path.dirname(__file__), "coordinates_package.json")
+JOURNAL_FILE = os.path.join(os.path.dirname(__file__), "run_journal.jsonl")
+SESSION_TOOL = "package" # This tool's sessions in the shared store (session_store.py)
 SESSION_TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 
+# How text goes into each field (text_entry.py); unlisted fields use TEXT_ENTRY.default (--input)
+FIELD_INPUT_METHODS = {
+    'touchup_dropdown': TYPE, # Dropdown-style box: typing lets it match "Pending" as it goes
+}
+TEXT_ENTRY = TextEntry(FIELD_INPUT_METHODS)
+
 def load_coordinates():
     if not os.path.exists(COORD_FILE):
         print("Error: coordinates_package.json not found. Run config_wizard_package.py first!")
@@ -17,11 +36,10 @@ def load_coordinates():
     with open(COORD_FILE, "r") as f:
         return json.load(f)
 
+ERROR_FIELDS = ["student_id", "last_name", "product_raw", "error_reason", "timestamp"]
+
 def log_error(student_id, last_name, product_raw, reason):
-    reports_dir = "reports"
-    if not os.path.exists(reports_dir):
-        os.makedirs(reports_dir)
-    filename = os.path.join(reports_dir, f"package-errors-{SESSION_TIMESTAMP}.csv")
+    filename = os.path.join("reports", f"package-errors-{SESSION_TIMESTAMP}.csv")
     
     entry = {
         "student_id": student_id,
@@ -31,30 +49,81 @@ def log_error(student_id, last_name, product_raw, reason):
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
     
-    df = pd.DataFrame([entry])
-    header = not os.path.exists(filename)
+    # Batched into the session store; the CSV is exported from it at the end
     try:
-        df.to_csv(filename, mode='a', header=header, index=False)
+        get_session(SESSION_TOOL, SESSION_TIMESTAMP).error(filename, entry, student_id, reason)
     except Exception as e:
         print(f"Failed to log error: {e}")
 
-def click_and_type(coord, text):
-    if not coord:
-        return
-    pyautogui.click(coord['x'], coord['y'])
-    pyautogui.tripleClick()
-    time.sleep(0.05)
-    
-    pyautogui.typewrite(str(text))
-    time.sleep(0.05)
+def log_entered(student_id, rows):
+    """
+    Logs what went in for a student whose packages were entered: rows are the student's
+    build_verification_rows (one per choice group), exported to the entered report.
+    """
+    filename = os.path.join("reports", f"package-entered-{SESSION_TIMESTAMP}.csv")
+    try:
+        session = get_session(SESSION_TOOL, SESSION_TIMESTAMP)
+        for row in rows:
+            session.entered(filename, row, student_id)
+        if not rows:
+            session.student(student_id, 'entered')
+    except Exception as e:
+        print(f"Failed to log entered student: {e}")
 
-def run_automation():
+def check_roster(sid, lname, roster):
+    """
+    Offline check against the School Days roster (roster.py), before any search.
+    Logs the error and returns False for a student the app would reject.
+    """
+    status, roster_name = roster.check(sid, lname)
+    if status == ROSTER_MISSING:
+        print(f"  -> ROSTER: Student ID {sid} is not in the roster. Skipping.")
+        log_error(sid, lname, "ALL", "Student ID not found in roster")
+        return False
+    if status == ROSTER_MISMATCH:
+        print(f"  -> ROSTER NAME MISMATCH: Roster has '{roster_name}', Expected '{lname}'")
+        log_error(sid, lname, "ALL", f"Name Mismatch (Roster: {roster_name})")
+        return False
+    return True
+
+def compile_plan(students, coords):
+    """
+    Yields one plan block (action_plan.py) per student, as students arrive.
+    """
+    for student in students:
+        yield compile_student(student, coords, build_verification_rows(student))
+
+def dry_run(coords, chunked=None):
+    """
+    Compiles every student without touching the app: prints what changed since the
+    last saved plan and an estimated run time, then saves the plan for `--plan`.
+    """
+    students = load_and_process_data(None, chunked) # Auto-finds Excel
+    if not students:
+        print("No student data found or processed.")
+        return False
+    blocks = list(compile_plan(students, coords))
+    new_ids, changed, removed = diff_plans(load_plan(), blocks)
+    print(f"Plan: {len(blocks)} students, {sum(len(b['ops']) for b in blocks)} UI steps")
+    print(f"Changes since the last plan: {len(new_ids)} new, {len(changed)} changed, {len(removed)} removed")
+    to_run = blocks
+    roster = load_roster()
+    if roster is not None:
+        to_run = [b for b in blocks if not b['ops'] or roster.check(b['id'], b['last_name'])[0] == ROSTER_OK]
+        print(f"Roster: {len(blocks) - len(to_run)} student(s) will be skipped without searching")
+    seconds = estimate_seconds(to_run, coords, TEXT_ENTRY)
+    print(f"Estimated run time: {format_duration(seconds)} (simulated app with default latencies)")
+    save_plan(blocks)
+    print(f"saved action plan to: {PLAN_FILE} (run it with --plan)")
+    return True
+
+def run_automation(stream=True, driver=None, resume=False, chunked=None, adaptive_pacing=True, plan=False,
+                   trust_roster=False, verify_every=VERIFY_EVERY, verify_confidence=None,
+                   retry_passes=RETRY_PASSES):
     coords = load_coordinates()
     if not coords:
         return False
 
-    pyautogui.FAILSAFE = True # Enabled by default, but making it explicit
-    
     print("--- READY TO START PACKAGE ENTRY ---")
     print("1. Ensure School Days app is open and ready.")
     print("2. IMPORTANT: Manually CHECK all input boxes (like Touchup) so they are editable!")
@@ -62,236 +131,355 @@ def run_automation():
     print("4. OR click on this Terminal window and press Ctrl+C.")
     print("------------------------------------")
     
-    students = load_and_process_data(None) # Auto-finds Excel
+    total = None
+    if plan:
+        # The plan saved by --dry-run, exactly as compiled then
+        blocks = load_plan()
+        if not blocks:
+            print("Error: action_plan.jsonl not found or empty. Run main.py --dry-run first!")
+            return False
+        print(f"Loaded a plan of {len(blocks)} students.")
+        total = len(blocks)
+        blocks = iter(blocks)
+    elif not stream:
+        students = load_and_process_data(None, chunked) # Auto-finds Excel
+        if not students:
+            print("No student data found or processed.")
+            return False
+        print(f"Loaded {len(students)} students to process.")
+        total = len(students)
+        blocks = compile_plan(students, coords)
 
-    if not students:
-        print("No student data found or processed.")
-        return False
-        
-    print(f"Loaded {len(students)} students to process.")
-    
-    # Generate Verification Excel
-    print("Generating Processed Student Data Report...")
-    reports_dir = "reports"
-    if not os.path.exists(reports_dir):
-        os.makedirs(reports_dir)
-        
+    # Verification report rows are collected as students flow through the loop
     verif_data = []
-    for s in students:
-        sid = s['id']
-        lname = s['last_name']
-        for grp in s.get('choices_groups', []):
-            # Organize items by target box
-            quick_pkg = grp['standard_string']
-            cd_value = ""
-            touchup_value = ""
-            class_pix = ""
-            class_pix_no_pkg = ""
-            
-            # Process other items and group by target box
-            for item in grp['others']:
-                # Skip error items
-                if 'lost order' in item['raw_product'].lower() or 'invalid' in item['raw_product'].lower():
-                    continue
-                    
-                target_box = item.get('target_box', '')
-                code = item['code']
+
+    # Crash-safe record of finished students (fresh unless resuming)
+    journal = CheckpointJournal(JOURNAL_FILE, resume=resume)
+    if resume:
+        print(f"Resuming: {len(journal.finished)} student(s) already finished will be skipped.")
+    # Students the roster rules out are logged without searching them
+    roster = load_roster()
+    # Delays learned on this machine in earlier runs (pacing_profile.json)
+    if adaptive_pacing:
+        PACING.load_profile()
+    driver = driver or get_driver(pause=PACING.delay('ui_pause'))
+    PACING.attach(driver)
+    timer = RunTimer(driver.now, total=total)
+    if stream and not plan:
+        # Students are built in the background while the countdown runs and the first ones are entered;
+        # the ETA shows once the producer has read them all
+        blocks = compile_plan(stream_in_background(iter_students(None, chunked), on_done=timer.set_total),
+                              coords) # Auto-finds Excel
+    verifier = VerificationScheduler(verify_every, verify_confidence)
+    retries = RetryQueue(retry_passes)
+    try:
+        return run_plan(blocks, coords, verif_data, driver, journal, timer, roster, trust_roster, verifier,
+                        retries)
+    finally:
+        journal.close()
+        print(f"Verification: {verifier.summary()}")
+        PACING.save_profile()
+        print(f"Pacing: {PACING.summary()}")
+        # Drain anything the loop did not reach (abort/validation stop) so the report stays complete
+        for block in blocks:
+            verif_data.extend(block['report'])
+        save_verification_report(verif_data)
+        close_sessions() # Save the session and export its reports (also runs at exit)
+        timer.print_report()
+        timing_file = timer.save(os.path.join("reports", f"package-timing-{SESSION_TIMESTAMP}.json"))
+        print(f"saved timing report to: {timing_file}")
+
+def build_verification_rows(student):
+    """
+    Returns the Processed Student Data Report rows (one per choice group) for a student.
+    """
+    rows = []
+    sid = student['id']
+    lname = student['last_name']
+    for grp in student.get('choices_groups', []):
+        # Organize items by target box
+        quick_pkg = grp['standard_string']
+        cd_value = ""
+        touchup_value = ""
+        class_pix = ""
+        class_pix_no_pkg = ""
+        
+        # Process other items and group by target box
+        for item in grp['others']:
+            # Skip error items
+            if 'lost order' in item['raw_product'].lower() or 'invalid' in item['raw_product'].lower():
+                continue
                 
-                if target_box == 'cd_box':
-                    cd_value = code
-                elif target_box == 'touchup':
-                    touchup_value = "Pending"  # Always "Pending" for touchup
-                elif target_box == 'class_pkg_box':
-                    # Append to class_pix (may have multiple group prints)
-                    if class_pix:
-                        class_pix += ", " + code
-                    else:
-                        class_pix = code
-                elif target_box == 'class_pix_no_pkg_box':
-                    # Append to class_pix_no_pkg
-                    if class_pix_no_pkg:
-                        class_pix_no_pkg += ", " + code
-                    else:
-                        class_pix_no_pkg = code
-            
-            verif_data.append({
-                'Student ID': sid,
-                'Last Name': lname,
-                'Photo Choice': grp['photo_choice'] if grp['photo_choice'] else "(NONE)",
-                'Quick Package Entry': quick_pkg,
-                'CD': cd_value,
-                'Touchup': touchup_value,
-                'Class Pix': class_pix,
-                'Class Pix No Pkg': class_pix_no_pkg
-            })
+            target_box = item.get('target_box', '')
+            code = item['code']
             
-    if verif_data:
-        v_df = pd.DataFrame(verif_data)
-        v_file = os.path.join(reports_dir, f"package_choices_processed_data-{SESSION_TIMESTAMP}.xlsx")
-        v_df.to_excel(v_file, index=False)
+            if target_box == 'cd_box':
+                cd_value = code
+            elif target_box == 'touchup':
+                touchup_value = "Pending"  # Always "Pending" for touchup
+            elif target_box == 'class_pkg_box':
+                # Append to class_pix (may have multiple group prints)
+                if class_pix:
+                    class_pix += ", " + code
+                else:
+                    class_pix = code
+            elif target_box == 'class_pix_no_pkg_box':
+                # Append to class_pix_no_pkg
+                if class_pix_no_pkg:
+                    class_pix_no_pkg += ", " + code
+                else:
+                    class_pix_no_pkg = code
+        
+        rows.append({
+            'Student ID': sid,
+            'Last Name': lname,
+            'Photo Choice': grp['photo_choice'] if grp['photo_choice'] else "(NONE)",
+            'Quick Package Entry': quick_pkg,
+            'CD': cd_value,
+            'Touchup': touchup_value,
+            'Class Pix': class_pix,
+            'Class Pix No Pkg': class_pix_no_pkg
+        })
+    return rows
+
+def save_verification_report(verif_data):
+    """
+    Processed Student Data Report: what was planned for every student read, entered or not
+    (what actually went in is in the session's entered report, see log_entered).
+    """
+    if not verif_data:
+        return
+    print("Generating Processed Student Data Report...")
+    v_file = os.path.join("reports", f"package_choices_processed_data-{SESSION_TIMESTAMP}.xlsx")
+    try:
+        os.makedirs("reports", exist_ok=True)
+        pd.DataFrame(verif_data).to_excel(v_file, index=False)
         print(f"saved processed data file to: {v_file}")
+    except Exception as e:
+        print(f"Failed to save processed data file: {e}")
+
+def run_entry_loop(students, coords, verif_data, driver, journal=None, timer=None, verifier=None, retries=None,
+                   text_entry=None):
+    """
+    Enters every student's packages through the given UI driver (real pyautogui or the fake app),
+    compiling each student's plan block as it is reached (see run_plan).
+    """
+    return run_plan(compile_plan(students, coords), coords, verif_data, driver, journal, timer,
+                    verifier=verifier, retries=retries, text_entry=text_entry)
 
+def run_plan(blocks, coords, verif_data, driver, journal=None, timer=None, roster=None, trust_roster=False,
+             verifier=None, retries=None, text_entry=None):
+    """
+    Runs plan blocks (action_plan.py) one student at a time.
+    Students the verifier (a VerificationScheduler; default settings if not given) picks
+    are searched again and read back; the run stops when it says so.
+    Verification report rows are appended to verif_data as students are reached.
+    Finished students are written to the journal; ones it already has are skipped.
+    With a `roster` (a RosterIndex), students it rules out are logged without a search;
+    trust_roster also skips the live last-name check for the others, unless the record
+    wasn't seen changing after the search (then the name is read as usual).
+    Students whose last name doesn't show up right are entered again at the end with
+    longer waits (`retries`, a RetryQueue; default settings if not given).
+    Each step is timed per student on `timer` (a RunTimer; one is made if not given).
+    Text goes in through `text_entry` (a TextEntry; TEXT_ENTRY if not given), whose
+    pacing (a PacingController) times the waits.
+    """
     print("Starting in 3 seconds...")
-    time.sleep(3)
-    
-    validated_first_student = False
+    driver.sleep(3)
+    if timer is None:
+        timer = RunTimer(driver.now)
+    if verifier is None:
+        verifier = VerificationScheduler()
+    if retries is None:
+        retries = RetryQueue()
+    if text_entry is None:
+        text_entry = TEXT_ENTRY
 
-    for student in students:
-        sid = student['id']
-        lname = student['last_name']
-        choice_groups = student.get('choices_groups', [])
-        errors = student.get('errors', [])
+    processed_count = 0
+    resumed_count = 0
+    roster_skipped = 0
+    for block in retries.run(blocks, driver):
+        sid = block['id']
+        lname = block['last_name']
+        errors = block['errors'] if not retries.attempt else [] # Logged the first time
+        if not retries.attempt:
+            processed_count += 1
+            verif_data.extend(block['report'])
+
+        if journal and journal.is_finished(sid, block['hash']):
+            resumed_count += 1
+            timer.skip_student()
+            continue
         
+        timer.start_student()
         print(f"Processing: {sid} - {lname}")
         
         # 0. Log pre-existing errors (from data_handler logic)
         if errors:
             print(f"  ⚠️  {len(errors)} error(s) logged for this student")
-        for err in errors:
-            log_error(sid, lname, err['raw_product'], err['reason'])
+        for product, reason in errors:
+            log_error(sid, lname, product, reason)
+        timer.lap("log_errors")
             
-        if not choice_groups:
+        if not block['ops']:
             # If no valid groups to process, skip automation for this student
+            if journal: journal.record(sid, block['hash'], 'skipped')
             continue
+
+        # Offline roster check (no UI)
+        ops = block['ops']
+        if roster is not None:
+            if not check_roster(sid, lname, roster):
+                roster_skipped += 1
+                if journal: journal.record(sid, block['hash'], 'error')
+                continue
+            if trust_roster:
+                ops = [dict(op, trusted=True) if op['op'] == 'check_name' else op for op in ops]
         
-        # 1. Search Student
-        search_student(sid, coords)
-        time.sleep(0.3) # Wait for student to load
-
-        # 2. Validate Last Name (Optional)
-        if 'last_name_box' in coords and lname:
-            pyautogui.click(coords['last_name_box']['x'], coords['last_name_box']['y'])
-            pyautogui.tripleClick()
-            pyautogui.hotkey('ctrl', 'c')
-            time.sleep(0.1)
-            found_name = pyperclip.paste().strip()
-            
-            # Handle hyphenated names (App might select "Walsh-" with trailing hyphen)
-            expected_parts = lname.lower().split('-')
-            first_part = expected_parts[0].strip().lower()
-            first_part_with_hyphen = first_part + '-'
-            
-            # Allow match if found name is: full name, first part only, OR first part with hyphen
-            is_match = (found_name.lower() == lname.lower()) or \
-                       (found_name.lower() == first_part) or \
-                       (found_name.lower() == first_part_with_hyphen)
-            
-            if not is_match:
-                print(f"  -> NAME MISMATCH: Found '{found_name}', Expected '{lname}'")
-                log_error(sid, lname, "ALL", f"Name Mismatch (Found: {found_name})")
-                continue # Skip this student
-
-        # Track what we entered for validation
-        entry_for_validation = None
-
-        # 3. Process Each Yearbook Choice Group
-        for group in choice_groups:
-            photo_choice = group['photo_choice']
-            standard_string = group['standard_string']
-            other_items = group['others']
-            
-            # Process choice group silently
-
-            # A. Click Photo Choice Letter (Once per group)
-            if photo_choice:
-                choice_key = f"choice_{photo_choice}"
-                if choice_key in coords:
-                    pyautogui.click(coords[choice_key]['x'], coords[choice_key]['y'])
-                    time.sleep(0.1)
-                else:
-                    log_error(sid, lname, "Photo Choice", f"Coordinate for choice '{photo_choice}' not found")
-            else:
-                 # If None, we assume we skip this or default is acceptable
-                 pass
-                
-            # B. Input Standard Packages (The combined string, e.g. "xxyy")
-            if standard_string:
-                if 'quick_package_entry_box' in coords:
-                    click_and_type(coords['quick_package_entry_box'], standard_string)
-                    
-                    # Capture for validation if not yet validated
-                    if not validated_first_student:
-                        entry_for_validation = standard_string
-                else:
-                    log_error(sid, lname, "Standard Package", "'quick_package_entry_box' coordinate missing")
-            
-            # C. Input Other Items (Group, CD, Touchup) - processed individually
-            for item in other_items:
-                p_code = item['code']
-                target_box_name = item['target_box']
-                
-                if target_box_name:
-                    if target_box_name == 'touchup':
-                        if 'touchup_dropdown' in coords:
-                            click_and_type(coords['touchup_dropdown'], "Pending")
-                        else:
-                            log_error(sid, lname, "Touchup", "'touchup_dropdown' coordinate missing")
-
-                    elif target_box_name in coords:
-                         click_and_type(coords[target_box_name], p_code)
-                    else:
-                        log_error(sid, lname, item['raw_product'], f"Missing Coordinate: {target_box_name}")
-
-        # 4. Perform Validation Check (Only for the first successful standard entry)
-        if not validated_first_student and entry_for_validation:
-            print(f"\n*** VALIDATING FIRST ENTRY: {entry_for_validation} ***")
-            
-            # A. Re-Search Student (to refresh view)
-            search_student(sid, coords)
-            time.sleep(0.3) # Wait for student to load
+        # 1-3. Search, check the last name, enter each choice group
+        found_name = run_ops(driver, coords, ops, text_entry,
+                             lambda product, reason: log_error(sid, lname, product, reason), timer,
+                             retries.recheck_timeout())
+        if found_name is not None:
+            # Hyphen-aware (App might select "Walsh-" with trailing hyphen)
+            print(f"  -> NAME MISMATCH: Found '{found_name}', Expected '{lname}'")
+            if retries.retry(sid, block, found_name):
+                print("     Will try again at the end of the run.")
+                continue
+            log_error(sid, lname, "ALL", f"Name Mismatch (Found: {found_name})")
+            if journal: journal.record(sid, block['hash'], 'error')
+            continue # Skip this student
 
-            # B. Check the box
-            found_pkg = read_field_text(coords.get('quick_package_entry_box'))
-            
-            if found_pkg.lower() == entry_for_validation.lower():
-                print("✓ Validation passed")
-                validated_first_student = True
-            else:
-                print(f"✗ VALIDATION FAILED: Expected '{entry_for_validation}', Found '{found_pkg}'")
-                log_error(sid, lname, f"Standard Pkg: {entry_for_validation}", f"VALIDATION FAILED (Found: '{found_pkg}' in quick package entry box when it should be {entry_for_validation})")
+        # 4. Read-back check of a sample of students
+        verified = True
+        if block['validate'] and verifier.should_verify():
+            verified = verify_entries(driver, coords, sid, lname, block['validate'], text_entry)
+            timer.lap("verification")
+            if not verifier.record(verified):
+                print(f"[STOPPED] Read-back verification failed: {verifier.summary()}")
+                if journal: journal.record(sid, block['hash'], 'error')
                 return False
 
-        time.sleep(0.1) # Pause between students
+        if verified:
+            log_entered(sid, block['report'])
+        if journal: journal.record(sid, block['hash'], 'entered' if verified else 'error')
+
+    timer.finish_student() # Close out the last student
+
+    if resumed_count:
+        print(f"Skipped {resumed_count} student(s) finished in a previous run.")
+    if roster_skipped:
+        print(f"Skipped {roster_skipped} student(s) the roster ruled out, without searching them (see the error report).")
+    if retries.retried:
+        print(f"Retries: {retries.summary()}")
+
+    if not processed_count:
+        print("No student data found or processed.")
+        return False
 
     print("Automation Complete!")
     return True
 
-def search_student(sid, coords):
-    if 'search_box' in coords:
-        pyautogui.click(coords['search_box']['x'], coords['search_box']['y'])
-        pyautogui.doubleClick() 
-        pyautogui.typewrite(sid)
-        pyautogui.press('enter')
-        time.sleep(0.1) # Wait for load
+def enter_choice_groups(driver, coords, sid, lname, choice_groups, timer):
+    """
+    Enters every choice group of a student whose record is already on screen:
+    clicks the photo choice letter, then types the standard packages and other items.
+    Returns: the read-back list for verify_entries (empty if nothing checkable was entered).
+    """
+    ops, readback = compile_choice_groups(choice_groups, coords)
+    run_ops(driver, coords, ops, TEXT_ENTRY, lambda product, reason: log_error(sid, lname, product, reason), timer)
+    return readback
 
-def read_field_text(coord):
+def verify_entries(driver, coords, sid, lname, readback, text_entry=TEXT_ENTRY):
     """
-    Clicks field, Selects All, Copies to clipboard, returns text.
+    Re-searches the student (so we see what School Days saved) and reads back every box
+    in `readback` ([choice key, field, text, product] from compile_choice_groups),
+    clicking each photo choice first as the entry did.
+    Returns: True if all of them hold their text; each mismatch is logged.
     """
-    if not coord: return ""
+    print(f"\n*** VERIFYING ENTRY: {sid} ***")
     
-    # Click and focus
-    pyautogui.click(coord['x'], coord['y'])
+    # A. Re-Search Student (to refresh view)
+    search_student(driver, sid, coords, RELOAD_TIMEOUT, text_entry)
 
-    pyautogui.tripleClick()
-    time.sleep(0.1)
-    
-    # Clear clipboard first
-    pyperclip.copy("")
-    
-    # Copy
-    pyautogui.hotkey('ctrl', 'c') 
-    time.sleep(0.1)
-    
-    return pyperclip.paste().strip()
+    # B. Check the boxes
+    ok = check_entries(driver, coords, sid, lname, readback, text_entry.pacing)
+    if ok:
+        print("✓ Verification passed")
+    return ok
+
+def check_entries(driver, coords, sid, lname, readback, pacing=PACING):
+    """
+    The read-back part of verify_entries, for a student already searched again.
+    """
+    ok = True
+    active_choice = None
+    for choice_key, field, expected, product in readback:
+        if choice_key != active_choice:
+            driver.click(coords[choice_key]['x'], coords[choice_key]['y'])
+            pacing.wait(driver, 'photo_choice')
+            active_choice = choice_key
+        found = read_field_text(driver, coords.get(field))
+        if found.lower() != expected.strip().lower():
+            print(f"✗ VERIFICATION FAILED in {field}: Expected '{expected}', Found '{found}'")
+            log_error(sid, lname, product, f"VERIFICATION FAILED (Found: '{found}' in {field} when it should be {expected})")
+            ok = False
+    return ok
+
+def search_student(driver, sid, coords, timeout=LOAD_TIMEOUT, text_entry=TEXT_ENTRY):
+    """
+    Searches a student and waits until the record on screen has changed.
+    Returns: True if it was seen changing (False on timeout).
+    """
+    return search(driver, coords, sid, text_entry, timeout)
 
 import sys
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="School Days package entry automation")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Process the whole workbook before starting (old behavior)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip students finished before the last abort (see run_journal.jsonl)")
+    parser.add_argument("--chunked", action="store_true", default=None,
+                        help="Read the export in chunks to save memory (automatic for very large files)")
+    parser.add_argument("--input", choices=METHODS, default=AUTO,
+                        help="How text is put into fields without their own setting in FIELD_INPUT_METHODS "
+                             "(auto: paste long values, type short ones)")
+    parser.add_argument("--verify-entry", action="store_true",
+                        help="Read every field back after entering it (slower)")
+    parser.add_argument("--verify-every", type=int, default=VERIFY_EVERY, metavar="N",
+                        help=f"Search every Nth student again and read its boxes back (default {VERIFY_EVERY}; 1 = all)")
+    parser.add_argument("--verify-confidence", type=float, metavar="C",
+                        help=f"Read back a random sample instead, sized so a fault is caught within "
+                             f"{DETECT_WITHIN} students with probability C (e.g. 0.95)")
+    parser.add_argument("--retry-passes", type=int, default=RETRY_PASSES, metavar="N",
+                        help=f"Passes at the end over students whose record seemed slow to load (default {RETRY_PASSES}; 0 = none)")
+    parser.add_argument("--fixed-pacing", action="store_true",
+                        help="Keep the default delays instead of tuning them (see pacing_profile.json)")
+    parser.add_argument("--trust-roster", action="store_true",
+                        help="Skip the live last-name check for students roster.xlsx/roster.csv confirms (faster)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Compile the action plan, show changes and an estimated run time, and stop")
+    parser.add_argument("--plan", action="store_true",
+                        help="Run the plan saved by --dry-run instead of reading the export "
+                             "(add --resume after a crash)")
+    args = parser.parse_args()
+    TEXT_ENTRY.default = args.input
+    TEXT_ENTRY.verify = args.verify_entry or ()
     try:
-        if not run_automation():
+        if args.dry_run:
+            coords = load_coordinates()
+            ok = bool(coords) and dry_run(coords, args.chunked)
+        else:
+            ok = run_automation(stream=not args.no_stream, resume=args.resume, chunked=args.chunked,
+                                adaptive_pacing=not args.fixed_pacing, plan=args.plan,
+                                trust_roster=args.trust_roster, verify_every=args.verify_every,
+                                verify_confidence=args.verify_confidence,
+                                retry_passes=args.retry_passes)
+        if not ok:
             sys.exit(1)
-    except pyautogui.FailSafeException:
+    except FailSafeException:
         print("\n[EMERGENCY STOP] Failsafe triggered by moving mouse to corner.")
         sys.exit(1)
     except KeyboardInterrupt:
@@ -0,0 +1,81 @@
+import json
+import os
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+CATALOG_FILE = os.path.join(os.path.dirname(__file__), "product_catalog.json")
+
+PRODUCT_TYPES = ['standard', 'group', 'cd', 'touchup', 'unknown', 'ignore']
+
+def normalize_text(text):
+    if pd.isna(text):
+        return ""
+    return str(text).strip().lower()
+
+def load_catalog(path=CATALOG_FILE):
+    """
+    Reads the product rules from the catalog JSON and checks their shape.
+    Returns: list of rule dicts in priority order.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+
+    rules = catalog.get('products', [])
+    for i, rule in enumerate(rules):
+        label = rule.get('name', f"rule #{i + 1}")
+        if rule.get('type') not in PRODUCT_TYPES:
+            raise ValueError(f"Catalog {label}: unknown type '{rule.get('type')}'")
+        if not rule.get('equals') and not rule.get('match'):
+            raise ValueError(f"Catalog {label}: needs 'equals' or 'match'")
+        for alternative in rule.get('match', []):
+            if not isinstance(alternative, list) or not alternative:
+                raise ValueError(f"Catalog {label}: each 'match' entry must be a non-empty list of texts")
+    return rules
+
+def classify_normalized(p, rules):
+    """
+    Returns (code, type) for an already normalized product name.
+    First matching rule wins; no match -> (None, 'unknown').
+    """
+    for rule in rules:
+        if p in rule.get('equals', []):
+            return rule['code'], rule['type']
+        for alternative in rule.get('match', []):
+            if all(part in p for part in alternative):
+                return rule['code'], rule['type']
+    return None, 'unknown'
+
+@lru_cache(maxsize=None)
+def _default_rules():
+    return tuple(load_catalog())
+
+@lru_cache(maxsize=4096)
+def classify_product(p):
+    """
+    Cached classification against the default catalog (one call per distinct name).
+    """
+    return classify_normalized(p, _default_rules())
+
+def classify_products(values):
+    """
+    Classifies a whole product column.
+    Each distinct raw value is normalized and classified once, then mapped back.
+
+    Returns: DataFrame with categorical 'product_code' and 'product_type' columns,
+    aligned row-for-row with values.
+    """
+    values = pd.Series(values, dtype=object).reset_index(drop=True)
+    row_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+
+    results = [classify_product(normalize_text(u)) for u in uniques]
+    code_cats = pd.Index(sorted({c for c, _ in results if c is not None}))
+
+    # Missing codes (ignore/unknown) stay as -1 -> NaN in the categorical
+    unique_code_ids = np.array([code_cats.get_loc(c) if c is not None else -1 for c, _ in results], dtype=np.int64)
+    unique_type_ids = np.array([PRODUCT_TYPES.index(t) for _, t in results], dtype=np.int64)
+
+    return pd.DataFrame({
+        'product_code': pd.Categorical.from_codes(unique_code_ids[row_codes], categories=code_cats),
+        'product_type': pd.Categorical.from_codes(unique_type_ids[row_codes], categories=PRODUCT_TYPES),
+    })
@@ -0,0 +1,58 @@
+import csv
+import os
+import time
+
+class ReportWriter:
+    """
+    Keeps one CSV report open for the whole run and writes rows in batches.
+
+    Columns are fixed by `fieldnames` (or the first row's keys), so every row has the
+    same shape: missing keys are left blank and unknown keys are dropped.
+    A header is written only when the file is new, like the old to_csv(mode='a') calls.
+    Buffered rows are flushed every `flush_rows` rows or `flush_seconds`, and on close().
+    """
+    def __init__(self, path, fieldnames=None, flush_rows=50, flush_seconds=2.0):
+        # Anchor relative paths now, not at the first (possibly much later) flush
+        self.path = os.path.abspath(path)
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.file = None
+        self.writer = None
+        self.last_flush = time.monotonic()
+
+    def _open(self):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.file = open(self.path, "a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames,
+                                     extrasaction="ignore", restval="",
+                                     lineterminator=os.linesep) # Same line endings as pandas to_csv
+        if is_new:
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fieldnames is None:
+            self.fieldnames = list(row.keys())
+        self.buffer.append(row)
+        if len(self.buffer) >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            if self.file is None:
+                self._open()
+            self.writer.writerows(self.buffer)
+            self.buffer = []
+            self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
@@ -0,0 +1,137 @@
+import json
+import os
+
+def percentile(values, pct):
+    """
+    Linear-interpolated percentile (pct in 0-100) of a list of numbers.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100.0
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m {seconds % 60:02d}s"
+
+class RunTimer:
+    """
+    Times each step of the entry loop per student using the driver's clock
+    (real time for pyautogui, virtual time for the fake app).
+
+    Call start_student() when a student begins (it also finishes the previous
+    one, so loops with many `continue`s need no extra bookkeeping), lap("step")
+    after each step (the time since the previous lap is charged to that step)
+    and finish_student() after the loop. skip_student() counts a student that
+    needs no work (e.g. already journaled) towards the total without timing it.
+    Every `progress_every` students a progress line with students/min and ETA
+    is printed (ETA needs `total`; while streaming it is set once the students are all read).
+    """
+    def __init__(self, clock, total=None, progress_every=10):
+        self.clock = clock
+        self.total = total
+        self.progress_every = progress_every
+        self.steps = {}   # step name -> list of seconds, in first-seen order
+        self.student_times = []
+        self.done = 0
+        self.skipped = 0
+        self.started = None # Set by the first student, so countdown/field checks don't count
+        self.student_start = None
+        self.last_lap = None
+
+    def start_student(self):
+        self.finish_student()
+        self.student_start = self.last_lap = self.clock()
+        if self.started is None:
+            self.started = self.student_start
+
+    def lap(self, step):
+        if self.last_lap is None:
+            return
+        now = self.clock()
+        self.steps.setdefault(step, []).append(now - self.last_lap)
+        self.last_lap = now
+
+    def finish_student(self):
+        if self.student_start is None:
+            return
+        self.student_times.append(self.clock() - self.student_start)
+        self.student_start = self.last_lap = None
+        self.done += 1
+        if self.progress_every and self.done % self.progress_every == 0:
+            print(self.progress_line())
+
+    def set_total(self, total):
+        """Student count for the ETA, when it is only known after the timer started."""
+        self.total = total
+
+    def skip_student(self):
+        self.skipped += 1
+
+    def elapsed(self):
+        return self.clock() - self.started if self.started is not None else 0.0
+
+    def rate(self):
+        """Students per minute since the first student started."""
+        elapsed = self.elapsed()
+        return self.done / elapsed * 60 if elapsed > 0 else 0.0
+
+    def progress_line(self):
+        rate = self.rate()
+        line = f"[progress] {self.done}"
+        if self.total:
+            line += f"/{self.total}"
+        line += f" students | {rate:.1f} students/min"
+        if self.total and rate > 0:
+            remaining = max(self.total - self.done - self.skipped, 0)
+            line += f" | ETA {format_duration(remaining / rate * 60)}"
+        return line
+
+    def summary(self):
+        """
+        Returns: {'students', 'elapsed_seconds', 'students_per_minute',
+                  'steps': {name: {'count','total','mean','p50','p95','max'}}}
+        Per-student totals are reported under the 'student' step.
+        """
+        steps = dict(self.steps)
+        if self.student_times:
+            steps['student'] = self.student_times
+        return {
+            'students': self.done,
+            'elapsed_seconds': round(self.elapsed(), 3),
+            'students_per_minute': round(self.rate(), 2),
+            'steps': {
+                name: {
+                    'count': len(times),
+                    'total': round(sum(times), 3),
+                    'mean': round(sum(times) / len(times), 4),
+                    'p50': round(percentile(times, 50), 4),
+                    'p95': round(percentile(times, 95), 4),
+                    'max': round(max(times), 4),
+                }
+                for name, times in steps.items() if times
+            },
+        }
+
+    def print_report(self):
+        summary = self.summary()
+        if not summary['steps']:
+            return
+        print(f"--- TIMING ({summary['students']} students, {summary['students_per_minute']} students/min) ---")
+        print(f"{'step':<20}{'count':>7}{'p50 s':>9}{'p95 s':>9}{'max s':>9}{'total s':>10}")
+        for name, s in summary['steps'].items():
+            print(f"{name:<20}{s['count']:>7}{s['p50']:>9.3f}{s['p95']:>9.3f}{s['max']:>9.3f}{s['total']:>10.1f}")
+
+    def save(self, path):
+        """Writes the summary as JSON; returns the path."""
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
@@ -0,0 +1,267 @@
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+from report_writer import ReportWriter
+
+# One store for both tools, in the folder that holds yearbook-choice and package-choice
+STORE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          "entry_sessions.sqlite3")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,        -- 'yearbook' or 'package'
+    stamp TEXT NOT NULL,       -- Timestamp in the session's report names
+    started TEXT NOT NULL,
+    finished TEXT              -- NULL while open (a validation waiting for main.py)
+);
+CREATE INDEX IF NOT EXISTS sessions_tool_finished ON sessions (tool, finished, id);
+
+CREATE TABLE IF NOT EXISTS students (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    student_id TEXT NOT NULL,
+    status TEXT NOT NULL,      -- 'entered' or 'error' (an error in the session sticks)
+    logged TEXT NOT NULL,
+    PRIMARY KEY (session_id, student_id)
+);
+CREATE INDEX IF NOT EXISTS students_student ON students (student_id);
+CREATE INDEX IF NOT EXISTS students_status_logged ON students (status, logged);
+
+CREATE TABLE IF NOT EXISTS entered (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    student_id TEXT,
+    report TEXT NOT NULL,      -- Report file the row is exported to (absolute path)
+    data TEXT NOT NULL,        -- The report row (JSON)
+    logged TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entered_session_report ON entered (session_id, report);
+CREATE INDEX IF NOT EXISTS entered_student ON entered (student_id);
+
+CREATE TABLE IF NOT EXISTS errors (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    student_id TEXT,
+    reason TEXT,
+    report TEXT NOT NULL,
+    data TEXT NOT NULL,
+    logged TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS errors_session_report ON errors (session_id, report);
+CREATE INDEX IF NOT EXISTS errors_student ON errors (student_id);
+CREATE INDEX IF NOT EXISTS errors_logged ON errors (logged);
+"""
+
+# An error anywhere in a session keeps the student marked as failed
+UPSERT_STUDENT = """
+INSERT INTO students (session_id, student_id, status, logged) VALUES (?, ?, ?, ?)
+ON CONFLICT (session_id, student_id) DO UPDATE SET
+    status = CASE WHEN students.status = 'error' THEN 'error' ELSE excluded.status END,
+    logged = excluded.logged
+"""
+
+def connect(path=None):
+    conn = sqlite3.connect(path or STORE_FILE)
+    conn.executescript(SCHEMA)
+    return conn
+
+def report_rows(conn, session_id, report):
+    """Stored rows of one report of a session, in the order they were logged."""
+    rows = []
+    for table in ('errors', 'entered'):
+        rows += [json.loads(data) for (data,) in conn.execute(
+            f"SELECT data FROM {table} WHERE session_id = ? AND report = ? ORDER BY id", (session_id, report))]
+    return rows
+
+def export_reports(conn, session_id):
+    """
+    (Re)writes every CSV/xlsx report of a session from its stored rows.
+    Returns: the paths written.
+    """
+    reports = [report for (report,) in conn.execute(
+        "SELECT report FROM errors WHERE session_id = ? UNION SELECT report FROM entered WHERE session_id = ?",
+        (session_id, session_id))]
+    for path in reports:
+        rows = report_rows(conn, session_id, path)
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        if path.endswith(".xlsx"):
+            pd.DataFrame(rows).to_excel(path, index=False)
+        else:
+            # Columns in the order they first appear (validation rows, then runtime errors)
+            columns = list(dict.fromkeys(key for row in rows for key in row))
+            if os.path.exists(path):
+                os.remove(path)
+            writer = ReportWriter(path, fieldnames=columns, flush_rows=len(rows))
+            for row in rows:
+                writer.write({key: ("" if value is None else value) for key, value in row.items()})
+            writer.close()
+    return reports
+
+class Session:
+    """
+    One run of a tool in the SQLite store: every error and entered row it logs.
+
+    Rows are buffered and inserted in one transaction every `flush_rows` rows or
+    `flush_seconds`, on close(), and at interpreter exit (FailSafe aborts included).
+    The CSV/xlsx reports are exports of the stored rows: export() (also done by
+    close()) rewrites every report of the session, rows from earlier processes of
+    the same session included. After a hard kill, `python session_store.py --export`
+    writes them from what was flushed.
+    resume: the ID of an open session of the tool to continue (the one validate_data.py
+    opened, named in its handoff) instead of starting one; `resumed` tells which happened.
+    """
+    def __init__(self, tool, stamp, resume=None, path=None, flush_rows=200, flush_seconds=2.0):
+        self.conn = connect(path)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.pending = {'students': [], 'entered': [], 'errors': []}
+        self.last_flush = time.monotonic()
+        row = None
+        if resume is not None:
+            row = self.conn.execute("SELECT id, stamp FROM sessions WHERE id = ? AND tool = ? AND finished IS NULL",
+                                    (resume, tool)).fetchone()
+        self.resumed = row is not None
+        if row:
+            self.id, self.stamp = row
+        else:
+            with self.conn:
+                cur = self.conn.execute("INSERT INTO sessions (tool, stamp, started) VALUES (?, ?, ?)",
+                                        (tool, stamp, datetime.now().strftime(TIME_FORMAT)))
+            self.id, self.stamp = cur.lastrowid, stamp
+
+    def _add(self, table, row):
+        self.pending[table].append(row)
+        if (sum(len(rows) for rows in self.pending.values()) >= self.flush_rows
+                or time.monotonic() - self.last_flush >= self.flush_seconds):
+            self.flush()
+
+    def _report(self, path):
+        # Anchor relative paths now, like ReportWriter
+        return os.path.abspath(path)
+
+    def student(self, student_id, status):
+        self._add('students', (self.id, str(student_id), status, datetime.now().strftime(TIME_FORMAT)))
+
+    def error(self, report, row, student_id=None, reason=None):
+        """Logs an error row for report (a CSV path); student_id also marks the student as failed."""
+        now = datetime.now().strftime(TIME_FORMAT)
+        sid = None if student_id is None else str(student_id)
+        self._add('errors', (self.id, sid, reason, self._report(report), json.dumps(row, default=str), now))
+        if sid is not None:
+            self.student(sid, 'error')
+
+    def entered(self, report, row, student_id=None):
+        """Logs a row for report (a CSV or xlsx path); student_id also marks the student as entered."""
+        now = datetime.now().strftime(TIME_FORMAT)
+        sid = None if student_id is None else str(student_id)
+        self._add('entered', (self.id, sid, self._report(report), json.dumps(row, default=str), now))
+        if sid is not None:
+            self.student(sid, 'entered')
+
+    def flush(self):
+        if any(self.pending.values()):
+            with self.conn:
+                self.conn.executemany("INSERT INTO errors (session_id, student_id, reason, report, data, logged) "
+                                      "VALUES (?, ?, ?, ?, ?, ?)", self.pending['errors'])
+                self.conn.executemany("INSERT INTO entered (session_id, student_id, report, data, logged) "
+                                      "VALUES (?, ?, ?, ?, ?)", self.pending['entered'])
+                self.conn.executemany(UPSERT_STUDENT, self.pending['students'])
+            self.pending = {'students': [], 'entered': [], 'errors': []}
+        self.last_flush = time.monotonic()
+
+    def export(self):
+        """
+        Writes every report of the session from the store.
+        Returns: the paths written.
+        """
+        self.flush()
+        return export_reports(self.conn, self.id)
+
+    def close(self, finish=True):
+        """Exports the reports; finish=False leaves the session open for the next tool to resume."""
+        self.export()
+        if finish:
+            with self.conn:
+                self.conn.execute("UPDATE sessions SET finished = ? WHERE id = ?",
+                                  (datetime.now().strftime(TIME_FORMAT), self.id))
+        self.conn.close()
+
+
+_sessions = {}
+
+def get_session(tool, stamp, resume=None):
+    """
+    Returns this process's session for a tool, opening it on first use.
+    """
+    session = _sessions.get(tool)
+    if session is None:
+        session = _sessions[tool] = Session(tool, stamp, resume)
+    return session
+
+def close_sessions(finish=True):
+    for tool, session in list(_sessions.items()):
+        try:
+            session.close(finish)
+        except Exception as e:
+            print(f"Failed to save the {tool} session: {e}")
+    _sessions.clear()
+
+atexit.register(close_sessions)
+
+def failed_students(since, path=None):
+    """
+    Students with an error in any session of either tool since `since` (a datetime).
+    Returns: [(student ID, tool, last error, when)], newest first.
+    """
+    conn = connect(path)
+    try:
+        return conn.execute(
+            "SELECT e.student_id, s.tool, e.reason, MAX(e.logged) FROM errors e "
+            "JOIN sessions s ON s.id = e.session_id "
+            "WHERE e.logged >= ? AND e.student_id IS NOT NULL "
+            "GROUP BY e.student_id, s.tool ORDER BY MAX(e.logged) DESC",
+            (since.strftime(TIME_FORMAT),)).fetchall()
+    finally:
+        conn.close()
+
+def export_sessions(session_id=None, path=None):
+    """
+    Writes the reports of one session, or of every session still open (a run that was
+    killed before it could close, or a validation waiting for main.py).
+    Returns: the paths written.
+    """
+    conn = connect(path)
+    try:
+        if session_id is None:
+            ids = [i for (i,) in conn.execute("SELECT id FROM sessions WHERE finished IS NULL ORDER BY id")]
+        else:
+            ids = [session_id]
+        return [report for i in ids for report in export_reports(conn, i)]
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up past entry sessions")
+    parser.add_argument("--failed-days", type=int, default=7,
+                        help="List students that failed in any run of the last N days (default: 7)")
+    parser.add_argument("--export", nargs="?", type=int, const=-1, metavar="SESSION_ID",
+                        help="Write the CSV/xlsx reports of a session again (no ID: every session still open)")
+    args = parser.parse_args()
+    if args.export is not None:
+        written = export_sessions(None if args.export == -1 else args.export)
+        print(f"Wrote {len(written)} report(s):")
+        for report in written:
+            print(f"  {report}")
+        raise SystemExit(0)
+    rows = failed_students(datetime.now() - timedelta(days=args.failed_days))
+    print(f"{len(rows)} student(s) failed in the last {args.failed_days} day(s):")
+    for sid, tool, reason, logged in rows:
+        print(f"  {logged}  {tool:<8} {sid:<12} {reason}")
@@ -0,0 +1,59 @@
+import queue
+import threading
+
+_DONE = object()
+
+def stream_in_background(items, maxsize=32, on_done=None):
+    """
+    Runs an iterator (e.g. a data handler generator) in a background thread
+    that starts immediately. Returns a generator yielding items as soon as they are ready.
+
+    The queue is bounded, so the producer pauses when the UI loop falls behind
+    and memory stays flat. Errors in the producer are re-raised here.
+    on_done(count) is called from the producer thread once every item is read
+    (e.g. RunTimer.set_total, for the ETA).
+    """
+    q = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up quietly if the consumer went away (e.g. FailSafe abort)
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        count = 0
+        try:
+            for item in items:
+                if not put(item):
+                    return
+                count += 1
+            if on_done:
+                on_done(count)
+        except BaseException as e:
+            put(e)
+            return
+        put(_DONE)
+
+    # Start right away so parsing overlaps with the countdown/field checks
+    thread = threading.Thread(target=producer, name="student-producer", daemon=True)
+    thread.start()
+
+    def consume():
+        try:
+            while True:
+                item = q.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    return consume()
@@ -0,0 +1,84 @@
+from ui_waits import read_field_text
+from pacing import PACING
+
+TYPE = "type"     # One keystroke per character: cost grows with the length of the value
+PASTE = "paste"   # Clipboard + Ctrl+V: about the same cost at any length
+AUTO = "auto"     # Paste values of PASTE_MIN_CHARS or more, type shorter ones
+METHODS = (AUTO, TYPE, PASTE)
+
+PASTE_MIN_CHARS = 4 # Ctrl+V is itself a few key events, so very short values are typed
+
+class TextEntry:
+    """
+    How text gets into each School Days field.
+
+    methods: {field name: TYPE, PASTE or AUTO}; fields not listed use `default`.
+    verify: field names (or True for every field) read back after entry. A value
+    that reads back wrong is typed again key by key once, e.g. for a field that
+    ignores pastes.
+    pacing: PacingController for the 'field_entry' wait after each value; a typed
+    value that only reads back right when typed again counts as a miss.
+    """
+    def __init__(self, methods=None, default=AUTO, verify=(), pacing=PACING):
+        self.methods = dict(methods or {})
+        self.default = default
+        self.verify = verify
+        self.pacing = pacing
+
+    def method_for(self, field, text):
+        method = self.methods.get(field, self.default)
+        if method == AUTO:
+            return PASTE if len(text) >= PASTE_MIN_CHARS else TYPE
+        return method
+
+    def should_verify(self, field):
+        return self.verify is True or field in self.verify
+
+    def put(self, driver, field, text):
+        """
+        Puts text into the field that has focus (already clicked and selected).
+        Returns: the method used.
+        """
+        text = str(text)
+        method = self.method_for(field, text)
+        if method == PASTE:
+            driver.copy_to_clipboard(text)
+            driver.hotkey('ctrl', 'v')
+        else:
+            driver.type_text(text)
+        return method
+
+    def enter(self, driver, field, coord, text):
+        """
+        Clicks the field, selects its contents and replaces them with text.
+        Returns: False if read-back verification is on and the field still shows something else.
+        """
+        driver.click(coord['x'], coord['y'])
+        driver.triple_click()
+        self.put(driver, field, text)
+        self.pacing.wait(driver, 'field_entry')
+        return self.check(driver, field, coord, text)
+
+    def check(self, driver, field, coord, text):
+        """
+        Read-back verification (only for fields in `verify`). Returns True if the field shows text.
+        """
+        if not self.should_verify(field):
+            return True
+        text = str(text)
+        found = read_field_text(driver, coord)
+        if found.lower() == text.strip().lower():
+            self.pacing.success('field_entry')
+            return True
+        # Retyped key by key once (the field may not accept pastes)
+        driver.click(coord['x'], coord['y'])
+        driver.triple_click()
+        driver.type_text(text)
+        self.pacing.wait(driver, 'field_entry')
+        found = read_field_text(driver, coord)
+        if found.lower() == text.strip().lower():
+            if self.method_for(field, text) == TYPE:
+                self.pacing.miss('field_entry') # Typed twice, right the second time: keys were lost
+            return True
+        print(f"  -> READ-BACK MISMATCH in {field}: expected '{text}', found '{found}'")
+        return False
@@ -0,0 +1,282 @@
+import time
+
+try:
+    from pyautogui import FailSafeException
+except Exception:
+    # pyautogui can't be imported without a desktop (e.g. headless Linux);
+    # the fake driver never raises it, but main.py still catches it by name.
+    class FailSafeException(Exception):
+        pass
+
+
+class PyAutoGuiDriver:
+    """
+    Real desktop backend: every action goes straight to pyautogui/pyperclip.
+    """
+    def __init__(self, pause=None):
+        import pyautogui
+        import pyperclip
+        self.pyautogui = pyautogui
+        self.pyperclip = pyperclip
+        self.pyautogui.FAILSAFE = True
+        if pause is not None:
+            self.set_pause(pause)
+
+    def set_pause(self, seconds):
+        # Implicit delay pyautogui adds after every call (tuned by pacing.py)
+        self.pyautogui.PAUSE = seconds
+
+    def click(self, x=None, y=None):
+        self.pyautogui.click(x, y)
+
+    def double_click(self, x=None, y=None):
+        self.pyautogui.doubleClick(x, y)
+
+    def triple_click(self, x=None, y=None):
+        self.pyautogui.tripleClick(x, y)
+
+    def type_text(self, text):
+        self.pyautogui.typewrite(text)
+
+    def press(self, key):
+        self.pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        self.pyautogui.hotkey(*keys)
+
+    def copy_to_clipboard(self, text):
+        self.pyperclip.copy(text)
+
+    def read_clipboard(self):
+        return self.pyperclip.paste()
+
+    def screenshot(self, region=None):
+        return self.pyautogui.screenshot(region=region)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def now(self):
+        return time.perf_counter()
+
+
+class FakeScreenshot:
+    """
+    What the fake app 'shows' inside a region: a tuple of (field, text) pairs.
+    Compares equal when the visible content is the same, like two identical screenshots.
+    """
+    def __init__(self, items):
+        self.items = tuple(items)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeScreenshot) and self.items == other.items
+
+    def __hash__(self):
+        return hash(self.items)
+
+    def tobytes(self):
+        return repr(self.items).encode("utf-8")
+
+
+class FakeSchoolDaysDriver:
+    """
+    In-memory stand-in for School Days Plus, driven through the same calls as
+    PyAutoGuiDriver. Time is virtual: sleeps and simulated latency advance
+    self.clock instead of blocking, so benchmarks of thousands of students finish instantly.
+
+    layout: coordinates dict as saved by the config wizard (field name -> {'x', 'y'}).
+    students: dict of Student ID -> Last Name known to the app.
+
+    Latency knobs (seconds):
+      action_latency - cost of every click/keypress call (pyautogui.PAUSE is 0.1 by default)
+      key_latency    - extra cost per typed character
+      load_latency   - time between pressing Enter in the search box and the record showing
+      fill_latency   - time after the record shows before its last name / web entry text
+                       does (the screen has already changed, so only pacing.py waits for it)
+
+    locked_fields ignore all input; no_paste_fields ignore Ctrl+V but take typed text.
+    """
+    # Yearbook selection list (record['option']) and package photo choice letters
+    # (record['current_choice'], which picks the set of package boxes shown)
+    YEARBOOK_OPTIONS = {'option_a': 'a', 'option_b': 'b', 'option_c': 'c', 'option_d': 'd'}
+    PHOTO_CHOICES = {
+        'choice_a': 'a', 'choice_b': 'b', 'choice_c': 'c', 'choice_d': 'd',
+        'choice_e': 'e', 'choice_f': 'f',
+    }
+    OPTION_FIELDS = {**YEARBOOK_OPTIONS, **PHOTO_CHOICES}
+    RECORD_FIELDS = ['last_name_box', 'web_entry_input_box']
+
+    def __init__(self, layout, students, action_latency=0.1, key_latency=0.01,
+                 load_latency=0.25, locked_fields=(), hit_radius=6, no_paste_fields=(), fill_latency=0.0):
+        self.layout = {name: (pt['x'], pt['y']) for name, pt in layout.items()}
+        self.records = {
+            str(sid): {'last_name_box': last_name, 'web_entry_input_box': "", 'option': None,
+                       'current_choice': None, 'boxes': {}}
+            for sid, last_name in students.items()
+        }
+        self.action_latency = action_latency
+        self.key_latency = key_latency
+        self.load_latency = load_latency
+        self.fill_latency = fill_latency
+        self.pause = None # Recorded only: action_latency already stands for pyautogui.PAUSE
+        self.locked_fields = set(locked_fields)
+        self.no_paste_fields = set(no_paste_fields)
+        self.hit_radius = hit_radius
+
+        self.clock = 0.0
+        self.clipboard = ""
+        self.mouse = (0, 0)
+        self.focus = None
+        self.selected = False
+        self.search_text = ""
+        # The app opens on the first record, like School Days Plus after login
+        self.current_id = next(iter(self.records), None)
+        self.pending_id = None
+        self.pending_until = None
+        self.filled_at = 0.0
+        self.action_count = 0
+
+    # --- Internal state machine ---
+    def _tick(self, seconds):
+        self.clock += seconds
+        if self.pending_until is not None and self.clock >= self.pending_until:
+            # Record finished loading
+            self.current_id = self.pending_id
+            self.filled_at = self.pending_until + self.fill_latency
+            self.pending_id = None
+            self.pending_until = None
+
+    def _action(self, extra=0.0):
+        self.action_count += 1
+        self._tick(self.action_latency + extra)
+
+    def _field_at(self, x, y):
+        for name, (fx, fy) in self.layout.items():
+            if abs(fx - x) <= self.hit_radius and abs(fy - y) <= self.hit_radius:
+                return name
+        return None
+
+    def _record(self):
+        return self.records.get(self.current_id)
+
+    def field_text(self, name):
+        """What the app currently displays in a text field."""
+        if name == 'search_box':
+            return self.search_text
+        record = self._record()
+        if record is None:
+            return ""
+        if name in self.RECORD_FIELDS:
+            return record[name] if self.clock >= self.filled_at else ""
+        return record['boxes'].get((record['current_choice'], name), "")
+
+    def _set_field_text(self, name, text):
+        if name == 'search_box':
+            self.search_text = text
+            return
+        record = self._record()
+        if record is None or name in self.locked_fields:
+            return
+        if name in self.RECORD_FIELDS:
+            record[name] = text
+        else:
+            record['boxes'][(record['current_choice'], name)] = text
+
+    def _click_at(self, x, y, clicks):
+        if x is not None and y is not None:
+            self.mouse = (x, y)
+        field = self._field_at(*self.mouse)
+        self.focus = field
+        self.selected = clicks > 1
+        if field in self.OPTION_FIELDS:
+            record = self._record()
+            if record is not None:
+                if field in self.YEARBOOK_OPTIONS:
+                    record['option'] = self.YEARBOOK_OPTIONS[field]
+                else:
+                    record['current_choice'] = self.PHOTO_CHOICES[field]
+        self._action()
+
+    def _insert(self, text):
+        if self.focus is None or self.focus in self.OPTION_FIELDS:
+            return
+        current = "" if self.selected else self.field_text(self.focus)
+        self._set_field_text(self.focus, current + text)
+        self.selected = False
+
+    # --- Driver interface ---
+    def click(self, x=None, y=None):
+        self._click_at(x, y, 1)
+
+    def double_click(self, x=None, y=None):
+        self._click_at(x, y, 2)
+
+    def triple_click(self, x=None, y=None):
+        self._click_at(x, y, 3)
+
+    def type_text(self, text):
+        self._insert(str(text))
+        self._action(self.key_latency * len(str(text)))
+
+    def press(self, key):
+        if key == 'enter' and self.focus == 'search_box':
+            # Start loading the searched record (unknown IDs load a blank record)
+            self.pending_id = self.search_text.strip()
+            self.pending_until = self.clock + self.action_latency + self.load_latency
+        elif key == 'backspace' and self.focus and self.focus not in self.OPTION_FIELDS:
+            current = self.field_text(self.focus)
+            self._set_field_text(self.focus, "" if self.selected else current[:-1])
+            self.selected = False
+        self._action()
+
+    def hotkey(self, *keys):
+        keys = tuple(k.lower() for k in keys)
+        if keys in (('ctrl', 'c'), ('command', 'c')) and self.focus and self.selected:
+            self.clipboard = self.field_text(self.focus)
+        elif keys in (('ctrl', 'v'), ('command', 'v')) and self.focus not in self.no_paste_fields:
+            self._insert(self.clipboard)
+        self._action()
+
+    def set_pause(self, seconds):
+        self.pause = seconds
+
+    def copy_to_clipboard(self, text):
+        self.clipboard = str(text)
+
+    def read_clipboard(self):
+        return self.clipboard
+
+    def screenshot(self, region=None):
+        visible = []
+        shown = set()
+        for name, (fx, fy) in sorted(self.layout.items()):
+            if region:
+                left, top, width, height = region
+                if not (left <= fx < left + width and top <= fy < top + height):
+                    continue
+            shown.add(name)
+            visible.append((name, self.field_text(name)))
+        # A selection is drawn where its list is, so it shows if any of the list's spots is in the region
+        record = self._record()
+        if shown & set(self.YEARBOOK_OPTIONS):
+            visible.append(('option', record['option'] if record else None))
+        if shown & set(self.PHOTO_CHOICES):
+            visible.append(('current_choice', record['current_choice'] if record else None))
+        return FakeScreenshot(visible)
+
+    def sleep(self, seconds):
+        self._tick(seconds)
+
+    def now(self):
+        return self.clock
+
+
+def get_driver(name="pyautogui", **kwargs):
+    """
+    Returns a UI driver by name: 'pyautogui' (real desktop) or 'fake' (simulated app).
+    """
+    if name == "pyautogui":
+        return PyAutoGuiDriver(**kwargs)
+    if name == "fake":
+        return FakeSchoolDaysDriver(**kwargs)
+    raise ValueError(f"Unknown UI driver '{name}'")
@@ -1,7 +1,8 @@
 import os
 import sys
-import pandas as pd
-from excel_utils import get_excel_path, find_column_robust
+from excel_utils import get_excel_paths
+from ingest import read_header, resolve_roles
+from data_handler_package import PACKAGE_ROLES
 
 def validate():
     # Look in the PARENT directory (../) relative to this script
@@ -11,44 +12,42 @@ def validate():
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     print(f"Validating input files in: {base_dir}")
     
-    excel_path = get_excel_path(base_dir)
+    excel_paths = get_excel_paths(base_dir)
     
-    import glob
-    if not excel_path:
-        # get_excel_path prints an error if > 1 file is found, but silent if 0.
-        # We only want to print our error if there are genuinely 0 files.
-        if not glob.glob(os.path.join(base_dir, "*.xlsx")):
-            print("\n[ERROR] No Excel file found in the package-choice folder!")
-            print("Please place your Input Excel file in the 'package-choice' folder.")
+    if not excel_paths:
+        print("\n[ERROR] No Excel file found in the package-choice folder!")
+        print("Please place your Input Excel file in the 'package-choice' folder.")
         sys.exit(1)
-        
-    print(f"Found Input File: {os.path.basename(excel_path)}")
-    
-    # helper for multiple file check is inside get_excel_path already, 
-    # but let's double check if get_excel_path returns None if multiple are found?
-    # Yes, my implementation returns None and prints error if > 1.
+
+    if len(excel_paths) > 1:
+        # Several exports (e.g. one per school) are merged by main.py
+        print(f"Found {len(excel_paths)} Input Files (they will be processed together):")
+    for excel_path in excel_paths:
+        print(f"Found Input File: {os.path.basename(excel_path)}")
     
-    try:
-        df = pd.read_excel(excel_path)
-    except Exception as e:
-        print(f"\n[ERROR] Could not read Excel file: {e}")
-        sys.exit(1)
+    for excel_path in excel_paths:
+        try:
+            # Only the header row is needed here; main.py reads the rows it uses
+            columns = resolve_roles(read_header(excel_path), PACKAGE_ROLES)
+        except Exception as e:
+            print(f"\n[ERROR] Could not read Excel file {os.path.basename(excel_path)}: {e}")
+            sys.exit(1)
+            
+        # Check Columns
+        # Required: ID, Product
+        id_col = columns['student_id']
+        product_col = columns['product']
         
-    # Check Columns
-    # Required: ID, Product
-    id_col = find_column_robust(df, "student id")
-    product_col = find_column_robust(df, ["product name", "package choice"])
-    
-    missing = []
-    if not id_col: missing.append("Student ID")
-    if not product_col: missing.append("Package Choice / Product Name")
-    
-    if missing:
-        print(f"\n[ERROR] Missing required columns: {', '.join(missing)}")
-        print("Please check your Excel file headers.")
-        sys.exit(1)
+        missing = []
+        if not id_col: missing.append("Student ID")
+        if not product_col: missing.append("Package Choice / Product Name")
+        
+        if missing:
+            print(f"\n[ERROR] Missing required columns in {os.path.basename(excel_path)}: {', '.join(missing)}")
+            print("Please check your Excel file headers.")
+            sys.exit(1)
 
-    print("\n[SUCCESS] Input file is valid and ready for processing.")
+    print("\n[SUCCESS] Input file(s) valid and ready for processing.")
     sys.exit(0)
 
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+import random
+
+VERIFY_EVERY = 25     # Default: read back one entered student in this many (the first always)
+DETECT_WITHIN = 50    # --verify-confidence: number of students a fault must be caught within
+BOOST_FOR = 10        # After a mismatch, read back every student for this many students
+HALT_AFTER = 3        # Stop the run after this many failed read-backs in a row
+RELOAD_TIMEOUT = 1.0  # Wait for a record searched again: it usually looks the same once loaded
+
+def rate_for_confidence(confidence, within=DETECT_WITHIN):
+    """
+    Share of students to read back so that a fault affecting every student from some
+    point on is caught within `within` students with probability `confidence`.
+    """
+    if confidence >= 1:
+        return 1.0
+    return 1 - (1 - confidence) ** (1 / within)
+
+class VerificationScheduler:
+    """
+    Decides which entered students are searched again and read back.
+
+    every: read back every Nth student (1 = all of them), or
+    confidence: sample at random at rate_for_confidence(confidence) instead.
+    The first student is always read back, and a failure there stops the run
+    (nothing has been seen to work yet). After any other failure every student is
+    read back for BOOST_FOR students; HALT_AFTER failures in a row stop the run.
+    """
+    def __init__(self, every=VERIFY_EVERY, confidence=None, seed=None):
+        self.every = max(int(every), 1)
+        self.rate = rate_for_confidence(confidence) if confidence else None
+        self.rng = random.Random(seed)
+        self.seen = 0
+        self.checked = 0
+        self.failed = 0
+        self.passed_once = False
+        self.failures_in_row = 0
+        self.boost_left = 0
+        self.halted = False
+
+    def should_verify(self):
+        """Call once per entered student. Returns: True if this one is read back."""
+        self.seen += 1
+        if self.seen == 1:
+            return True
+        if self.boost_left:
+            self.boost_left -= 1
+            return True
+        if self.rate is not None:
+            return self.rng.random() < self.rate
+        return (self.seen - 1) % self.every == 0
+
+    def record(self, ok):
+        """
+        Result of a read-back. Returns: False once the run should stop.
+        """
+        self.checked += 1
+        if ok:
+            self.passed_once = True
+            self.failures_in_row = 0
+            return True
+        self.failed += 1
+        self.failures_in_row += 1
+        self.boost_left = BOOST_FOR
+        if not self.passed_once or self.failures_in_row >= HALT_AFTER:
+            self.halted = True
+        return not self.halted
+
+    def summary(self):
+        share = self.checked / self.seen if self.seen else 0
+        text = f"read back {self.checked} of {self.seen} student(s) ({share:.0%}), {self.failed} mismatch(es)"
+        if self.halted:
+            text += ", run stopped"
+        return text
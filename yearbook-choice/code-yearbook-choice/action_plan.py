@@ -0,0 +1,274 @@
+import json
+import os
+from contextlib import redirect_stdout
+from io import StringIO
+from checkpoint_journal import content_hash
+from ui_waits import record_region, capture, wait_for_screen_change, LOAD_TIMEOUT
+from pacing import PacingController, read_after_load
+from name_match import last_name_matches
+
+# Compiled by `main.py --dry-run`, run by `main.py --plan`
+PLAN_FILE = os.path.join(os.path.dirname(__file__), "action_plan.jsonl")
+
+# UI operations a plan is made of (the 'op' of each step):
+#   search     - {'text'}: types a Student ID in the search box and waits for the record
+#   check_name - {'expected', 'trusted'}: reads the last name box; stops the student if it doesn't
+#                match (an empty 'expected' takes any name but none). A 'trusted' check (roster already confirmed the name) is skipped when
+#                the search before it saw the record change
+#   click      - {'field'}: clicks a spot (e.g. a photo choice letter)
+#   wait       - {'step'}: pacing wait (pacing.py)
+#   enter      - {'field', 'text', 'on_fail': [product, reason], 'pace'}: replaces a field's
+#                text (typed or pasted, see text_entry.py); on_fail (if any) is logged if its
+#                read-back fails, and 'pace' names a pacing step the read-back also counts for
+#   error      - {'product', 'reason'}: logs an error without touching the app (e.g. a
+#                missing coordinate), in order with the steps around it
+# Any step can carry 'lap': the RunTimer step its time is charged to.
+
+def compile_choice_groups(choice_groups, coords):
+    """
+    The package entries of one student whose record is on screen.
+    Returns: (ops, read-back list), the read-back list being [choice key, field, text, product]
+    for every box entered whose photo choice is known (see verify_entries in main.py),
+    in entry order so reading them back leaves the same choice active.
+    """
+    ops = []
+    readback = {}
+    active_choice = None # Photo choice the boxes belong to; None before the first letter click
+
+    for group in choice_groups:
+        group_start = len(ops)
+        photo_choice = group['photo_choice']
+        standard_string = group['standard_string']
+        other_items = group['others']
+
+        # A. Photo choice letter (once per group); no letter keeps whichever choice is active
+        clicked_choice = False
+        if photo_choice:
+            choice_key = f"choice_{photo_choice}"
+            if choice_key in coords:
+                ops.append({'op': 'click', 'field': choice_key})
+                ops.append({'op': 'wait', 'step': 'photo_choice', 'lap': 'photo_choice'})
+                clicked_choice = True
+                active_choice = choice_key
+            else:
+                ops.append({'op': 'error', 'product': "Photo Choice",
+                            'reason': f"Coordinate for choice '{photo_choice}' not found"})
+
+        # B. Standard packages (the combined string, e.g. "xxyy")
+        if standard_string:
+            if 'quick_package_entry_box' in coords:
+                ops.append({'op': 'enter', 'field': 'quick_package_entry_box', 'text': standard_string,
+                            'on_fail': [f"Standard Pkg: {standard_string}", "Read-back mismatch in quick package entry box"],
+                            'pace': 'photo_choice' if clicked_choice else None, 'lap': 'quick_package'})
+            else:
+                ops.append({'op': 'error', 'product': "Standard Package",
+                            'reason': "'quick_package_entry_box' coordinate missing"})
+
+        # C. Other items (Group, CD, Touchup), one box each
+        item_ops = []
+        for item in other_items:
+            target_box_name = item['target_box']
+            if not target_box_name:
+                continue
+            if target_box_name == 'touchup':
+                if 'touchup_dropdown' in coords:
+                    item_ops.append({'op': 'enter', 'field': 'touchup_dropdown', 'text': "Pending",
+                                     'on_fail': ["Touchup", "Read-back mismatch in touchup box"]})
+                else:
+                    item_ops.append({'op': 'error', 'product': "Touchup",
+                                     'reason': "'touchup_dropdown' coordinate missing"})
+            elif target_box_name in coords:
+                item_ops.append({'op': 'enter', 'field': target_box_name, 'text': item['code'],
+                                 'on_fail': [item['raw_product'], f"Read-back mismatch in {target_box_name}"]})
+            else:
+                item_ops.append({'op': 'error', 'product': item['raw_product'],
+                                 'reason': f"Missing Coordinate: {target_box_name}"})
+        if item_ops:
+            item_ops[-1]['lap'] = 'other_items'
+        ops.extend(item_ops)
+
+        # Boxes typed before any letter click went to whichever choice was active: not checkable
+        if active_choice:
+            for op in ops[group_start:]:
+                if op['op'] == 'enter':
+                    key = (active_choice, op['field'])
+                    readback.pop(key, None) # Re-entered later: check the last value, in its later place
+                    readback[key] = [active_choice, op['field'], op['text'], op['on_fail'][0]]
+
+    return ops, list(readback.values())
+
+def compile_student(student, coords, report_rows=None):
+    """
+    One plan block: everything the entry loop does for a student, as data.
+    Returns: {'id', 'last_name', 'hash', 'errors', 'report', 'ops', 'validate'}
+    where errors are the data handler's (product, reason) pairs, logged before any UI step,
+    and validate is the read-back list of compile_choice_groups.
+    """
+    sid = student['id']
+    lname = student['last_name']
+    choice_groups = student.get('choices_groups', [])
+    errors = [(e['raw_product'], e['reason']) for e in student.get('errors', [])]
+
+    ops = []
+    validate = []
+    if choice_groups:
+        ops.append({'op': 'search', 'text': sid, 'lap': 'search'})
+        if 'last_name_box' in coords and lname:
+            ops.append({'op': 'check_name', 'expected': lname, 'lap': 'last_name_check'})
+        group_ops, validate = compile_choice_groups(choice_groups, coords)
+        ops.extend(group_ops)
+
+    return {
+        'id': sid,
+        'last_name': lname,
+        # What we enter/log for this student; any change means it must be redone
+        'hash': content_hash([sid, choice_groups, student.get('errors', [])]),
+        'errors': [list(e) for e in errors],
+        'report': report_rows or [],
+        'ops': ops,
+        'validate': validate,
+    }
+
+def compile_yearbook_student(student, coords):
+    """
+    The yearbook tool's plan block for a student: search, last name check, "auto" in the
+    Web Entry box, then the option click (its read-back is by looks, see check_entry in
+    the yearbook main.py). Same keys as compile_student, plus 'selection'.
+    """
+    sid = student['id']
+    lname = student.get('last_name', '')
+    selection = student['selection']
+
+    ops = [{'op': 'search', 'text': sid, 'lap': 'search'}]
+    if 'last_name_box' in coords:
+        ops.append({'op': 'check_name', 'expected': lname, 'lap': 'last_name_check'})
+    if 'web_entry_input_box' in coords:
+        ops.append({'op': 'enter', 'field': 'web_entry_input_box', 'text': "auto", 'lap': 'web_entry'})
+    option_key = f"option_{selection}"
+    if selection in ('a', 'b', 'c', 'd') and option_key in coords:
+        ops.append({'op': 'click', 'field': option_key, 'lap': 'option_click'})
+    else:
+        ops.append({'op': 'error', 'product': "Yearbook Option", 'reason': f"Unknown selection '{selection}'",
+                    'lap': 'option_click'})
+
+    return {
+        'id': sid,
+        'last_name': lname,
+        'selection': selection,
+        # What we type for this student; a changed selection means it must be re-entered
+        'hash': content_hash([sid, selection]),
+        'errors': [],
+        'report': [],
+        'ops': ops,
+        'validate': [],
+    }
+
+def search(driver, coords, sid, text_entry, timeout=LOAD_TIMEOUT):
+    """
+    Searches a student and waits until the record on screen has changed
+    (or `timeout` passes, e.g. when the same record is searched again).
+    Returns: True if the record was seen changing (see wait_for_screen_change).
+    """
+    if 'search_box' not in coords:
+        return False
+    region = record_region(coords)
+    before = capture(driver, region) if region else None
+    driver.click(coords['search_box']['x'], coords['search_box']['y'])
+    driver.double_click()
+    text_entry.put(driver, 'search_box', sid)
+    text_entry.check(driver, 'search_box', coords['search_box'], sid)
+    driver.press('enter')
+    return wait_for_screen_change(driver, region, before, timeout) # Wait for load
+
+def run_ops(driver, coords, ops, text_entry, log_error, timer=None, recheck_timeout=None):
+    """
+    Runs plan steps in order. log_error(product, reason) gets 'error' steps and failed 'enter' steps;
+    waits and read-backs use text_entry.pacing. recheck_timeout is the last name check's
+    read_after_load timeout (longer on retry passes, retry_queue.py).
+    Returns: None, or the last name found when a check_name step failed
+    (the steps after it are not run).
+    """
+    pacing = text_entry.pacing
+    loaded = False
+    for op in ops:
+        kind = op['op']
+        if kind == 'search':
+            loaded = search(driver, coords, op['text'], text_entry)
+        elif kind == 'check_name':
+            if op.get('trusted') and loaded:
+                continue # Roster confirmed the name and a new record showed up
+            expected = op['expected']
+            matches = lambda t: bool(t) and (not expected or last_name_matches(t, expected))
+            found = read_after_load(driver, coords['last_name_box'], matches, pacing, recheck_timeout)
+            if not matches(found):
+                if timer: timer.lap(op['lap'])
+                return found
+        elif kind == 'click':
+            driver.click(coords[op['field']]['x'], coords[op['field']]['y'])
+        elif kind == 'wait':
+            pacing.wait(driver, op['step'])
+        elif kind == 'enter':
+            field = op['field']
+            entered = text_entry.enter(driver, field, coords[field], op['text'])
+            if not entered and op.get('on_fail'):
+                log_error(*op['on_fail'])
+            if op.get('pace') and text_entry.should_verify(field):
+                # Wrong box contents right after a choice click: the choice may not have switched yet
+                if entered: pacing.success(op['pace'])
+                else: pacing.miss(op['pace'])
+        elif kind == 'error':
+            log_error(op['product'], op['reason'])
+        else:
+            raise ValueError(f"Unknown plan step: {kind}")
+        if timer and op.get('lap'):
+            timer.lap(op['lap'])
+    return None
+
+def save_plan(blocks, path=PLAN_FILE):
+    """Writes the plan as one JSON line per student (easy to diff between sessions)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for block in blocks:
+            f.write(json.dumps(block) + "\n")
+    os.replace(tmp_path, path)
+
+def load_plan(path=PLAN_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def diff_plans(old_blocks, new_blocks):
+    """
+    Returns: (new IDs, changed IDs, removed IDs) going from old_blocks to new_blocks.
+    A student counts as changed if anything in its block differs.
+    """
+    old = {b['id']: b for b in old_blocks}
+    new_ids, changed = [], []
+    for block in new_blocks:
+        before = old.pop(block['id'], None)
+        if before is None:
+            new_ids.append(block['id'])
+        elif before != block:
+            changed.append(block['id'])
+    return new_ids, changed, list(old)
+
+def estimate_seconds(blocks, coords, text_entry, **latency):
+    """
+    Dry run: plays the plan against the simulated app (ui_driver.FakeSchoolDaysDriver,
+    virtual clock, `latency` knobs or its defaults) and returns the simulated seconds.
+    Nothing is logged and the real pacing is left alone.
+    """
+    from ui_driver import FakeSchoolDaysDriver
+    from text_entry import TextEntry
+
+    names = {}
+    for block in blocks:
+        expected = [op['expected'] for op in block['ops'] if op['op'] == 'check_name']
+        names[block['id']] = expected[0] if expected else block['last_name']
+    app = FakeSchoolDaysDriver(coords, names, **latency)
+    dry_entry = TextEntry(text_entry.methods, text_entry.default, text_entry.verify, pacing=PacingController())
+    with redirect_stdout(StringIO()):
+        for block in blocks:
+            run_ops(app, coords, block['ops'], dry_entry, lambda product, reason: None)
+    return app.clock
@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from ui_driver import FakeSchoolDaysDriver
+from run_timing import RunTimer
+import session_store
+import main
+
+def make_students(count, seed=7):
+    """
+    Synthetic cleaned data plus the matching app records.
+    About 2% of IDs are unknown to the app and 2% have a different last name.
+    """
+    rng = random.Random(seed)
+    students, app_records = [], {}
+    for i in range(count):
+        sid = str(500000 + i)
+        last_name = rng.choice(["Walsh-Lee", "Nguyen", "O'Brien", "Garcia", "Smith"])
+        students.append({'id': sid, 'last_name': last_name, 'selection': rng.choice("abcd")})
+        roll = rng.random()
+        if roll < 0.02:
+            continue
+        app_records[sid] = "Other" if roll < 0.04 else last_name
+    return students, app_records
+
+def run_benchmark(count, action_latency, key_latency, load_latency):
+    with open(main.COORD_FILE, "r") as f:
+        coords = json.load(f)
+    students, app_records = make_students(count)
+    app = FakeSchoolDaysDriver(coords, app_records, action_latency=action_latency,
+                               key_latency=key_latency, load_latency=load_latency)
+
+    timer = RunTimer(app.now, total=len(students), progress_every=0)
+
+    # Keep the run's reports and session store out of the working tree
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        store_file, session_store.STORE_FILE = session_store.STORE_FILE, os.path.join(tmp, "sessions.sqlite3")
+        reports_dir, main.REPORTS_DIR = main.REPORTS_DIR, os.path.join(tmp, "reports")
+        try:
+            with redirect_stdout(StringIO()):
+                ok = main.run_entry_loop(iter(students), coords, app, timer=timer)
+        finally:
+            main.close_sessions()
+            session_store.STORE_FILE = store_file
+            main.REPORTS_DIR = reports_dir
+            os.chdir(cwd)
+
+    entered = [s for s in students
+               if app.records.get(s['id'], {}).get('last_name_box') == s['last_name']]
+    wrong = [s for s in entered if app.records[s['id']]['option'] != s['selection']]
+
+    minutes = app.clock / 60
+    print(f"--- YEARBOOK ENTRY BENCHMARK (simulated app, {count} students) ---")
+    print(f"Latency: action={action_latency}s key={key_latency}s load={load_latency}s")
+    print(f"Simulated run time: {app.clock:.1f} s ({app.action_count} UI actions)")
+    print(f"Throughput: {count / minutes:.1f} students/min")
+    print(f"Entered correctly: {len(entered) - len(wrong)}/{len(entered)} matching records")
+    timer.print_report()
+    return ok and not wrong
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless yearbook entry benchmark")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--action-latency", type=float, default=0.1)
+    parser.add_argument("--key-latency", type=float, default=0.01)
+    parser.add_argument("--load-latency", type=float, default=0.25)
+    args = parser.parse_args()
+    if not run_benchmark(args.students, args.action_latency, args.key_latency, args.load_latency):
+        sys.exit(1)
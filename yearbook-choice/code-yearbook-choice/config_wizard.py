@@ -1,49 +1,63 @@
+import argparse
 import pyautogui
-import json
 import os
 import time
+from calibration import auto_calibrate, crop_field, display_key, save_calibration, screen_scale, to_gray
 
 COORD_FILE = os.path.join(os.path.dirname(__file__), "coordinates.json")
 
+# (coordinate name, prompt, note printed before the prompt or None), in wizard order
+FIELDS = [
+    ("search_box", "SEARCH INPUT BOX (Where you type Student ID)", None),
+    ("last_name_box", "LAST NAME FIELD (To verify student exists)", None),
+    ("web_entry_input_box", "WEB ENTRY INPUT (Where we type 'auto')", None),
+    ("option_a", "OPTION 'A' (The first item in the list)",
+     "\nNow we need the locations for the Yearbook selection list."),
+    ("option_b", "OPTION 'B' (The second item in the list)", None),
+    ("option_c", "OPTION 'C' (The third item in the list)", None),
+    # We don't need 'd' if it's default, but good to have if we need to explicitly click it later.
+    ("option_d", "OPTION 'D' (The fourth/last item)", None),
+]
+
 def get_coordinate(prompt_name):
+    """
+    Returns: ({'x', 'y'} under the mouse, screenshot taken at that moment)
+    """
     print(f"\n--- {prompt_name} ---")
     print("1. Move your mouse cursor.")
     print("2. Press 'Enter' when ready (do not click).")
     input("Waiting for Enter...")
     point = pyautogui.position()
     print(f"Captured: {point}")
-    return {"x": point.x, "y": point.y}
+    return {"x": point.x, "y": point.y}, pyautogui.screenshot()
+
+def run_wizard(manual=False):
+    # Later launches: find the window (or each field) from what the last manual run saved for this display
+    if not manual:
+        if auto_calibrate(COORD_FILE, pyautogui.screenshot(), pyautogui.size(), [f[0] for f in FIELDS]):
+            return
+        print("Falling back to the setup wizard.\n")
 
-def run_wizard():
     print("Welcome to the School Days Plus Automation Setup.")
     print("We need to learn where the buttons are on YOUR screen.")
     print("-----------------------------------------------------")
-    
+
     coords = {}
-    
-    # 1. Search Box
-    coords["search_box"] = get_coordinate("SEARCH INPUT BOX (Where you type Student ID)")
-
-    # 1.5 Last Name Box (For Validation)
-    coords["last_name_box"] = get_coordinate("LAST NAME FIELD (To verify student exists)")
-       
-    # 2. Audit Trail Locations
-    coords["web_entry_input_box"] = get_coordinate("WEB ENTRY INPUT (Where we type 'auto')")
-
-    # 3. Option Locations
-    print("\nNow we need the locations for the Yearbook selection list.")
-    
-    coords["option_a"] = get_coordinate("OPTION 'A' (The first item in the list)")
-    coords["option_b"] = get_coordinate("OPTION 'B' (The second item in the list)")
-    coords["option_c"] = get_coordinate("OPTION 'C' (The third item in the list)")
-    # We don't need 'd' if it's default, but good to have if we need to explicitly click it later.
-    coords["option_d"] = get_coordinate("OPTION 'D' (The fourth/last item)")
+    crops = {}
+    for name, prompt, note in FIELDS:
+        if note:
+            print(note)
+        coords[name], screenshot = get_coordinate(prompt)
+        # Small picture of the field for auto-calibration next time
+        crops[name] = crop_field(to_gray(screenshot), coords[name]['x'], coords[name]['y'],
+                                 screen_scale(screenshot, pyautogui.size()))
 
+    save_calibration(COORD_FILE, coords, crops, display_key(screenshot, pyautogui.size()))
 
-    with open(COORD_FILE, "w") as f:
-        json.dump(coords, f, indent=4)
-    
     print(f"\nSuccess! Coordinates saved to {COORD_FILE}.")
 
 if __name__ == "__main__":
-    run_wizard()
+    parser = argparse.ArgumentParser(description="Teach the automation where the School Days fields are")
+    parser.add_argument("--manual", action="store_true",
+                        help="Point at every field again instead of finding them from saved screenshots")
+    run_wizard(manual=parser.parse_args().manual)
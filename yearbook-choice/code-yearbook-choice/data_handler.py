@@ -1,62 +1,71 @@
-import pandas as pd
 import os
 from datetime import datetime
+from entered_snapshot import CHANGE_UNCHANGED, load_snapshot, compute_delta
 
-def load_and_process_data(excel_path):
+def load_and_process_data(excel_path, all_students=False):
     """
-    Reads the Excel file, groups by Student ID, and finds the entry 
-    with the latest Yearbook Date.
+    Loads the validated students (newest Yearbook Date per Student ID,
+    picked by validate_data.py) that are new or changed since they were last
+    entered, or every one of them with all_students=True.
     
     Returns: A list of dicts, each representing a student to process.
     """
-    from excel_utils import find_column_robust, get_excel_path
-    
-    cleaned_path = os.path.join(os.path.dirname(__file__), "cleaned_data.xlsx")
-    
-    if not os.path.exists(cleaned_path):
-        print("Error: 'cleaned_data.xlsx' not found.")
+    return list(iter_students(excel_path, all_students))
+
+def iter_students(excel_path, all_students=False):
+    """
+    Reads the validated students from the typed handoff file (cleaned_data.arrow)
+    written by validate_data.py: memory-mapped, no Excel parsing or column search.
+    Students already entered with the same selection (entered_snapshot.jsonl)
+    are left out unless all_students is True.
+
+    Yields: dicts with 'id', 'last_name' and 'selection'.
+    """
+    from handoff import HANDOFF_FILE, read_handoff
+
+    if not os.path.exists(HANDOFF_FILE):
+        print("Error: 'cleaned_data.arrow' not found.")
         print("Please run Step 1 (Setup/Validation) first to generate it.")
-        return []
+        return
 
-    print(f"Loading cleaned data from: {cleaned_path}")
+    print(f"Loading cleaned data from: {HANDOFF_FILE}")
 
     try:
-        df = pd.read_excel(cleaned_path)
+        table = read_handoff(HANDOFF_FILE)
     except Exception as e:
-        print(f"Error reading {cleaned_path}: {e}")
-        return []
-    
-    processed_data = []
+        print(f"Error reading {HANDOFF_FILE}: {e}")
+        return
 
-    # Identify columns again (robustly, just in case)
-    student_id_col = find_column_robust(df, "student id")
-    selection_col = find_column_robust(df, ["yearbook photo", "selection"])
-    last_name_col = find_column_robust(df, "student last name")
-    
-    if not student_id_col or not selection_col or not last_name_col:
-        print("Error: 'Student ID', 'Yearbook Selection', or 'Student Last Name' column missing in cleaned data.")
-        return []
-
-    # Iterate - Data is already deduped and valid
-    for index, row in df.iterrows():
-        sid = row[student_id_col]
-        
-        # Selection
-        if selection_col and pd.notna(row[selection_col]):
-             sel = str(row[selection_col]).lower().strip()
-        else:
-             sel = 'd' # Default
-        
-        # Last Name
-        lname = ""
-        if last_name_col and pd.notna(row[last_name_col]):
-             lname = str(row[last_name_col]).strip()
-        
-        entry = {
-            'id': str(sid),
+    columns = table.select(['id', 'last_name', 'selection']).to_pydict()
+    changes = _changes(columns)
+    if not all_students:
+        unchanged = changes.count(CHANGE_UNCHANGED)
+        if unchanged:
+            print(f"Skipping {unchanged} student(s) already entered with the same selection (use --all to redo them).")
+
+    for sid, lname, sel, change in zip(columns['id'], columns['last_name'], columns['selection'], changes):
+        if change == CHANGE_UNCHANGED and not all_students:
+            continue
+        yield {
+            'id': sid,
             'last_name': lname,
             'selection': sel
         }
-        processed_data.append(entry)
 
-    return processed_data
\ No newline at end of file
+def _changes(columns):
+    # Compared with the snapshot as it is now, so a second run skips what the first entered
+    changes, _ = compute_delta(columns['id'], columns['selection'], load_snapshot())
+    return changes
+
+def count_changed_students():
+    """
+    Returns: (students to enter by default, all validated students), or None without a handoff file.
+    """
+    from handoff import HANDOFF_FILE, read_handoff
+
+    try:
+        columns = read_handoff(HANDOFF_FILE).select(['id', 'selection']).to_pydict()
+    except Exception:
+        return None
+    changes = _changes(columns)
+    return len(changes) - changes.count(CHANGE_UNCHANGED), len(changes)
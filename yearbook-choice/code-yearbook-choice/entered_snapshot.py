@@ -0,0 +1,89 @@
+import json
+import os
+from datetime import datetime
+from checkpoint_journal import content_hash
+
+# What is already in School Days: one line per student entered, kept across sessions
+# (unlike run_journal.jsonl, which only lives until the next fresh run).
+SNAPSHOT_FILE = os.path.join(os.path.dirname(__file__), "entered_snapshot.jsonl")
+
+CHANGE_NEW = "new"
+CHANGE_CHANGED = "changed"
+CHANGE_UNCHANGED = "unchanged"
+
+def entry_hash(sid, selection):
+    """Hash of what gets entered for a student (same as the run journal's)."""
+    return content_hash([sid, selection])
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """
+    Returns: {Student ID: {'id', 'last_name', 'selection', 'hash', 'time'}}, the last line per student.
+    """
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue # Torn last line from a crash mid-write
+            entries[entry['id']] = entry
+    return entries
+
+def compute_delta(ids, selections, snapshot):
+    """
+    Compares the validated students with what was entered before.
+
+    Returns: (change per student: 'new', 'changed' or 'unchanged',
+              snapshot entries of students no longer in the export)
+    """
+    changes = []
+    for sid, selection in zip(ids, selections):
+        entry = snapshot.get(sid)
+        if entry is None:
+            changes.append(CHANGE_NEW)
+        elif entry['hash'] != entry_hash(sid, selection):
+            changes.append(CHANGE_CHANGED)
+        else:
+            changes.append(CHANGE_UNCHANGED)
+    current = set(ids)
+    removed = [entry for sid, entry in snapshot.items() if sid not in current]
+    return changes, removed
+
+def compact_snapshot(snapshot, keep_ids, path=SNAPSHOT_FILE):
+    """
+    Rewrites the snapshot with one line per student still in the export,
+    so removed students are only reported once.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for sid, entry in snapshot.items():
+            if sid in keep_ids:
+                f.write(json.dumps(entry) + "\n")
+    os.replace(tmp_path, path)
+
+class EnteredSnapshot:
+    """
+    Appends each student entered into School Days to the snapshot, fsync'd per write
+    like the run journal, so the next validation knows what is already there.
+    """
+    def __init__(self, path=SNAPSHOT_FILE):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+
+    def record(self, student):
+        line = json.dumps({
+            'id': str(student['id']),
+            'last_name': student.get('last_name', ''),
+            'selection': student['selection'],
+            'hash': entry_hash(student['id'], student['selection']),
+            'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        self.file.write(line + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
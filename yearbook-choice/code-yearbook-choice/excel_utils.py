@@ -1,6 +1,9 @@
 import glob
 import os
 
+# School Days Plus roster exports (roster.py), kept next to the exports but not one of them
+ROSTER_NAMES = ("roster.xlsx", "roster.csv")
+
 def find_column_robust(dataframe, keywords):
     """
     Helper to find a column by keyword (case-insensitive).
@@ -15,20 +18,10 @@ def find_column_robust(dataframe, keywords):
                  return col
     return None
 
-def get_excel_path(directory="."):
+def get_excel_paths(directory="."):
     """
-    Finds the first .xlsx file in the specified directory.
+    Every .xlsx file in the directory, sorted by name (Excel's ~$ lock files and the roster are skipped).
     """
     search_path = os.path.join(directory, "*.xlsx")
-    excel_files = glob.glob(search_path)
-    
-    if not excel_files:
-        return None
-        
-    if len(excel_files) > 1:
-        print(f"Error: Multiple Excel files found ({len(excel_files)}). Maximum allowed is 1.")
-        print(f"Files found: {[os.path.basename(f) for f in excel_files]}")
-        print("Please remove extra files to ensure we process the correct one.")
-        return None
-        
-    return excel_files[0]
+    return sorted(f for f in glob.glob(search_path)
+                  if not os.path.basename(f).startswith("~$") and os.path.basename(f).lower() not in ROSTER_NAMES)
@@ -0,0 +1,91 @@
+import os
+import pandas as pd
+import pyarrow as pa
+from ingest import SOURCE_ROW_COLUMN
+
+# validate_data.py -> main.py handoff: one Arrow IPC file with a fixed schema,
+# memory-mapped and read in one go by data_handler.py.
+HANDOFF_FILE = os.path.join(os.path.dirname(__file__), "cleaned_data.arrow")
+CLEAN_XLSX_FILE = os.path.join(os.path.dirname(__file__), "cleaned_data.xlsx") # Optional, for humans
+
+HANDOFF_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('last_name', pa.string()),
+    ('selection', pa.string()),
+    ('source_row', pa.int64()),       # Row number in the original Excel file (header is row 1)
+    ('parsed_date', pa.timestamp('us')),
+])
+
+def _cell_text(v):
+    # Whole floats (IDs in a column with blanks) read back as ints from the old xlsx handoff
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    return str(v).strip()
+
+def _clean_text(values, default=""):
+    return [_cell_text(v) if pd.notna(v) else default for v in values]
+
+def build_handoff_table(clean_df, student_id_col, last_name_col, selection_col, date_col):
+    """
+    Turns validated rows (index = position in the original sheet) into the handoff table.
+    Rows merged from several exports carry their row number in SOURCE_ROW_COLUMN instead.
+    """
+    if SOURCE_ROW_COLUMN in clean_df.columns:
+        source_rows = [int(r) for r in clean_df[SOURCE_ROW_COLUMN]]
+    else:
+        source_rows = [int(i) + 2 for i in clean_df.index]
+
+    if date_col:
+        dates = pd.to_datetime(clean_df[date_col], errors='coerce').astype('datetime64[us]')
+        parsed_dates = pa.Array.from_pandas(dates.reset_index(drop=True), type=pa.timestamp('us'))
+    else:
+        parsed_dates = pa.nulls(len(clean_df), type=pa.timestamp('us'))
+
+    return pa.table({
+        'id': _clean_text(clean_df[student_id_col].tolist()),
+        'last_name': _clean_text(clean_df[last_name_col].tolist()) if last_name_col else [""] * len(clean_df),
+        # Selections are already validated; 'd' stays the default like the old loader
+        'selection': [s.lower() for s in _clean_text(clean_df[selection_col].tolist(), default='d')],
+        'source_row': source_rows,
+        'parsed_date': parsed_dates,
+    }, schema=HANDOFF_SCHEMA)
+
+def write_handoff(table, path=HANDOFF_FILE, session_id=None):
+    """
+    session_id: the validation's session in the store, which main.py continues (see handoff_session).
+    """
+    if session_id is not None:
+        table = table.replace_schema_metadata({b"session_id": str(session_id).encode()})
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path) # main.py never sees a half-written file
+
+def read_handoff(path=HANDOFF_FILE):
+    """
+    Returns: the handoff table (memory-mapped, no parsing). Raises ValueError on a schema mismatch.
+    """
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    if not table.schema.equals(HANDOFF_SCHEMA):
+        raise ValueError(f"{os.path.basename(path)} has an unexpected layout; run validation again")
+    return table
+
+def handoff_session(path=HANDOFF_FILE):
+    """
+    Returns: the store session ID of the validation that wrote the handoff (None if there is
+    no handoff, or it came from an older validate_data.py). Only the file's schema is read.
+    """
+    if not os.path.exists(path):
+        return None
+    with pa.memory_map(path, "r") as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    session_id = metadata.get(b"session_id")
+    return int(session_id) if session_id else None
+
+def export_xlsx(table, path=CLEAN_XLSX_FILE):
+    """
+    Writes the handoff table as an Excel sheet for people to look at (not read back).
+    """
+    table.to_pandas().to_excel(path, index=False)
@@ -1,13 +1,33 @@
-import pyautogui
+import argparse
+import itertools
 import json
-import time
 import os
-import pyperclip
-import pandas as pd
 from datetime import datetime
-from data_handler import load_and_process_data
+from data_handler import load_and_process_data, iter_students, count_changed_students
+from student_stream import stream_in_background
+from ui_driver import get_driver, FailSafeException
+from ui_waits import capture, LOAD_TIMEOUT
+from checkpoint_journal import CheckpointJournal
+from entered_snapshot import EnteredSnapshot
+from session_store import get_session, close_sessions
+from run_timing import RunTimer, format_duration
+from text_entry import TextEntry, METHODS, AUTO
+from pacing import PACING, read_after_load
+from roster import load_roster, ROSTER_OK, ROSTER_MISSING, ROSTER_MISMATCH
+from retry_queue import RetryQueue, RETRY_PASSES
+from verification import VerificationScheduler, VERIFY_EVERY, DETECT_WITHIN, RELOAD_TIMEOUT
+from action_plan import (PLAN_FILE, compile_yearbook_student, run_ops, search, save_plan, load_plan, diff_plans,
+                         estimate_seconds)
 
 COORD_FILE = os.path.join(os.path.dirname(__file__), "coordinates.json")
+JOURNAL_FILE = os.path.join(os.path.dirname(__file__), "run_journal.jsonl")
+# yearbook-choice/reports, wherever we are run from (the combined tool runs from package-choice)
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
+SESSION_TOOL = "yearbook" # This tool's sessions in the shared store (session_store.py)
+
+# How text goes into each field (text_entry.py); unlisted fields use TEXT_ENTRY.default (--input)
+FIELD_INPUT_METHODS = {}
+TEXT_ENTRY = TextEntry(FIELD_INPUT_METHODS)
 
 # Global timestamp for this run instance
 SESSION_TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -19,97 +39,222 @@ def load_coordinates():
     with open(COORD_FILE, "r") as f:
         return json.load(f)
 
+def get_store_session():
+    """
+    This run's session in the shared store: the one left open by the validation that wrote
+    the current handoff, if it is still open (its errors and ours end up in one report), else a new one.
+    """
+    from handoff import HANDOFF_FILE, handoff_session
+    return get_session(SESSION_TOOL, SESSION_TIMESTAMP, resume=handoff_session(HANDOFF_FILE))
+
+def get_runtime_error_file():
+    session = get_store_session()
+    if session.resumed:
+        return os.path.join(REPORTS_DIR, f"session-errors-{session.stamp}.csv")
+    # Running standalone (no validation session to continue)
+    return os.path.join(REPORTS_DIR, f"run-runtime-errors-{SESSION_TIMESTAMP}.csv")
+
 def log_runtime_error(student, reason):
-    # Try to find the shared session file from validate_data.py
-    session_info_path = os.path.join(os.path.dirname(__file__), "current_session.txt")
-    filename = None
-    
-    if os.path.exists(session_info_path):
-        try:
-            with open(session_info_path, "r") as f:
-                filename = f.read().strip()
-        except:
-            pass
-            
-    # Fallback if running standalone or read failed
-    if not filename:
-        reports_dir = "reports"
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir)
-        filename = os.path.join(reports_dir, f"run-runtime-errors-{SESSION_TIMESTAMP}.csv")
-    
     err_entry = student.copy()
     if 'error_reason' in err_entry:
         del err_entry['error_reason']
         
     err_entry['error_reason'] = reason
     
-    # Create ordered dict/df (Natural order is fine since we just added error_reason last)
-    df = pd.DataFrame([err_entry])
-    header = not os.path.exists(filename)
+    # Batched into the session store; the CSV is exported from it at the end
     try:
-        df.to_csv(filename, mode='a', header=header, index=False)
+        get_store_session().error(get_runtime_error_file(), err_entry, student.get('id'), reason)
     except Exception as e:
         print(f"Failed to log runtime error: {e}")
 
-
-
 def log_success(student):
-    """Logs successfully processed students to a separate CSV."""
-    reports_dir = "reports"
-    if not os.path.exists(reports_dir):
-        os.makedirs(reports_dir)
-    filename = os.path.join(reports_dir, f"yearbook_choice_processed_data{SESSION_TIMESTAMP}.csv")
-    
-    # Create ordered dict/df
-    df = pd.DataFrame([student])
-    header = not os.path.exists(filename)
+    """Logs successfully processed students (exported to their own CSV)."""
+    filename = os.path.join(REPORTS_DIR, f"yearbook_choice_processed_data{SESSION_TIMESTAMP}.csv")
     try:
-        df.to_csv(filename, mode='a', header=header, index=False)
+        get_store_session().entered(filename, student, student.get('id'))
     except Exception as e:
         print(f"Failed to log success: {e}")
 
-def verify_field_is_editable(entry, field_name):
-    pyautogui.click(entry['x'], entry['y'])
-    time.sleep(.5)
+def verify_field_is_editable(driver, entry, field_name):
+    driver.click(entry['x'], entry['y'])
+    driver.sleep(.5)
     # Try to type
-    pyperclip.copy("")
-    pyautogui.doubleClick()
-    pyautogui.hotkey('ctrl', 'c')
-    initial_text = pyperclip.paste()
+    driver.copy_to_clipboard("")
+    driver.double_click()
+    driver.hotkey('ctrl', 'c')
+    initial_text = driver.read_clipboard()
 
     checked = False
     #if the text is empty, then the checkbox could be unchecked, so see if we can input anything
     if initial_text.lower().strip() == 'auto':
         checked = True
     else:
-        pyautogui.doubleClick()
-        pyautogui.typewrite("reset")
-        time.sleep(.1)
-        pyperclip.copy("")
-        pyautogui.doubleClick()
-        pyautogui.hotkey('ctrl', 'c')
-        pasted_text = pyperclip.paste()
-        pyautogui.doubleClick()
+        driver.double_click()
+        driver.type_text("reset")
+        driver.sleep(.1)
+        driver.copy_to_clipboard("")
+        driver.double_click()
+        driver.hotkey('ctrl', 'c')
+        pasted_text = driver.read_clipboard()
+        driver.double_click()
         if initial_text:
-            pyautogui.typewrite(initial_text)
+            driver.type_text(initial_text)
         else:
-            pyautogui.press('backspace')
+            driver.press('backspace')
         if pasted_text.lower().strip() == 'reset':
             checked = True
 
-    time.sleep(.1)
+    driver.sleep(.1)
 
     if not checked:
         print(f"{field_name} Field is unchecked. Please fix and restart the program.")
         return False
     return True
 
-def run_automation():
+def check_roster(student, roster):
+    """
+    Offline check against the School Days roster (roster.py), before any search.
+    Logs the runtime error and returns False for a student the app would reject.
+    """
+    sid = student['id']
+    excel_last_name = student.get('last_name', '')
+    status, roster_name = roster.check(sid, excel_last_name)
+    if status == ROSTER_MISSING:
+        print(f"  -> ROSTER: Student ID {sid} is not in the roster. Skipping.")
+        log_runtime_error(student, "Student ID not found in roster")
+        return False
+    if status == ROSTER_MISMATCH:
+        print(f"  -> ROSTER NAME MISMATCH: Roster has '{roster_name}', Expected '{excel_last_name}'. Skipping.")
+        log_runtime_error(student, f"Last Name Mismatch (Roster: {roster_name}, Expected: {excel_last_name})")
+        return False
+    return True
+
+def enter_web_entry(driver, coords):
+    """
+    Types "auto" in the Web Entry box (audit trail). Returns False if not configured.
+    """
+    if 'web_entry_input_box' not in coords:
+        return False  # Audit trail skipped if not configured
+
+    # Step A: Type "auto" in source box assuming it's enabled (Select All first to overwrite)
+    TEXT_ENTRY.enter(driver, 'web_entry_input_box', coords['web_entry_input_box'], "auto")
+    return True
+
+def click_yearbook_option(driver, coords, selection):
+    """
+    Clicks the yearbook option ('a'-'d'). Returns False for an unknown selection.
+    """
+    option_key = f"option_{selection}"
+    if selection not in ('a', 'b', 'c', 'd') or option_key not in coords:
+        print(f"  -> Unknown selection '{selection}'. Skipping.")
+        return False
+    driver.click(coords[option_key]['x'], coords[option_key]['y'])
+    return True
+
+def option_region(coords, padding=10):
+    """Screen region (left, top, width, height) around the yearbook option list."""
+    points = [pt for name, pt in coords.items() if name.startswith('option_')]
+    if not points:
+        return None
+    left = max(min(pt['x'] for pt in points) - padding, 0)
+    top = max(min(pt['y'] for pt in points) - padding, 0)
+    return (left, top, max(pt['x'] for pt in points) + padding - left, max(pt['y'] for pt in points) + padding - top)
+
+def search_student(driver, coords, sid, timeout=LOAD_TIMEOUT):
+    """
+    Searches a student and waits for the record on screen to change (or `timeout` to pass).
+    Returns: True if it was seen changing (False on timeout).
+    """
+    return search(driver, coords, sid, TEXT_ENTRY, timeout)
+
+def verify_entry(driver, coords, student, option_looks, before_click=None):
+    """
+    Searches the student again (so we see what School Days saved) and checks it (check_entry).
+    """
+    print(f"\n*** VERIFYING ENTRY: {student['id']} ***")
+    search_student(driver, coords, student['id'], RELOAD_TIMEOUT)
+    ok = check_entry(driver, coords, student, option_looks, before_click)
+    if ok:
+        print("✓ Verification passed")
+    return ok
+
+def check_entry(driver, coords, student, option_looks, before_click=None):
+    """
+    Read-back of a student already searched again. The Web Entry box must say "auto", and
+    the option list has no text to copy, so it must look like it did for earlier students
+    with the same selection and unlike any other selection's.
+    option_looks: {selection: option list capture}, learned from the students that pass.
+    before_click: the option list captured just before the click. A list that still looks
+    the same is not learned from (the click may have missed).
+    Returns: True if both hold; a mismatch is logged.
+    """
+    ok = True
+    if 'web_entry_input_box' in coords:
+        found = read_after_load(driver, coords['web_entry_input_box'], lambda t: t.lower() == "auto")
+        if found.lower() != "auto":
+            print(f"✗ VERIFICATION FAILED: Web Entry shows '{found}'")
+            log_runtime_error(student, f"Verification Failed (Web Entry: '{found}', Expected: 'auto')")
+            ok = False
+
+    region = option_region(coords)
+    if region:
+        selection = student['selection']
+        look = capture(driver, region)
+        looks_like = [sel for sel, seen in option_looks.items() if seen == look]
+        if (looks_like and selection not in looks_like) or (selection in option_looks and option_looks[selection] != look):
+            shown = looks_like[0] if looks_like else "unknown"
+            print(f"✗ VERIFICATION FAILED: option list shows '{shown}', Expected '{selection}'")
+            log_runtime_error(student, f"Verification Failed (Option list shows: {shown}, Expected: {selection})")
+            ok = False
+        elif ok and look != before_click:
+            option_looks[selection] = look
+    return ok
+
+def compile_plan(students, coords):
+    """
+    Yields one plan block (action_plan.py) per student, as students arrive.
+    """
+    for student in students:
+        yield compile_yearbook_student(student, coords)
+
+def dry_run(coords, all_students=False):
+    """
+    Compiles every student without touching the app: prints what changed since the
+    last saved plan and an estimated run time, then saves the plan for `--plan`.
+    """
+    students = load_and_process_data(None, all_students)
+    if not students:
+        print("No student data found.")
+        return False
+    blocks = list(compile_plan(students, coords))
+    new_ids, changed, removed = diff_plans(load_plan(), blocks)
+    print(f"Plan: {len(blocks)} students, {sum(len(b['ops']) for b in blocks)} UI steps")
+    print(f"Changes since the last plan: {len(new_ids)} new, {len(changed)} changed, {len(removed)} removed")
+    to_run = blocks
+    roster = load_roster()
+    if roster is not None:
+        to_run = [b for b in blocks if roster.check(b['id'], b['last_name'])[0] == ROSTER_OK]
+        print(f"Roster: {len(blocks) - len(to_run)} student(s) will be skipped without searching")
+    seconds = estimate_seconds(to_run, coords, TEXT_ENTRY)
+    print(f"Estimated run time: {format_duration(seconds)} (simulated app with default latencies)")
+    save_plan(blocks)
+    print(f"saved action plan to: {PLAN_FILE} (run it with --plan)")
+    return True
+
+def run_automation(stream=True, driver=None, resume=False, all_students=False, adaptive_pacing=True, plan=False,
+                   trust_roster=False, verify_every=VERIFY_EVERY, verify_confidence=None,
+                   retry_passes=RETRY_PASSES):
     coords = load_coordinates()
     if not coords:
         return False
 
+    # Nothing changed since the last entry: done without touching the app
+    counts = None if plan else count_changed_students()
+    if counts and not all_students and counts[0] == 0:
+        print(f"Nothing to enter: all {counts[1]} student(s) are already entered with the same selection.")
+        print("(Run main.py with --all to enter everyone again.)")
+        return True
+
     # User Safety Prompt
     print("--- READY TO START ---")
     print("1. Make sure the window is in the SAME position as when you ran the wizard.")
@@ -117,121 +262,258 @@ def run_automation():
     print("3. Move your mouse to the corner of the screen to trigger a FAILSAFE abort.")
     print("----------------------")
     
-    # data_handler will find the first .xlsx file automatically
-    students = load_and_process_data(None) # Passing None as we updated logic to find file internally
+    total = None
+    if plan:
+        # The plan saved by --dry-run, exactly as compiled then
+        blocks = load_plan()
+        if not blocks:
+            print("Error: action_plan.jsonl not found or empty. Run main.py --dry-run first!")
+            return False
+        print(f"Loaded a plan of {len(blocks)} students.")
+        total = len(blocks)
+        blocks = iter(blocks)
+    elif stream:
+        # Rows are read in the background while the countdown and field checks run,
+        # once the first one shows there is something to enter (like --no-stream)
+        students = stream_in_background(iter_students(None, all_students))
+        first = next(students, None)
+        if first is None:
+            print("No student data found.")
+            return False
+        blocks = compile_plan(itertools.chain([first], students), coords)
+        if counts:
+            total = counts[1] if all_students else counts[0] # For the progress ETA
+    else:
+        # data_handler will find the first .xlsx file automatically
+        students = load_and_process_data(None, all_students) # Passing None as we updated logic to find file internally
 
-    if not students:
-        print("No student data found.")
-        return False
+        if not students:
+            print("No student data found.")
+            return False
+        total = len(students)
+        blocks = compile_plan(students, coords)
+
+    # Crash-safe record of finished students (fresh unless resuming)
+    journal = CheckpointJournal(JOURNAL_FILE, resume=resume)
+    if resume:
+        print(f"Resuming: {len(journal.finished)} student(s) already finished will be skipped.")
+    # What ends up in School Days, kept across sessions for the next validation's delta
+    snapshot = EnteredSnapshot()
+    # Students the roster rules out are logged without searching them
+    roster = load_roster()
+    # Delays learned on this machine in earlier runs (pacing_profile.json)
+    if adaptive_pacing:
+        PACING.load_profile()
+    driver = driver or get_driver(pause=PACING.delay('ui_pause'))
+    PACING.attach(driver)
+    timer = RunTimer(driver.now, total=total)
+    verifier = VerificationScheduler(verify_every, verify_confidence)
+    retries = RetryQueue(retry_passes)
+    try:
+        return run_plan(blocks, coords, driver, journal, timer, snapshot, roster, trust_roster, verifier, retries)
+    finally:
+        journal.close()
+        print(f"Verification: {verifier.summary()}")
+        snapshot.close()
+        PACING.save_profile()
+        print(f"Pacing: {PACING.summary()}")
+        close_sessions() # Save the session and export its reports (also runs at exit)
+        timer.print_report()
+        timing_file = timer.save(os.path.join(REPORTS_DIR, f"yearbook-timing-{SESSION_TIMESTAMP}.json"))
+        print(f"saved timing report to: {timing_file}")
 
+def run_entry_loop(students, coords, driver, journal=None, timer=None, snapshot=None, roster=None,
+                   trust_roster=False, verifier=None, retries=None):
+    """
+    Enters every student through the given UI driver (real pyautogui or the fake app),
+    compiling each student's plan block as it is reached (see run_plan).
+    """
+    return run_plan(compile_plan(students, coords), coords, driver, journal, timer, snapshot, roster, trust_roster,
+                    verifier, retries)
+
+def run_plan(blocks, coords, driver, journal=None, timer=None, snapshot=None, roster=None,
+             trust_roster=False, verifier=None, retries=None):
+    """
+    Runs plan blocks (action_plan.py) one student at a time.
+    Finished students are written to the journal; ones it already has are skipped.
+    Students entered successfully are also added to `snapshot` (an EnteredSnapshot).
+    With a `roster` (a RosterIndex), students it rules out are logged without a search;
+    trust_roster also skips the live last-name check for the others, unless the record
+    wasn't seen changing after the search (then the name is read as usual).
+    Students the verifier (a VerificationScheduler; default settings if not given) picks
+    are searched again and read back (verify_entry); the run stops when it says so.
+    Students whose last name doesn't show up right are entered again at the end with
+    longer waits (`retries`, a RetryQueue; default settings if not given).
+    Each step is timed per student on `timer` (a RunTimer; one is made if not given).
+    """
     # Wait a sec to switch focus
     print("Starting in 3 seconds...")
-    time.sleep(3)
+    driver.sleep(3)
+    if timer is None:
+        timer = RunTimer(driver.now)
+    if verifier is None:
+        verifier = VerificationScheduler()
+    if retries is None:
+        retries = RetryQueue()
 
     # 0. INITIALIZATION: Ensure "Web Entry" is UNCHECKED (Reset State)
     # We do this once at the start to ensure we don't carry over manual checks
     if 'web_entry_input_box' in coords:
-        if not verify_field_is_editable(coords['web_entry_input_box'], "Web Entry"):
+        if not verify_field_is_editable(driver, coords['web_entry_input_box'], "Web Entry"):
             return False
             
     # 0.5. INITIALIZATION: Ensure "Last Name" is UNCHECKED (Reset State)
     if 'last_name_box' in coords:
-        if not verify_field_is_editable(coords['last_name_box'], "Last Name"):
+        if not verify_field_is_editable(driver, coords['last_name_box'], "Last Name"):
             return False
     
-    for i, student in enumerate(students):
-        sid = student['id']
-        selection = student['selection']
-                
-        # 1. Search
-        pyautogui.click(coords['search_box']['x'], coords['search_box']['y'])
-        pyautogui.doubleClick() 
-        pyautogui.typewrite(sid)
-        pyautogui.press('enter') 
-        
-        time.sleep(.1) 
-        
-        # 2. VALIDATION: Check Last Name
-        if 'last_name_box' in coords:
-            pyautogui.click(coords['last_name_box']['x'], coords['last_name_box']['y'])
-            pyautogui.tripleClick()
-            time.sleep(.1)
-            pyautogui.hotkey('ctrl', 'c')
-            time.sleep(.1)
-            
-            last_name = pyperclip.paste().strip()
-            
+    # How the option list looks for each selection, learned from verified students
+    options = option_region(coords)
+    option_looks = {}
+
+    processed_count = 0
+    resumed_count = 0
+    roster_skipped = 0
+    for block in retries.run(blocks, driver):
+        if not retries.attempt:
+            processed_count += 1
+        sid = block['id']
+        excel_last_name = block['last_name']
+        student = {'id': sid, 'last_name': excel_last_name, 'selection': block['selection']}
+
+        if journal and journal.is_finished(sid, block['hash']):
+            resumed_count += 1
+            timer.skip_student()
+            continue
+
+        timer.start_student()
+
+        # 0. Offline roster check (no UI)
+        ops = block['ops']
+        if roster is not None:
+            if not check_roster(student, roster):
+                roster_skipped += 1
+                if journal: journal.record(sid, block['hash'], 'error')
+                continue
+            if trust_roster:
+                ops = [dict(op, trusted=True) if op['op'] == 'check_name' else op for op in ops]
+
+        # 1-2. Search, check the last name, audit trail ("auto" in Web Entry)
+        # The option click comes last: the option list is captured just before it for the read-back
+        click_at = next((i for i, op in enumerate(ops) if op['op'] == 'click'), len(ops))
+        errors = []
+        def log_error(product, reason):
+            print(f"  -> {reason}. Skipping.")
+            log_runtime_error(student, reason)
+            errors.append(reason)
+
+        last_name = run_ops(driver, coords, ops[:click_at], TEXT_ENTRY, log_error, timer, retries.recheck_timeout())
+        if last_name is not None:
             if not last_name:
                 print(f"  -> VALIDATION FAILED: Student ID {sid} not found (Last Name empty). Skipping.")
+                if retries.retry(sid, block, last_name):
+                    print("     Will try again at the end of the run.")
+                    continue
                 log_runtime_error(student, "Student ID not found (Empty Last Name)")
-                continue
-                
-            if excel_last_name:
-                # Handle hyphenated names (App might select "Walsh-" with trailing hyphen)
-                expected_parts = excel_last_name.lower().split('-')
-                first_part = expected_parts[0].strip().lower()
-                first_part_with_hyphen = first_part + '-'
-                
-                # Allow match if found name is: full name, first part only, OR first part with hyphen
-                is_match = (last_name.lower() == excel_last_name.lower()) or \
-                           (last_name.lower() == first_part) or \
-                           (last_name.lower() == first_part_with_hyphen)
-                
-                if not is_match:
-                    print(f"  -> NAME MISMATCH: Found '{last_name}', Expected '{excel_last_name}'")
-                    log_runtime_error(student, f"Last Name Mismatch (Found: {last_name}, Expected: {excel_last_name})")
+            else:
+                # Hyphen-aware (App might select "Walsh-" with trailing hyphen)
+                print(f"  -> NAME MISMATCH: Found '{last_name}', Expected '{excel_last_name}'")
+                if retries.retry(sid, block, last_name):
+                    print("     Will try again at the end of the run.")
                     continue
-            
-        else:
-             pass  # Validation skipped if not configured
- 
-        # 2. Audit Trail (Check "Web Entry" and type "auto")
-        if 'web_entry_input_box' in coords:
-            # Step A: Try to type "auto" in source box assuming it's enabled
-            pyautogui.click(coords['web_entry_input_box']['x'], coords['web_entry_input_box']['y'])
-            time.sleep(.1)
-            
-            # Select All to overwrite (Clean entry)
-            pyautogui.tripleClick()
-            time.sleep(.1)
-            
-            # Type "auto"
-            pyautogui.typewrite("auto")
-            time.sleep(.1)
-        
-        else:
-            pass  # Audit trail skipped if not configured
-        
-        # 3. Select Option
-        if selection == 'd':
-            pyautogui.click(coords['option_d']['x'], coords['option_d']['y'])
-        elif selection == 'a':
-            pyautogui.click(coords['option_a']['x'], coords['option_a']['y'])
-        elif selection == 'b':
-            pyautogui.click(coords['option_b']['x'], coords['option_b']['y'])
-        elif selection == 'c':
-            pyautogui.click(coords['option_c']['x'], coords['option_c']['y'])
-        else:
-            print(f"  -> Unknown selection '{selection}'. Skipping.")
-        
-        # Small pause between records
-        time.sleep(.1)
+                log_runtime_error(student, f"Last Name Mismatch (Found: {last_name}, Expected: {excel_last_name})")
+            if journal: journal.record(sid, block['hash'], 'error')
+            continue
+
+        # 3. Select Option (a sample of students is read back afterwards)
+        sampled = verifier.should_verify()
+        before_click = capture(driver, options) if sampled and options else None
+        run_ops(driver, coords, ops[click_at:], TEXT_ENTRY, log_error, timer)
+        if errors:
+            if journal: journal.record(sid, block['hash'], 'error')
+            continue
+
+        # 4. Read-back check of the sample
+        if sampled and click_at < len(ops):
+            verified = verify_entry(driver, coords, student, option_looks, before_click)
+            timer.lap("verification")
+            if not verifier.record(verified):
+                print(f"[STOPPED] Read-back verification failed: {verifier.summary()}")
+                if journal: journal.record(sid, block['hash'], 'error')
+                return False
+            if not verified:
+                if journal: journal.record(sid, block['hash'], 'error')
+                continue
         
         # Log success
         log_success(student)
+        if snapshot: snapshot.record(student)
+        if journal: journal.record(sid, block['hash'], 'entered')
+        timer.lap("log_success")
+
+    timer.finish_student() # Close out the last student
+
+    if resumed_count:
+        print(f"Skipped {resumed_count} student(s) finished in a previous run.")
+    if roster_skipped:
+        print(f"Skipped {roster_skipped} student(s) the roster ruled out, without searching them (see the error report).")
+    if retries.retried:
+        print(f"Retries: {retries.summary()}")
+
+    if not processed_count:
+        print("No student data found.")
+        return False
 
     print("Automation Complete!")
     return True
 
 if __name__ == "__main__":
     import sys
+    parser = argparse.ArgumentParser(description="School Days yearbook choice automation")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Load every student before starting (old behavior)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip students finished before the last abort (see run_journal.jsonl)")
+    parser.add_argument("--all", action="store_true",
+                        help="Enter every validated student, not just new or changed ones")
+    parser.add_argument("--input", choices=METHODS, default=AUTO,
+                        help="How text is put into fields without their own setting in FIELD_INPUT_METHODS "
+                             "(auto: paste long values, type short ones)")
+    parser.add_argument("--verify-entry", action="store_true",
+                        help="Read every field back after entering it (slower)")
+    parser.add_argument("--verify-every", type=int, default=VERIFY_EVERY, metavar="N",
+                        help=f"Search every Nth student again and check it was saved (default {VERIFY_EVERY}; 1 = all)")
+    parser.add_argument("--verify-confidence", type=float, metavar="C",
+                        help=f"Check a random sample instead, sized so a fault is caught within "
+                             f"{DETECT_WITHIN} students with probability C (e.g. 0.95)")
+    parser.add_argument("--retry-passes", type=int, default=RETRY_PASSES, metavar="N",
+                        help=f"Passes at the end over students whose record seemed slow to load (default {RETRY_PASSES}; 0 = none)")
+    parser.add_argument("--fixed-pacing", action="store_true",
+                        help="Keep the default delays instead of tuning them (see pacing_profile.json)")
+    parser.add_argument("--trust-roster", action="store_true",
+                        help="Skip the live last-name check for students roster.xlsx/roster.csv confirms (faster)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Compile the action plan, show changes and an estimated run time, and stop")
+    parser.add_argument("--plan", action="store_true",
+                        help="Run the plan saved by --dry-run instead of reading the handoff "
+                             "(add --resume after a crash)")
+    args = parser.parse_args()
+    TEXT_ENTRY.default = args.input
+    TEXT_ENTRY.verify = args.verify_entry or ()
     try:
-        success = run_automation()
+        if args.dry_run:
+            coords = load_coordinates()
+            success = bool(coords) and dry_run(coords, args.all)
+        else:
+            success = run_automation(stream=not args.no_stream, resume=args.resume, all_students=args.all,
+                                     adaptive_pacing=not args.fixed_pacing, plan=args.plan,
+                                     trust_roster=args.trust_roster, verify_every=args.verify_every,
+                                     verify_confidence=args.verify_confidence, retry_passes=args.retry_passes)
         if success:
             sys.exit(0) # Success
         else:
             sys.exit(1) # Logic error or setup failure
-    except (pyautogui.FailSafeException, KeyboardInterrupt):
+    except (FailSafeException, KeyboardInterrupt):
         print("\n")
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
         print("   AUTOMATION ABORTED BY USER (FailSafe Triggered)")
@@ -0,0 +1,14 @@
+def last_name_matches(found, expected):
+    """
+    True if the last name shown in the app matches the expected one.
+    Handles hyphenated names: the app may show only the first part ("Walsh")
+    or the first part with a trailing hyphen ("Walsh-") for "Walsh-Lee".
+    """
+    found = (found or "").strip().lower()
+    expected = (expected or "").strip().lower()
+
+    first_part = expected.split('-')[0].strip()
+    first_part_with_hyphen = first_part + '-'
+
+    # Allow match if found name is: full name, first part only, OR first part with hyphen
+    return found == expected or found == first_part or found == first_part_with_hyphen
@@ -0,0 +1,160 @@
+import json
+import os
+import socket
+from ui_waits import read_field_text
+
+PROFILE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pacing_profile.json")
+
+# step -> (start, min, max, speed-up step) in seconds
+#   ui_pause     - pyautogui.PAUSE, the gap after every click/keypress. Readiness is
+#                  checked by polling the screen/clipboard (ui_waits), so it starts well
+#                  below pyautogui's 0.1s default.
+#   record_load  - extra wait after a searched record has drawn, before reading it
+#   photo_choice - wait after clicking a photo choice letter (was a fixed 0.1)
+#   field_entry  - wait after typing/pasting a value
+STEPS = {
+    'ui_pause':     (0.03, 0.01, 0.2, 0.002),
+    'record_load':  (0.0, 0.0, 2.0, 0.02),
+    'photo_choice': (0.1, 0.0, 1.0, 0.01),
+    'field_entry':  (0.0, 0.0, 1.0, 0.01),
+}
+SPEEDUP_AFTER = 20  # Successes in a row before a step gets one speed-up step faster
+BACKOFF = 2.0       # A miss multiplies the delay (and adds at least one speed-up step)
+RECHECK_TIMEOUT = 1.0 # How long read_after_load keeps re-reading a rejected field
+
+def machine_name():
+    return socket.gethostname() or "default"
+
+def _load_profiles(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {} # Unreadable profiles are relearned
+
+class PacingController:
+    """
+    Per-step delays tuned AIMD-style from what the app does: a miss (an empty or
+    wrong last name that reads right a moment later, a read-back mismatch) backs the
+    step off multiplicatively, and every SPEEDUP_AFTER successes in a row take one
+    small step off again. A step only speeds up on successes it actually saw.
+    Misses and successes of every step also count for 'ui_pause', which is pushed
+    to the driver (driver.set_pause) when it changes.
+
+    Not adaptive (the default): every delay stays at its start value.
+    """
+    def __init__(self, adaptive=False):
+        self.adaptive = adaptive
+        self.driver = None
+        self.delays = {step: start for step, (start, _, _, _) in STEPS.items()}
+        self.streaks = {step: 0 for step in STEPS}
+        self.misses = {step: 0 for step in STEPS}
+
+    def load_profile(self, path=PROFILE_FILE):
+        """Turns adaptation on, starting from what this machine learned in earlier runs."""
+        self.adaptive = True
+        for step, value in _load_profiles(path).get(machine_name(), {}).items():
+            if step in STEPS:
+                _, low, high, _ = STEPS[step]
+                self.delays[step] = min(max(float(value), low), high)
+        self._apply_pause()
+
+    def save_profile(self, path=PROFILE_FILE):
+        """Stores this machine's delays next to the other machines' profiles."""
+        if not self.adaptive:
+            return
+        profiles = _load_profiles(path)
+        profiles[machine_name()] = {step: round(delay, 4) for step, delay in self.delays.items()}
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(profiles, f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Note: pacing profile not saved ({e})")
+
+    def attach(self, driver):
+        self.driver = driver
+        self._apply_pause()
+
+    def _apply_pause(self):
+        if self.driver is not None and hasattr(self.driver, "set_pause"):
+            self.driver.set_pause(self.delays['ui_pause'])
+
+    def delay(self, step):
+        return self.delays[step]
+
+    def wait(self, driver, step):
+        if self.delays[step] > 0:
+            driver.sleep(self.delays[step])
+
+    def backoff_delay(self, step):
+        """The delay the step would get after a miss."""
+        _, _, high, speedup = STEPS[step]
+        delay = self.delays[step]
+        return min(max(delay * BACKOFF, delay + speedup), high)
+
+    def _back_off(self, step):
+        self.delays[step] = self.backoff_delay(step)
+        self.streaks[step] = 0
+        self.misses[step] += 1
+
+    def _speed_up(self, step):
+        _, low, _, speedup = STEPS[step]
+        self.streaks[step] += 1
+        if self.streaks[step] >= SPEEDUP_AFTER:
+            self.delays[step] = max(self.delays[step] - speedup, low)
+            self.streaks[step] = 0
+
+    def miss(self, step):
+        if not self.adaptive:
+            return
+        self._back_off(step)
+        if step != 'ui_pause':
+            self._back_off('ui_pause')
+        self._apply_pause()
+
+    def success(self, step):
+        if not self.adaptive:
+            return
+        pause = self.delays['ui_pause']
+        self._speed_up(step)
+        if step != 'ui_pause':
+            self._speed_up('ui_pause')
+        if self.delays['ui_pause'] != pause:
+            self._apply_pause()
+
+    def summary(self):
+        return ", ".join(f"{step} {delay:.3f}s ({self.misses[step]} misses)" for step, delay in self.delays.items())
+
+# One controller per process, shared by both tools' main.py (and so by combined_main.py)
+PACING = PacingController()
+
+def read_after_load(driver, coord, accept, pacing=PACING, timeout=None):
+    """
+    Reads a field of a freshly loaded record. If accept(text) is False (e.g. the last
+    name is empty), an adaptive controller keeps re-reading it for up to
+    RECHECK_TIMEOUT (or `timeout`, which re-reads with any controller); if it turns
+    out right, the record was just slow, which counts as a 'record_load' miss.
+    Students that really are missing leave the pacing alone.
+    Returns: the text read last.
+    """
+    pacing.wait(driver, 'record_load')
+    text = read_field_text(driver, coord)
+    if accept(text):
+        pacing.success('record_load')
+        return text
+    if timeout is None:
+        if not pacing.adaptive:
+            return text
+        timeout = RECHECK_TIMEOUT
+    deadline = driver.now() + timeout
+    while driver.now() < deadline:
+        driver.sleep(pacing.backoff_delay('record_load'))
+        text = read_field_text(driver, coord)
+        if accept(text):
+            pacing.miss('record_load')
+            break
+    return text
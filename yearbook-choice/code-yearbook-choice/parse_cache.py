@@ -0,0 +1,229 @@
+import datetime
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa # Required (requirements.txt); the yearbook handoff is Arrow too
+import pyarrow.feather as feather
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parse_cache")
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # Oldest-used entries are evicted past this size
+CACHE_VERSION = 2                    # Bump when the file layout below changes
+
+# Object columns hold mixed cells (an ID column with 123 and "A12", dates next to text).
+# Each one is saved as a kind code per cell plus one typed Arrow column per kind it uses
+# (other rows hold the filler), so loading is a few numpy assignments per column.
+KIND_CODES = "NXbifsTDdt" # N: None, X: NaT, the rest as in CELL_KINDS
+CELL_KINDS = {
+    # kind: (Arrow type, filler)
+    'b': (pa.bool_(), False),
+    'i': (pa.int64(), 0),
+    'f': (pa.float64(), 0.0),
+    's': (pa.string(), ""),
+    'T': (pa.timestamp('ns'), pd.Timestamp(0)),
+    'D': (pa.timestamp('us'), datetime.datetime(1970, 1, 1)),
+    'd': (pa.date32(), datetime.date(1970, 1, 1)),
+    't': (pa.time64('us'), datetime.time(0)),
+}
+
+def _cell_kind(v):
+    if v is None:
+        return 'N'
+    if v is pd.NaT:
+        return 'X'
+    if isinstance(v, bool):
+        return 'b'
+    if isinstance(v, int):
+        return 'i'
+    if isinstance(v, float):
+        return 'f'
+    if isinstance(v, str):
+        return 's'
+    if isinstance(v, (datetime.datetime, datetime.time)) and v.tzinfo is not None:
+        raise TypeError("can't cache cells with a time zone")
+    if isinstance(v, pd.Timestamp):
+        return 'T'
+    if isinstance(v, datetime.datetime):
+        return 'D'
+    if isinstance(v, datetime.date):
+        return 'd'
+    if isinstance(v, datetime.time):
+        return 't'
+    raise TypeError(f"can't cache cell of type {type(v).__name__}")
+
+def _save_cells(values, i, arrays):
+    kinds = [_cell_kind(v) for v in values]
+    arrays[f"k{i}"] = pa.array([KIND_CODES.index(k) for k in kinds], pa.int8())
+    for kind in set(kinds) & set(CELL_KINDS):
+        arrow_type, filler = CELL_KINDS[kind]
+        arrays[f"v{i}{kind}"] = pa.array([v if k == kind else filler for v, k in zip(values, kinds)], arrow_type)
+
+def _load_cells(table, i, rows):
+    codes = table.column(f"k{i}").to_numpy()
+    values = np.full(rows, None, dtype=object)
+    for code, kind in enumerate(KIND_CODES):
+        mask = codes == code
+        if kind == 'N' or not mask.any():
+            continue
+        if kind == 'X':
+            values[mask] = pd.NaT
+            continue
+        stored = table.column(f"v{i}{kind}").to_numpy(zero_copy_only=False)[mask]
+        # numpy gives back Python ints/floats/bools, datetimes and dates; Timestamps need pandas
+        values[mask] = pd.DatetimeIndex(stored).astype(object) if kind == 'T' else stored.astype(object)
+    return pd.Series(values, dtype=object)
+
+# Column names are saved as text plus a one-letter type
+def _encode_value(v):
+    if v is None:
+        return 'N', ""
+    if isinstance(v, bool):
+        return 'b', "1" if v else ""
+    if isinstance(v, int):
+        return 'i', str(v)
+    if isinstance(v, float):
+        return 'f', repr(float(v))
+    if isinstance(v, str):
+        return 's', v
+    if isinstance(v, pd.Timestamp):
+        return 'T', v.isoformat()
+    if isinstance(v, datetime.datetime):
+        return 'D', v.isoformat()
+    if isinstance(v, datetime.date):
+        return 'd', v.isoformat()
+    if isinstance(v, datetime.time):
+        return 't', v.isoformat()
+    raise TypeError(f"can't cache column name of type {type(v).__name__}")
+
+def _decode_value(kind, text):
+    if kind == 'N': return None
+    if kind == 'b': return bool(text)
+    if kind == 'i': return int(text)
+    if kind == 'f': return float(text)
+    if kind == 's': return text
+    if kind == 'T': return pd.Timestamp(text)
+    if kind == 'D': return datetime.datetime.fromisoformat(text)
+    if kind == 'd': return datetime.date.fromisoformat(text)
+    if kind == 't': return datetime.time.fromisoformat(text)
+    raise ValueError(f"unknown column name kind '{kind}'")
+
+_digests = {}
+
+def _file_digest(path):
+    # Hashed once per process and file version: the header and the frame share it
+    st = os.stat(path)
+    version = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    if version not in _digests:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        _digests[version] = h.hexdigest()
+    return _digests[version]
+
+def file_key(path, **read_kwargs):
+    """
+    Cache key: SHA-256 of the file contents plus its mtime and the read options.
+    """
+    h = hashlib.sha256(_file_digest(path).encode())
+    h.update(str(os.stat(path).st_mtime_ns).encode())
+    h.update(json.dumps(read_kwargs, sort_keys=True, default=repr).encode())
+    h.update(str(CACHE_VERSION).encode())
+    return h.hexdigest()[:32]
+
+def save_frame(df, path):
+    """
+    Writes a DataFrame as a Feather (Arrow) file that load_frame() turns back into an
+    identical frame. Raises TypeError for frames it can't store exactly.
+    """
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        raise TypeError("only frames with a default index can be cached")
+    plain, cells, layout = {}, {}, []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        if series.dtype == object:
+            _save_cells(series.tolist(), i, cells)
+            layout.append([_encode_value(name), "cells"])
+        else:
+            plain[f"c{i}"] = series.reset_index(drop=True)
+            layout.append([_encode_value(name), "plain"])
+
+    # Plain columns keep pandas' dtype metadata (str, Int64, category...) for read back
+    table = pa.Table.from_pandas(pd.DataFrame(plain, index=df.index), preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    arrays = dict(zip(table.column_names, table.columns), **cells)
+    table = pa.table(arrays) if arrays else pa.table({})
+    metadata[b"parse_cache"] = json.dumps({'rows': len(df), 'layout': layout}).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = path + ".tmp"
+    feather.write_feather(table, tmp_path)
+    os.replace(tmp_path, path) # Never leave a half-written entry behind
+
+def load_frame(path):
+    table = feather.read_table(path, memory_map=True)
+    info = json.loads(table.schema.metadata[b"parse_cache"])
+    plain = [f"c{i}" for i, (_, how) in enumerate(info['layout']) if how == "plain"]
+    # Typed columns straight from the memory map
+    stored = table.select(plain).to_pandas() if plain else None
+    data = {}
+    for i, (name, how) in enumerate(info['layout']):
+        name = _decode_value(*name)
+        if how == "cells":
+            data[name] = _load_cells(table, i, info['rows'])
+        else:
+            data[name] = stored[f"c{i}"]
+    return pd.DataFrame(data, index=pd.RangeIndex(info['rows']))
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, keep=None):
+    """
+    Deletes the least recently used entries (except `keep`) until the cache fits in max_bytes.
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.isfile(path) and path != keep:
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    if keep and os.path.exists(keep):
+        total += os.path.getsize(keep)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def read_excel_cached(excel_path, cache_dir=None, max_bytes=MAX_CACHE_BYTES, **read_kwargs):
+    """
+    Drop-in for pd.read_excel(excel_path, **read_kwargs) that keeps a columnar copy of
+    each parsed workbook, so the same export is only parsed by openpyxl once
+    (validation, then main, then every rerun after an abort).
+    cache_dir: defaults to CACHE_DIR.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    try:
+        cache_path = os.path.join(cache_dir, file_key(excel_path, **read_kwargs) + ".feather")
+        if os.path.exists(cache_path):
+            df = load_frame(cache_path)
+            os.utime(cache_path) # Mark as recently used for eviction
+            return df
+    except Exception as e:
+        print(f"Note: parse cache unreadable, reading the Excel file instead ({e})")
+        cache_path = None
+
+    df = pd.read_excel(excel_path, **read_kwargs)
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            save_frame(df, cache_path)
+            evict(cache_dir, max_bytes, keep=cache_path)
+        except Exception as e:
+            print(f"Note: parsed data not cached ({e})")
+    return df
@@ -0,0 +1,58 @@
+from pacing import RECHECK_TIMEOUT
+
+RETRY_PASSES = 2     # Extra passes at the end of the run over students whose record seemed slow
+RETRY_BACKOFF = 2.0  # Each pass multiplies the last name wait (and the pause before it) by this
+RETRY_PAUSE = 2.0    # Seconds the app is left alone before the first retry pass
+
+class RetryQueue:
+    """
+    Students that failed in a way a slow record load explains (last name empty or not
+    the expected one), entered again after everyone else with longer waits.
+    Only failures on the final attempt go to the error report.
+
+    Loop over run(students, driver) and call retry(sid, student, name found) on such a
+    failure: it queues the student and returns True, or returns False when there is no
+    retry left (log the error). The same wrong name on a retry is final: that record
+    had loaded, it just isn't this student.
+    """
+    def __init__(self, passes=RETRY_PASSES):
+        self.passes = passes
+        self.attempt = 0 # 0 while the students are entered the first time
+        self.queued = []
+        self.found = {}  # Student ID -> name found on its last failed attempt
+        self.retried = 0
+        self.gave_up = 0
+
+    def run(self, items, driver):
+        """Yields every item, then the items queued during each pass, for up to `passes` more passes."""
+        yield from items
+        while self.queued and self.attempt < self.passes:
+            self.attempt += 1
+            items, self.queued = self.queued, []
+            print(f"\nRetrying {len(items)} student(s) whose record may have been slow to load "
+                  f"(pass {self.attempt} of {self.passes})...")
+            driver.sleep(RETRY_PAUSE * RETRY_BACKOFF ** (self.attempt - 1))
+            yield from items
+
+    def can_retry(self, sid, found):
+        if self.attempt >= self.passes:
+            return False
+        return not found or self.found.get(str(sid)) != found
+
+    def retry(self, sid, item, found):
+        if not self.can_retry(sid, found):
+            if self.attempt:
+                self.gave_up += 1
+            return False
+        if not self.attempt:
+            self.retried += 1
+        self.found[str(sid)] = found
+        self.queued.append(item)
+        return True
+
+    def recheck_timeout(self):
+        """read_after_load timeout for the last name on this pass (None: the pacing default the first time)."""
+        return RECHECK_TIMEOUT * RETRY_BACKOFF ** self.attempt if self.attempt else None
+
+    def summary(self):
+        return f"{self.retried} student(s) retried at the end, {self.retried - self.gave_up} recovered"
@@ -0,0 +1,73 @@
+import os
+import pandas as pd
+from excel_utils import find_column_robust, ROSTER_NAMES
+from ingest import normalize_id
+from name_match import last_name_matches
+
+# Student list exported from School Days Plus, saved next to the exports
+# (e.g. package-choice/roster.xlsx); get_excel_paths never takes it for an export.
+ROSTER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROSTER_OK = "ok"
+ROSTER_MISSING = "missing"     # Student ID not in the roster
+ROSTER_MISMATCH = "mismatch"   # In the roster under another last name
+
+class RosterIndex:
+    """
+    Student ID -> last name as School Days Plus has them, for checking students
+    before any search in the app. Names compare like the live check (last_name_matches).
+    """
+    def __init__(self, names):
+        self.names = names
+
+    def __len__(self):
+        return len(self.names)
+
+    def check(self, sid, expected_last_name=""):
+        """
+        Returns: (ROSTER_OK, ROSTER_MISSING or ROSTER_MISMATCH, roster last name or None)
+        """
+        name = self.names.get(str(sid))
+        if name is None:
+            return ROSTER_MISSING, None
+        if expected_last_name and not last_name_matches(name, expected_last_name):
+            return ROSTER_MISMATCH, name
+        return ROSTER_OK, name
+
+def find_roster(directory=ROSTER_DIR):
+    for name in ROSTER_NAMES:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+def load_roster(directory=ROSTER_DIR):
+    """
+    Reads roster.xlsx / roster.csv if there is one.
+    Returns: a RosterIndex, or None without a usable roster (students are then only checked live).
+    """
+    path = find_roster(directory)
+    if path is None:
+        return None
+    try:
+        if path.endswith(".csv"):
+            df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        else:
+            df = pd.read_excel(path, dtype=str)
+    except Exception as e:
+        print(f"Warning: roster {os.path.basename(path)} could not be read ({e}); checking names live only.")
+        return None
+
+    id_col = find_column_robust(df, ["student id", "id"])
+    name_col = find_column_robust(df, ["last name", "last"])
+    if id_col is None or name_col is None:
+        print(f"Warning: roster {os.path.basename(path)} needs a Student ID and a Last Name column; checking names live only.")
+        return None
+
+    names = {}
+    for sid, name in zip(df[id_col], df[name_col]):
+        sid = normalize_id(sid)
+        if sid is not None:
+            names[sid] = "" if pd.isna(name) else str(name).strip()
+    print(f"Roster: {len(names)} students from {os.path.basename(path)}")
+    return RosterIndex(names)
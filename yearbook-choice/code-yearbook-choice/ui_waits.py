@@ -0,0 +1,99 @@
+POLL_INTERVAL = 0.03   # Seconds between screen/clipboard polls
+LOAD_TIMEOUT = 3.0     # Longest we wait for a searched student to show up
+CLIPBOARD_TIMEOUT = 0.5
+BLIND_LOAD_DELAY = 0.3 # Fixed wait for a record to load when there is no region to watch
+SEARCH_BOX_EXTENT = (150, 15) # Half width/height around the search box spot that typing can change
+
+def wait_until(driver, condition, timeout, interval=POLL_INTERVAL):
+    """
+    Polls condition() until it returns something truthy or the timeout passes.
+    Returns: the truthy value, or None on timeout.
+    """
+    deadline = driver.now() + timeout
+    while True:
+        result = condition()
+        if result:
+            return result
+        if driver.now() >= deadline:
+            return None
+        driver.sleep(interval)
+
+def _bounds(points, padding):
+    left = min(pt['x'] for pt in points) - padding
+    top = min(pt['y'] for pt in points) - padding
+    right = max(pt['x'] for pt in points) + padding
+    bottom = max(pt['y'] for pt in points) + padding
+    return (max(left, 0), max(top, 0), right - max(left, 0), bottom - max(top, 0))
+
+def record_region(coords, padding=20):
+    """
+    Screen region (left, top, width, height) covering the student record fields,
+    i.e. every configured spot except the search box (which changes while we type).
+    If the search box sits among the fields, only the fields on one side of it are covered
+    (the side with the last name box, else the one with the most fields), so typing a
+    Student ID never looks like a new record.
+    """
+    fields = {name: pt for name, pt in coords.items() if name != 'search_box'}
+    if not fields:
+        return None
+    region = _bounds(fields.values(), padding)
+    box = coords.get('search_box')
+    if box:
+        half_width, half_height = SEARCH_BOX_EXTENT
+        left, top, width, height = region
+        if (left < box['x'] + half_width and box['x'] - half_width < left + width
+                and top < box['y'] + half_height and box['y'] - half_height < top + height):
+            sides = [[n for n, pt in fields.items() if pt['y'] + padding < box['y'] - half_height], # Above
+                     [n for n, pt in fields.items() if pt['y'] - padding > box['y'] + half_height], # Below
+                     [n for n, pt in fields.items() if pt['x'] + padding < box['x'] - half_width],  # Left
+                     [n for n, pt in fields.items() if pt['x'] - padding > box['x'] + half_width]]  # Right
+            side = max(sides, key=lambda names: ('last_name_box' in names, len(names)))
+            region = _bounds([fields[n] for n in side], padding) if side else None
+    return region
+
+def _frame_key(image):
+    # PIL images compare by pixels via tobytes(); the fake app's screenshots do the same
+    return image.tobytes() if hasattr(image, "tobytes") else image
+
+def capture(driver, region):
+    return _frame_key(driver.screenshot(region=region))
+
+def wait_for_screen_change(driver, region, before, timeout=LOAD_TIMEOUT):
+    """
+    Waits until the region looks different from `before` (captured before the search)
+    and then stops changing, i.e. the new record has finished drawing.
+    Returns: True if a change was seen, False on timeout (e.g. next student looks identical).
+    With nothing to watch (no record fields outside the search box) it waits BLIND_LOAD_DELAY
+    like the old fixed delay and returns False.
+    """
+    if region is None or before is None:
+        driver.sleep(BLIND_LOAD_DELAY)
+        return False
+    if not wait_until(driver, lambda: capture(driver, region) != before, timeout):
+        return False
+
+    last = [capture(driver, region)]
+    def settled():
+        frame = capture(driver, region)
+        same = frame == last[0]
+        last[0] = frame
+        return same
+    wait_until(driver, settled, timeout)
+    return True
+
+def read_field_text(driver, coord, timeout=CLIPBOARD_TIMEOUT):
+    """
+    Clicks field, Selects All, Copies to clipboard, returns text.
+    Polls the clipboard instead of sleeping; an empty field costs the full timeout.
+    """
+    if not coord: return ""
+
+    driver.click(coord['x'], coord['y'])
+    driver.triple_click()
+
+    # Clear clipboard first so we never read the previous student's value
+    driver.copy_to_clipboard("")
+    driver.hotkey('ctrl', 'c')
+
+    text = wait_until(driver, driver.read_clipboard, timeout)
+    return (text or "").strip()
@@ -1,48 +1,287 @@
+import numpy as np
 import pandas as pd
-from excel_utils import find_column_robust, get_excel_path
+from excel_utils import get_excel_paths
+from ingest import read_export, read_exports, read_export_chunks, read_header, use_chunked, normalize_ids
+from handoff import HANDOFF_FILE, CLEAN_XLSX_FILE, build_handoff_table, write_handoff, export_xlsx
+from session_store import get_session, close_sessions
+from entered_snapshot import CHANGE_NEW, CHANGE_CHANGED, CHANGE_UNCHANGED, load_snapshot, compute_delta, compact_snapshot
 import os
 import sys
 from datetime import datetime
 
-def validate_data():
+TIMESTAMP_FMT = '%m/%d/%Y %I:%M:%S %p'
+VALID_SELECTIONS = ['a', 'b', 'c', 'd']
+# yearbook-choice/reports, shared with main.py however each is started
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
+
+# Column roles of the yearbook export (keywords as for find_column_robust) and their dtypes
+YEARBOOK_ROLES = {
+    'student_id': "student id",
+    'selection': ["yearbook photo", "selection"],
+    'date': "yearbook date",
+    'last_name': "student last name",
+}
+# Dates keep their cell types: parse_dates applies the export format itself
+YEARBOOK_DTYPES = {'student_id': str, 'selection': str, 'last_name': str}
+
+def parse_dates(values, group_codes):
+    """
+    Parses the whole date column in one call (strict export format).
+    Manual entries that fail the strict format fall back to pandas inference,
+    done per student so each student's rows are inferred together as before.
+    """
+    row_dates = pd.to_datetime(values, format=TIMESTAMP_FMT, errors='coerce')
+    failed_parse_mask = row_dates.isna() & values.notna()
+
+    if failed_parse_mask.any():
+        import warnings
+        failed_vals = values[failed_parse_mask]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for _, group_vals in failed_vals.groupby(group_codes[failed_parse_mask.to_numpy()], sort=False):
+                row_dates.loc[group_vals.index] = pd.to_datetime(group_vals, errors='coerce')
+
+    return row_dates
+
+def select_latest_rows(df, student_id_col, selection_col, date_col, row_counts=None):
+    """
+    Keeps the newest row per Student ID using one sort over the whole sheet.
+    row_counts: {Student ID: rows in the export}, when df only holds some of each
+    student's rows (see reduce_chunks); by default the rows in df are counted.
+
+    Rules (same as the original per-student loop):
+    - Several rows with an unparseable date -> reject student ("Multiple rows with invalid dates")
+    - Several rows on the newest date with different selections -> reject student
+    - Newest row must have an A-D selection
+
+    Returns: (clean_df, error_df), both ordered by first appearance of the ID
+    and indexed by row position in df.
+    """
+    # Rows without an ID never matched anything in the old filter, so drop them.
+    # The original index is kept (all lookups below are positional): it is the source row.
+    work = df[df[student_id_col].notna()]
+
+    # Group codes are assigned in order of first appearance
+    codes, unique_ids = pd.factorize(work[student_id_col])
+    group_count = len(unique_ids)
+    positions = np.arange(len(work))
+    if row_counts is None:
+        group_sizes = np.bincount(codes, minlength=group_count)
+    else:
+        group_sizes = np.array([row_counts[sid] for sid in unique_ids], dtype=np.int64)
+    is_multi_row = group_sizes[codes] > 1
+    first_idx = np.full(group_count, len(work), dtype=np.int64)
+    np.minimum.at(first_idx, codes, positions)
+
+    reasons = np.full(group_count, None, dtype=object)
+
+    if date_col:
+        # --- Date Logic (parsed once for the whole column) ---
+        original_vals = work[date_col]
+        row_dates = parse_dates(original_vals, codes)
+        work[date_col] = row_dates
+
+        # Rule: Multiple rows require valid dates for sorting
+        invalid_date_mask = (row_dates.isna() & original_vals.notna()).to_numpy()
+        bad_dates = np.zeros(group_count, dtype=bool)
+        bad_dates[codes[invalid_date_mask & is_multi_row]] = True
+        reasons[bad_dates] = "Multiple rows with invalid dates"
+
+        # Sort key: Newest first, missing dates last, file order for ties
+        date_missing = row_dates.isna().to_numpy()
+        date_ints = row_dates.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        date_key = np.where(date_missing, np.iinfo(np.int64).max, -date_ints)
+        order = np.lexsort((positions, date_key, codes))
+    else:
+        # Multiple rows but no date column at all
+        bad_dates = group_sizes > 1
+        for student_id in unique_ids[bad_dates]:
+            print(f"Error: Student {student_id} has duplicates but no Date column.")
+        reasons[bad_dates] = "Duplicate rows without Date column"
+        date_missing = np.ones(len(work), dtype=bool)
+        date_key = np.zeros(len(work), dtype=np.int64)
+        order = np.lexsort((positions, codes))
+
+    # --- Top Row Selection (first row of each group in sorted order) ---
+    sorted_codes = codes[order]
+    is_group_start = np.ones(len(order), dtype=bool)
+    is_group_start[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    top_idx = order[is_group_start]
+
+    # --- Conflict Check (Same Date) ---
+    if date_col and selection_col:
+        same_date_mask = (
+            is_multi_row
+            & ~date_missing
+            & (date_key == date_key[top_idx][codes])
+            & ~bad_dates[codes]
+        )
+        same_date_rows = order[same_date_mask[order]]
+        if len(same_date_rows):
+            norm_sel = work[selection_col].iloc[same_date_rows].map(lambda v: str(v).lower().strip())
+            row_codes = codes[same_date_rows]
+            distinct = norm_sel.groupby(row_codes, sort=False).nunique()
+            conflicts = distinct[distinct > 1].index.to_numpy()
+
+            if len(conflicts):
+                # Rebuild the selection sets in sorted order so the message matches
+                selections_by_code = {code: set() for code in conflicts}
+                for code, s_val in zip(row_codes, norm_sel):
+                    if code in selections_by_code:
+                        selections_by_code[code].add(s_val)
+                for code in conflicts:
+                    selections = selections_by_code[code]
+                    top_date = work[date_col].iloc[top_idx[code]]
+                    print(f"Error: Student {unique_ids[code]} has conflicting selections on same date {top_date}.")
+                    reasons[code] = f"Conflicting selections {selections} on same date"
+
+    # --- Validate Selection (top rows only) ---
+    if selection_col:
+        top_sel = work[selection_col].iloc[top_idx].tolist()
+        for code, sel in enumerate(top_sel):
+            if reasons[code] is not None:
+                continue
+            if pd.isna(sel) or str(sel).strip().lower() not in VALID_SELECTIONS:
+                reasons[code] = f"Invalid Selection: '{sel}'"
+
+    # --- Build Outputs ---
+    is_error = pd.notna(reasons)
+    clean_df = work.iloc[top_idx[~is_error]]
+
+    # Invalid-date errors report the student's first row, the others the top row
+    err_idx = np.where(bad_dates, first_idx, top_idx)[is_error]
+    error_df = work.iloc[err_idx].copy()
+    error_df['error_reason'] = reasons[is_error]
+
+    return clean_df, error_df
+
+def reduce_chunks(chunks, student_id_col, date_col):
+    """
+    Streams the export chunk by chunk and keeps, per student, only the rows
+    select_latest_rows can still pick or report: the first row, the rows on the
+    newest date so far (strict export format) and the rows whose date needs the
+    fallback parse. Rows on an older date are dropped as soon as a newer one shows up.
+    IDs are normalized here ("12345.0" -> "12345"); rows without one are dropped.
+
+    Returns: (kept rows indexed by sheet position, {Student ID: row count}, unique ID count)
+    """
+    students = {} # Student ID -> {'count', 'first', 'newest', 'newest_rows', 'fallback'}, first appearance order
+    has_missing_id = False
+    columns = []
+    for chunk in chunks:
+        columns += [col for col in chunk.columns if col not in columns]
+        chunk[student_id_col] = normalize_ids(chunk[student_id_col])
+        missing = chunk[student_id_col].isna()
+        if missing.any():
+            has_missing_id = True
+            chunk = chunk[~missing.to_numpy()]
+        if date_col:
+            strict = pd.to_datetime(chunk[date_col], format=TIMESTAMP_FMT, errors='coerce')
+            needs_fallback = (strict.isna() & chunk[date_col].notna()).tolist()
+            date_missing = strict.isna().tolist()
+            date_ints = strict.to_numpy(dtype='datetime64[ns]').view(np.int64).tolist()
+        else:
+            needs_fallback = date_missing = [True] * len(chunk)
+            date_ints = [0] * len(chunk)
+
+        rows = chunk.to_dict('records')
+        for pos, sid, row, fallback, missing_date, date_int in zip(
+                chunk.index, chunk[student_id_col], rows, needs_fallback, date_missing, date_ints):
+            entry = (pos, row)
+            state = students.get(sid)
+            if state is None:
+                state = students[sid] = {'count': 0, 'first': entry, 'newest': None, 'newest_rows': [], 'fallback': []}
+            state['count'] += 1
+            if date_col and fallback:
+                state['fallback'].append(entry)
+            elif not missing_date:
+                if state['newest'] is None or date_int > state['newest']:
+                    state['newest'], state['newest_rows'] = date_int, []
+                if date_int == state['newest']:
+                    state['newest_rows'].append(entry)
+
+    kept = {}
+    for state in students.values():
+        for pos, row in [state['first']] + state['newest_rows'] + state['fallback']:
+            kept[pos] = row
+    positions = sorted(kept)
+    kept_df = pd.DataFrame([kept[pos] for pos in positions], index=pd.Index(positions), columns=columns)
+    row_counts = {sid: state['count'] for sid, state in students.items()}
+    return kept_df, row_counts, len(students) + has_missing_id
+
+def report_delta(table, reports_dir, timestamp):
+    """
+    Counts the validated students that are new, changed or unchanged since they were
+    last entered (main.py only enters the first two). Students entered before but
+    missing from this export are listed in removed-students-<time>.csv once, then
+    dropped from the snapshot.
+    """
+    snapshot = load_snapshot()
+    ids = table.column('id').to_pylist()
+    changes, removed = compute_delta(ids, table.column('selection').to_pylist(), snapshot)
+    print(f"Changes since the last entry: {changes.count(CHANGE_NEW)} new, {changes.count(CHANGE_CHANGED)} changed, "
+          f"{changes.count(CHANGE_UNCHANGED)} unchanged, {len(removed)} removed.")
+    if removed:
+        removed_file = os.path.join(reports_dir, f"removed-students-{timestamp}.csv")
+        pd.DataFrame(removed).drop(columns=['hash']).to_csv(removed_file, index=False)
+        print(f"-> Students no longer in the export (already entered, check by hand): {removed_file}")
+        compact_snapshot(snapshot, set(ids))
+
+def validate_data(export_clean_xlsx=False, chunked=None):
+    """
+    Validates every .xlsx export in the folder (several are merged, see ingest.read_exports).
+    chunked: stream a single export in chunks (True), read it whole (False),
+    or decide by file size (None, see ingest.CHUNKED_MIN_BYTES).
+    """
     print("--- Starting Data Validation ---")
     
     # 0. Define Session Log Path (Shared with main.py)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    reports_dir = "reports"
+    reports_dir = REPORTS_DIR
     if not os.path.exists(reports_dir):
         os.makedirs(reports_dir)
     
     # We use a single file for both Setup and Run errors
     report_file = os.path.join(reports_dir, f"session-errors-{timestamp}.csv")
     
-    # Save this path to a temp file so main.py knows where to log
-    session_info_path = os.path.join(os.path.dirname(__file__), "current_session.txt")
-    try:
-        with open(session_info_path, "w") as f:
-            f.write(report_file)
-    except Exception as e:
-        print(f"Warning: Could not save session info: {e}")
+    # Open a session in the store that main.py continues (left open below when validation passes)
+    session = get_session("yearbook", timestamp)
 
-    # 1. Find Excel File
-    excel_path = get_excel_path()
+    # 1. Find Excel File(s)
+    excel_paths = get_excel_paths()
     
-    if not excel_path:
+    if not excel_paths:
         print("Error: No Excel file (.xlsx) found in this folder.")
         sys.exit(1)
-    print(f"Checking file: {excel_path}")
+    excel_path = excel_paths[0]
+    if len(excel_paths) == 1:
+        print(f"Checking file: {excel_path}")
+    else:
+        print(f"Checking {len(excel_paths)} files together (newest date per student across all of them):")
+        for path in excel_paths:
+            print(f"  - {os.path.basename(path)}")
 
     try:
-        df = pd.read_excel(excel_path)
+        # All columns are kept: rejected rows go to the error report as they were
+        if len(excel_paths) > 1:
+            # One export per school: parsed in parallel, rows tagged with their file
+            df, columns = read_exports(excel_paths, YEARBOOK_ROLES, YEARBOOK_DTYPES, all_columns=True)
+            chunks = None
+        elif use_chunked(excel_path, chunked):
+            # Big export: streamed in chunks, keeping only rows that can still matter
+            columns, chunks = read_export_chunks(excel_path, YEARBOOK_ROLES, YEARBOOK_DTYPES, all_columns=True)
+        else:
+            df, columns = read_export(excel_path, YEARBOOK_ROLES, YEARBOOK_DTYPES, all_columns=True)
+            chunks = None
     except Exception as e:
         print(f"Critical Error: Could not read Excel file. {e}")
         sys.exit(1)
 
-    # 2. Check Columns
-    student_id_col = find_column_robust(df, "student id")
-    selection_col = find_column_robust(df, ["yearbook photo", "selection"])
-    date_col = find_column_robust(df, "yearbook date")
-    last_name_col = find_column_robust(df, "student last name")
+    # 2. Check Columns (mapping saved per export layout in header_profiles.json)
+    student_id_col = columns['student_id']
+    selection_col = columns['selection']
+    date_col = columns['date']
+    last_name_col = columns['last_name']
 
     missing_cols = []
     if not student_id_col: missing_cols.append("Student ID")
@@ -52,137 +291,68 @@ def validate_data():
 
     if missing_cols:
         print(f"Error: Missing required columns: {', '.join(missing_cols)}")
-        print(f"Found columns: {list(df.columns)}")
+        print(f"Found columns: {read_header(excel_path) if chunks is not None else list(df.columns)}")
         sys.exit(1)
 
     print("Columns identified successfully.")
 
     # 3. Process Data (Clean, Dedup, Sort)
-    cleaned_rows = []
-    error_rows = []
-    
-    unique_ids = df[student_id_col].unique()
-    print(f"Processing {len(unique_ids)} unique Student IDs...")
-    
-    for student_id in unique_ids:
-        # Filter rows for this student
-        student_rows = df[df[student_id_col] == student_id].copy()
-        
-        if student_rows.empty:
-            continue
-
-        row_count = len(student_rows)
-        
-        # --- Date Logic ---
-        if date_col:
-             # Convert dates (Strict + Fallback)
-             timestamp_fmt = '%m/%d/%Y %I:%M:%S %p'
-             
-             # Attempt parse
-             row_dates = pd.to_datetime(student_rows[date_col], format=timestamp_fmt, errors='coerce')
-             
-             # Fallback for manual entries
-             original_vals = student_rows[date_col]
-             failed_parse_mask = row_dates.isna() & original_vals.notna()
-             
-             if failed_parse_mask.any():
-                 import warnings
-                 with warnings.catch_warnings():
-                     warnings.simplefilter("ignore")
-                     fallback_dates = pd.to_datetime(original_vals[failed_parse_mask], errors='coerce')
-                 
-                 row_dates.loc[failed_parse_mask] = fallback_dates
-             
-             # Apply parsed dates
-             student_rows[date_col] = row_dates
-             
-             # Check Validity
-             invalid_date_mask = row_dates.isna() & original_vals.notna()
-             
-             # Rule: Multiple rows require valid dates for sorting
-             if row_count > 1 and invalid_date_mask.any():
-                # Reject all rows for this student, but log only one error
-                err_row = student_rows.iloc[0].copy()
-                err_row['error_reason'] = "Multiple rows with invalid dates"
-                error_rows.append(err_row)
-                continue
-                 
-             # Sort Descending (Newest First)
-             student_rows = student_rows.sort_values(by=date_col, ascending=False)
-        
-        elif row_count > 1:
-            # Multiple rows but no date column at all
-            print(f"Error: Student {student_id} has duplicates but no Date column.")
-            err_row = student_rows.iloc[0].copy()
-            err_row['error_reason'] = "Duplicate rows without Date column"
-            error_rows.append(err_row)
-            continue
-
-        # --- Top Row Selection ---
-        top_row = student_rows.iloc[0]
-        
-        # --- Conflict Check (Optional: Same Date) ---
-        if row_count > 1 and date_col:
-            top_date = top_row[date_col]
-            same_date_rows = student_rows[student_rows[date_col] == top_date]
-            
-            if len(same_date_rows) > 1:
-                 # Check selection conflict
-                 selections = set()
-                 for idx, r in same_date_rows.iterrows():
-                    s_val = str(r[selection_col]).lower().strip() if selection_col else ""
-                    selections.add(s_val)
-                 
-                 if len(selections) > 1:
-                    print(f"Error: Student {student_id} has conflicting selections on same date {top_date}.")
-                    err_row = same_date_rows.iloc[0].copy()
-                    err_row['error_reason'] = f"Conflicting selections {selections} on same date"
-                    error_rows.append(err_row)
-                    continue
-
-        # --- Validate Selection ---
-        if selection_col:
-            sel = top_row[selection_col]
-            if pd.isna(sel) or str(sel).strip().lower() not in ['a', 'b', 'c', 'd']:
-                err_row = top_row.copy()
-                err_row['error_reason'] = f"Invalid Selection: '{sel}'"
-                error_rows.append(err_row)
-                continue
-        
-        # --- Add to Clean List ---
-        cleaned_rows.append(top_row)
+    if chunks is not None:
+        try:
+            df, row_counts, unique_count = reduce_chunks(chunks, student_id_col, date_col)
+        except Exception as e:
+            print(f"Critical Error: Could not read Excel file. {e}")
+            sys.exit(1)
+    else:
+        # IDs exactly as they are searched ("12345.0" -> "12345"); blank IDs become missing
+        df[student_id_col] = normalize_ids(df[student_id_col])
+        row_counts = None
+        unique_count = df[student_id_col].nunique(dropna=False)
+    print(f"Processing {unique_count} unique Student IDs...")
+    clean_df, error_df = select_latest_rows(df, student_id_col, selection_col, date_col, row_counts)
 
     # 4. Save Outputs
     print(f"\nProcessing Complete.")
 
-    # Save Cleaned Data
-    # Use code folder path
-    clean_file = os.path.join(os.path.dirname(__file__), "cleaned_data.xlsx")
-    if cleaned_rows:
+    # Save Cleaned Data (typed Arrow handoff for main.py, in the code folder)
+    # A cleaned_data.xlsx from an older run would no longer match, so it only exists when asked for
+    if os.path.exists(CLEAN_XLSX_FILE):
+        os.remove(CLEAN_XLSX_FILE)
+    if not clean_df.empty:
         try:
-            clean_df = pd.DataFrame(cleaned_rows)
-            # Reorder columns to put ID first, if possible, but keeping original structure is fine
-            clean_df.to_excel(clean_file, index=False)
+            table = build_handoff_table(clean_df, student_id_col, last_name_col, selection_col, date_col)
+            write_handoff(table, session_id=session.id) # main.py continues this session, not an older one
+            report_delta(table, reports_dir, timestamp)
+            if export_clean_xlsx:
+                export_xlsx(table)
+                print(f"-> Cleaned data exported for review: {CLEAN_XLSX_FILE}")
         except Exception as e:
             print(f"Critical Error saving cleaned data: {e}")
             sys.exit(1)
     else:
         print("-> Warning: No valid data found to save.")
-        if os.path.exists(clean_file):
-            os.remove(clean_file) 
+        if os.path.exists(HANDOFF_FILE):
+            os.remove(HANDOFF_FILE) 
 
     # Save Errors
-    if error_rows:
-        # report_file is already defined at top
-        
-        error_df = pd.DataFrame(error_rows)
-        error_df.to_csv(report_file, index=False)
+    if not error_df.empty:
+        # report_file is already defined at top; blank cells are stored as None
+        for row in error_df.astype(object).where(error_df.notna(), None).to_dict('records'):
+            session.error(report_file, row, row[student_id_col], row['error_reason'])
         print(f"-> Error report started: {report_file}")
+    close_sessions(finish=clean_df.empty) # Exports the error report
         
-    if not cleaned_rows:
+    if clean_df.empty:
          sys.exit(1) # Fail if nothing to run
     else:
          print("-> Ready for automation.")
 
 if __name__ == "__main__":
-    validate_data()
+    import argparse
+    parser = argparse.ArgumentParser(description="Validate and clean the yearbook choice export")
+    parser.add_argument("--export-xlsx", action="store_true",
+                        help="Also write cleaned_data.xlsx to look at the cleaned rows")
+    parser.add_argument("--chunked", action="store_true", default=None,
+                        help="Read the export in chunks to save memory (automatic for very large files)")
+    args = parser.parse_args()
+    validate_data(export_clean_xlsx=args.export_xlsx, chunked=args.chunked)